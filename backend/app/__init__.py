@@ -1,8 +1,14 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from app.routes import patient_routes, queue_routes, dev_routes, slot_routes
-from app.database import db
+from app.routes import patient_routes, queue_routes, dev_routes, slot_routes, doctor_routes
+from app.database import db, migrate, configure_engine
+from app.utils.pubsub import pubsub
+from app.utils.queue_cache import queue_cache
+from app.cli import import_patients_command, generate_data_command, archive_command
+from app.utils.serialization import FastJSONProvider, set_encoder
+from app.utils.metrics import metrics
+from app.utils.archive import archive_scheduler
 
 _app_instance = None  # Singleton instance
 
@@ -14,16 +20,38 @@ def create_app(config_name: str = None):
         if config_name == 'Test':
             print('test')
             _app_instance.config.from_object('config.Test')
+        elif config_name == 'Prod':
+            _app_instance.config.from_object('config.Prod')
         else:
             print('dev')
             _app_instance.config.from_object('config.Dev')
 
+        # Responses and request bodies go through orjson when it is installed, the stdlib json module otherwise
+        encoder = set_encoder(_app_instance.config['JSON_ENCODER'])
+        _app_instance.json = FastJSONProvider(_app_instance)
+        if encoder.name == 'json' and _app_instance.config['JSON_ENCODER'] == 'auto':
+            _app_instance.logger.warning("orjson is not installed, responses are encoded with the stdlib json module")
+        else:
+            _app_instance.logger.info("JSON encoder: %s", encoder.name)
+
         # Blueprint route registrations
         _app_instance.register_blueprint(patient_routes.api, url_prefix='/api/patients')
         _app_instance.register_blueprint(slot_routes.api, url_prefix='/api/slots')
         _app_instance.register_blueprint(dev_routes.api, url_prefix='/api/dev')
         _app_instance.register_blueprint(queue_routes.api, url_prefix='/api/queue')
+        _app_instance.register_blueprint(doctor_routes.api, url_prefix='/api/doctors')
 
         db.init_app(_app_instance)
+        configure_engine(_app_instance)
+        migrate.init_app(_app_instance, db)
+        pubsub.init_app(_app_instance)
+        queue_cache.init_app(_app_instance)
+        metrics.init_app(_app_instance)
+        archive_scheduler.init_app(_app_instance)
         CORS(_app_instance)
+
+        # Maintenance commands, run with `flask <command>`
+        _app_instance.cli.add_command(import_patients_command)
+        _app_instance.cli.add_command(generate_data_command)
+        _app_instance.cli.add_command(archive_command)
     return _app_instance
\ No newline at end of file
@@ -0,0 +1,82 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app.database import db
+from app.utils.archive import ARCHIVE_CHUNK_SIZE, run_archive
+from app.utils.data_generator import GENERATOR_CHUNK_SIZE, GeneratorSettings, generate
+from app.utils.patient_import import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, detect_format, import_patients, read_records
+
+
+@click.command('import-patients')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='File format, guessed from the extension when omitted.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=IMPORT_CHUNK_SIZE, show_default=True,
+              help='Patients inserted per transaction.')
+@with_appcontext
+def import_patients_command(path, fmt, chunk_size):
+    """Bulk registers the patients in a CSV (ssn,name,phone header) or NDJSON file."""
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.UsageError("Can't tell the file format from its extension, pass --format")
+
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_patients(db.session, read_records(stream, fmt), chunk_size)
+
+    click.echo(f"Imported {report.imported}, skipped {report.duplicates} duplicates, {report.failed} rows failed")
+    for error in report.errors:
+        click.echo(f"  row {error.row}: {error.error}", err=True)
+    if report.failed > len(report.errors):
+        click.echo(f"  ... and {report.failed - len(report.errors)} more", err=True)
+
+
+_DEFAULTS = GeneratorSettings()
+
+
+@click.command('generate-data')
+@click.option('--doctors', type=click.IntRange(min=0), default=_DEFAULTS.doctors, show_default=True)
+@click.option('--patients', type=click.IntRange(min=0), default=_DEFAULTS.patients, show_default=True)
+@click.option('--slot-days', type=click.IntRange(min=0), default=_DEFAULTS.slot_days, show_default=True,
+              help='Days of slots per doctor, starting today.')
+@click.option('--slots-per-day', type=click.IntRange(min=0), default=_DEFAULTS.slots_per_day, show_default=True)
+@click.option('--slot-minutes', type=click.IntRange(min=1), default=_DEFAULTS.slot_minutes, show_default=True)
+@click.option('--booked-ratio', type=click.FloatRange(0, 1), default=_DEFAULTS.booked_ratio, show_default=True,
+              help='Share of slots already booked.')
+@click.option('--queue-depth', type=click.IntRange(min=0), default=_DEFAULTS.queue_depth, show_default=True,
+              help='Average patients waiting per queue.')
+@click.option('--served-per-queue', type=click.IntRange(min=0), default=_DEFAULTS.served_per_queue, show_default=True,
+              help='Served patients in each queue\'s history.')
+@click.option('--seed', type=int, default=_DEFAULTS.seed, show_default=True, help='Same seed, same data.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=GENERATOR_CHUNK_SIZE, show_default=True,
+              help='Rows per bulk insert.')
+@with_appcontext
+def generate_data_command(chunk_size, **settings):
+    """Fills the database with a synthetic hospital for load and scale testing, in one transaction."""
+    with db.engine.begin() as conn:
+        report = generate(conn, GeneratorSettings(**settings), chunk_size=chunk_size)
+
+    total = sum(report.rows.values())
+    click.echo(f"Generated {total} rows in {report.elapsed:.1f}s")
+    for table, count in report.rows.items():
+        click.echo(f"  {table}: {count}")
+
+
+@click.command('archive')
+@click.option('--retention-days', type=click.IntRange(min=0), default=None,
+              help='Days of history kept in the live tables, ARCHIVE_RETENTION_DAYS when omitted.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=ARCHIVE_CHUNK_SIZE, show_default=True,
+              help='Rows moved per transaction.')
+@click.option('--vacuum/--no-vacuum', default=True, show_default=True,
+              help='Reclaim the space freed in the database file afterwards.')
+@with_appcontext
+def archive_command(retention_days, chunk_size, vacuum):
+    """Moves past slots and finished queue entries into the archive tables."""
+    if retention_days is None:
+        retention_days = current_app.config['ARCHIVE_RETENTION_DAYS']
+    report = run_archive(db.session, retention_days, chunk_size, vacuum)
+
+    click.echo(f"Archived {sum(report.rows.values())} rows in {report.elapsed:.1f}s")
+    for table, count in report.rows.items():
+        click.echo(f"  {table}: {count}")
+    if not report.complete:
+        click.echo("Stopped early, the database was busy. Run again to archive the rest.", err=True)
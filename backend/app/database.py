@@ -1,3 +1,28 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+# Batch mode lets Alembic alter tables on SQLite, which has limited ALTER TABLE support
+migrate = Migrate(render_as_batch=True)
+
+
+def configure_engine(app) -> None:
+    """
+    Applies the configured SQLITE_PRAGMAS to every new connection of the app's engine.
+
+    Pragmas are per connection in SQLite, so they are set from the pool's connect event
+    rather than once at startup. Does nothing for other databases.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    with app.app_context():
+        engine = db.engine
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -1,4 +1,6 @@
+from sqlalchemy.orm import validates
 from app.database import db
+from app.utils.ssn_utils import hash_ssn
 
 class User(db.Model):
     '''
@@ -7,6 +9,7 @@ class User(db.Model):
     Attributes/Columns:
     - id: (INT) Primary key ID of the patient
     - ssn: (STRING) SSN of the patient
+    - ssn_hash: (STRING) Keyed hash of the SSN, which patients are looked up by
     - name: (STRING) Name of the patient
     - phone: (STRING) Phone number of the patient
     - checkin_status: (BOOL) Checkin status of the patient
@@ -14,13 +17,47 @@ class User(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     ssn = db.Column(db.String(12), nullable=False, unique=True)
+    ssn_hash = db.Column(db.String(64), nullable=False, unique=True, index=True)
     name = db.Column(db.String(100))
     phone = db.Column(db.String(15))
     checkin_status = db.Column(db.Boolean, default=False)
 
+    @validates('ssn')
+    def _set_ssn_hash(self, key, ssn):
+        self.ssn_hash = hash_ssn(ssn)
+        return ssn
+
     def __repr__(self):
         return f"<Patient Object - ssn: {self.ssn}>"
 
+# Association between doctors and their specialties, indexed both ways for lookups by doctor and by specialty
+doctor_specialty = db.Table(
+    'doctor_specialty',
+    db.Column('doctor_id', db.Integer, db.ForeignKey('doctor.id'), primary_key=True),
+    db.Column('specialty_id', db.Integer, db.ForeignKey('specialty.id'), primary_key=True),
+    db.Index('ix_doctor_specialty_specialty_id', 'specialty_id', 'doctor_id')
+)
+
+class Specialty(db.Model):
+    """
+    Specialty relation object.
+
+    Attributes/Columns:
+    - id: (INT) Primary key ID of the specialty
+    - name: (STRING) Display name of the specialty, as first written by a doctor
+    - key: (STRING) Normalized name used for lookups, e.g. "general medicine" for "General"
+
+    Backref Attributes:
+    - doctors: (LIST) Doctors practising the specialty, defined in Doctor model
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(100), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Specialty {self.name}>"
+
 class Doctor(db.Model):
     '''
     Doctor relation object.
@@ -36,6 +73,9 @@ class Doctor(db.Model):
     - phone: (STRING) Phone number of doctor
     - profile_picture: (STRING) Path to doctor's profile picture
 
+    Relationship Attributes:
+    - specialty_list: (LIST) Normalized specialties, kept in sync with the specialties column
+
     Backref Attributes:
     - queue: (DB.MODEL) Backwards reference defined in Queue model
     '''
@@ -50,6 +90,8 @@ class Doctor(db.Model):
     phone = db.Column(db.String(100), nullable=True)
     profile_picture = db.Column(db.String(255), nullable=True)  # URL or path to profile pic
 
+    specialty_list = db.relationship('Specialty', secondary=doctor_specialty, backref=db.backref('doctors', lazy=True))
+
     def __repr__(self):
         return f"<Doctor {self.name} - {self.specialties}>"
     
@@ -62,12 +104,20 @@ class Queue(db.Model):
     - id: (INT) Primary key ID of the queue
     - doctor_id: (INT) Foreign key referencing the associated doctor
     - total_patients: (INT) Number of patients currently in the queue
-    - estimated_wait_time: (STRING) Total estimated wait time for the queue
+    - last_seq: (INT) Monotonic ticket counter, the sequence number handed to the most recent entry
+    - last_served_at: (DATETIME) When the last patient was called in, null if nobody was left waiting then
+    - avg_consult_minutes: (FLOAT) Moving average of the doctor's consultation length, persisted periodically
+    - consult_variance: (FLOAT) Moving variance of the consultation length
+    - consult_samples: (INT) Number of consultations the average has been built from
     """
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, unique=True)
     total_patients = db.Column(db.Integer, default=0)
-    estimated_wait_time = db.Column(db.String(50), nullable=True)
+    last_seq = db.Column(db.Integer, nullable=False, default=0)
+    last_served_at = db.Column(db.DateTime, nullable=True)
+    avg_consult_minutes = db.Column(db.Float, nullable=True)
+    consult_variance = db.Column(db.Float, nullable=True)
+    consult_samples = db.Column(db.Integer, nullable=True, default=0)
 
     # Establish relationship with Doctor, adding backwards reference in Doctors model (adding queue attribute)
     doctor = db.relationship('Doctor', backref=db.backref('queue', uselist=False))
@@ -84,14 +134,34 @@ class QueueEntry(db.Model):
     - id: (INT) Primary key ID of the queue entry
     - queue_id: (INT) Foreign key referencing the associated queue
     - patient_id: (INT) Foreign key referencing the patient
-    - position: (INT) Position of the patient in the queue
-    - status: (STRING) Status of the patient in the queue (e.g., "waiting", "in_consultation")
+    - seq: (INT) Immutable ticket number within the queue
+    - priority: (INT) Triage priority, 0 for routine up to 3 for emergencies
+    - sort_key: (INT) Immutable place in line, the ticket number moved forward by the priority's boost,
+      the patient's position is derived from it
+    - status: (STRING) Status of the patient in the queue (e.g., "waiting", "served")
+    - served_at: (DATETIME) When the patient was called in, null while waiting
     """
     id = db.Column(db.Integer, primary_key=True)
     queue_id = db.Column(db.Integer, db.ForeignKey('queue.id'), nullable=False)
     patient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    position = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    sort_key = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String(20), default="waiting")
+    served_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # A patient can only be waiting once per queue, enforced by the database so concurrent joins cannot race
+        db.Index(
+            'uq_queue_entry_waiting_patient', 'queue_id', 'patient_id',
+            unique=True,
+            sqlite_where=db.text("status = 'waiting'"),
+            postgresql_where=db.text("status = 'waiting'")
+        ),
+        # Serves the head-of-queue and queue listing lookups in triage order, ties broken by ticket
+        db.Index('ix_queue_entry_queue_status_sort_key', 'queue_id', 'status', 'sort_key', 'seq'),
+        db.Index('ix_queue_entry_patient_id', 'patient_id'),
+    )
 
     # Establish relationships
     queue = db.relationship('Queue', backref=db.backref('entries', lazy=True))
@@ -121,6 +191,17 @@ class Slot(db.Model):
     patient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     slot_type = db.Column(db.String(20), default='appointment')
 
+    __table_args__ = (
+        # Serves the per-doctor availability range scan ordered by start time
+        db.Index('ix_slot_doctor_available_start', 'doctor_id', 'is_available', 'start_time'),
+        # Most slots are unbooked, so only index the ones that belong to a patient
+        db.Index(
+            'ix_slot_patient_id', 'patient_id',
+            sqlite_where=db.text("patient_id IS NOT NULL"),
+            postgresql_where=db.text("patient_id IS NOT NULL")
+        ),
+    )
+
     # Relationships
     doctor = db.relationship('Doctor', backref=db.backref('slots', lazy=True))
     patient = db.relationship('User', backref=db.backref('appointments', lazy=True))
@@ -128,3 +209,80 @@ class Slot(db.Model):
     def __repr__(self):
         return f"<Slot for Doctor ID {self.doctor_id}>"
 
+
+
+class SlotArchive(db.Model):
+    """
+    Slots that ended before the retention window, moved out of Slot by the archive job.
+
+    Same columns as Slot plus when the row was archived. Rows keep their original IDs and
+    have no foreign keys, so history stays intact whatever later happens to the live rows.
+
+    Attributes:
+    - id: (INT) ID the slot had in Slot
+    - doctor_id: (INT) ID of the doctor
+    - start_time: (DATETIME) Start time of the slot
+    - end_time: (DATETIME) End time of the slot
+    - is_available: (BOOL) Whether the slot was still unbooked
+    - patient_id: (INT) ID of the patient who booked it, null if nobody did
+    - slot_type: (STRING) Either 'walk_in' or 'appointment'
+    - archived_at: (DATETIME) When the slot was archived
+    """
+    __tablename__ = 'slot_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    doctor_id = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    is_available = db.Column(db.Boolean)
+    patient_id = db.Column(db.Integer, nullable=True)
+    slot_type = db.Column(db.String(20))
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Serves reports over a doctor's past calendar and a patient's appointment history
+        db.Index('ix_slot_archive_doctor_start', 'doctor_id', 'start_time'),
+        db.Index('ix_slot_archive_patient_id', 'patient_id'),
+    )
+
+    def __repr__(self):
+        return f"<Archived Slot for Doctor ID {self.doctor_id}>"
+
+
+class QueueEntryArchive(db.Model):
+    """
+    Finished queue entries older than the retention window, moved out of QueueEntry by the archive job.
+
+    Same columns as QueueEntry plus when the row was archived, with the original IDs and no foreign keys.
+
+    Attributes:
+    - id: (INT) ID the entry had in QueueEntry
+    - queue_id: (INT) ID of the queue
+    - patient_id: (INT) ID of the patient
+    - seq: (INT) Ticket number within the queue
+    - priority: (INT) Triage priority
+    - sort_key: (INT) Place in line
+    - status: (STRING) Final status of the entry, e.g. "served"
+    - served_at: (DATETIME) When the patient was called in, null for entries from before it was recorded
+    - archived_at: (DATETIME) When the entry was archived
+    """
+    __tablename__ = 'queue_entry_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    queue_id = db.Column(db.Integer, nullable=False)
+    patient_id = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    priority = db.Column(db.Integer, nullable=False)
+    sort_key = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20))
+    served_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Serves reports over a queue's history and a patient's visits
+        db.Index('ix_queue_entry_archive_queue_served', 'queue_id', 'served_at'),
+        db.Index('ix_queue_entry_archive_patient_id', 'patient_id'),
+    )
+
+    def __repr__(self):
+        return f"<Archived QueueEntry Patient ID {self.patient_id} in Queue {self.queue_id}>"
@@ -1,27 +1,48 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.models import User, Doctor, Queue, QueueEntry, Slot
+from app.models import User, Doctor, Slot
 from app.database import db
 from typing import *
-from app.utils.utils import create_error_response, create_success_response, fetch_all_doctors, validate_phone_number
+from app.utils.utils import create_error_response, create_success_response, fetch_all_doctors, validate_phone_number, find_user_by_ssn
 from http import HTTPStatus
 from werkzeug.exceptions import BadRequest
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+from sqlalchemy import select, insert
+from app.utils.availability import availability
+from app.utils.schedule_utils import parse_weekly_rules, parse_breaks, expand_schedule, drop_overlaps, chunked
+from app.utils.queue_cache import queue_cache
+from app.utils.patient_import import detect_format, import_patients, read_records, IMPORT_FORMATS
+from app.utils.pagination import parse_page_args, wants_ndjson, keyset_page, page_response, ndjson_response
+from app.utils.serialization import USER_SCHEMA, SLOT_SCHEMA
+import io
+import time
 
 api = Blueprint('dev_api', __name__)
 
+# Rows inserted per transaction by the bulk endpoints
+SLOT_INSERT_CHUNK_SIZE = 5000
+SLOT_TYPES = ('appointment', 'walk_in')
+
 @api.route('/get/users', methods=['GET'])
 def get_users():
     """
-    Endpoint to get all users from the database.
+    Endpoint to get the users in the database, a page at a time.
+
+    Query parameters:
+        after (int): Only return users with a greater ID, taken from the previous page's Link header
+        limit (int): Page size, 500 by default
+        format (str): "ndjson" to stream every user after the cursor as newline delimited JSON instead
 
     Returns:
-        JSON response containing list of doctors with their details:
+        JSON response containing list of users with their details, ordered by ID, with a
+        Link header to the next page if there is one:
             {
                 "status": "success",
-                "data": [
+                "response": [
                     {
                         "id": int,
                         "name": str,
+                        "ssn": str,
                         "phone": str,
                         "checkin_status": bool
                     },
@@ -30,21 +51,63 @@ def get_users():
             }
     """
     try:
-        users = User.query.all()
-        
-        users_data = [{
-            "id": user.id,
-            "name": user.name,
-            "ssn": user.ssn,
-            "phone": user.phone,
-            "checkin_status": user.checkin_status
-        } for user in users]
-        
-        return create_success_response(
-            users_data,
-            HTTPStatus.OK
+        after, limit = parse_page_args()
+        statement = USER_SCHEMA.select()
+
+        if wants_ndjson():
+            return ndjson_response(statement, User.id, after, USER_SCHEMA.dump)
+
+        rows, next_cursor = keyset_page(statement, User.id, after, limit)
+        return page_response(USER_SCHEMA.dump_all(rows), next_cursor, limit)
+
+    except BadRequest as e:
+        return create_error_response(
+            str(e),
+            HTTPStatus.BAD_REQUEST
         )
 
+
+@api.route('/import/users', methods=['POST'])
+def import_users():
+    """
+    Endpoint to register patients in bulk from a CSV or NDJSON file.
+
+    The file is either uploaded as the "file" field of a multipart form or sent as the raw
+    request body. CSV files need an ssn,name,phone header row, NDJSON files have one
+    {"ssn": str, "name": str, "phone": str} object per line. The format is taken from
+    ?format=csv|ndjson, else from the file name or content type.
+
+    Rows that fail validation are reported and skipped, patients already registered are
+    skipped, and everything else is inserted in chunks.
+
+    Returns:
+    {
+        "status": "success",
+        "response": {
+            "imported": int,
+            "duplicates": int,
+            "failed": int,
+            "errors": [{"row": int, "error": str}, ...]   # The first 1000 failed rows
+        }
+    }
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+        else:
+            stream, fmt = request.stream, detect_format(content_type=request.mimetype)
+        fmt = request.args.get('format', fmt)
+        if fmt not in IMPORT_FORMATS:
+            raise BadRequest(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        report = import_patients(db.session, read_records(text, fmt))
+
+        return create_success_response(report.as_dict(), HTTPStatus.OK)
+
+    except UnicodeDecodeError:
+        return create_error_response("File must be UTF-8 encoded", HTTPStatus.BAD_REQUEST)
     except BadRequest as e:
         return create_error_response(
             str(e),
@@ -83,8 +146,7 @@ def add_user():
             raise BadRequest("Missing required fields")
         
         # Check for duplicate additions
-        user = User.query.filter_by(ssn=data['ssn']).all()
-        if len(user) > 0:
+        if find_user_by_ssn(data['ssn']) is not None:
             raise BadRequest("User with this SSN already exists")
         
         try:
@@ -207,29 +269,12 @@ def view_queue(doctor_id: int):
     }
     """
     try:
-        queue = Queue.query.filter_by(doctor_id=doctor_id).first()
-
-        if not queue:
-            return create_success_response(
-                [],
-                HTTPStatus.OK
-            )
-
-        entries = QueueEntry.query.filter_by(
-            queue_id=queue.id,
-            status="waiting"
-        ).order_by(QueueEntry.position).all()
-
-        queue_data = {
-            "total_patients": queue.total_patients,
-            "current_queue": [{
-                "position": entry.position,
-                "patient_id": entry.patient_id,
-                "status": entry.status
-            } for entry in entries]
-        }
-
-        return create_success_response(queue_data, HTTPStatus.OK)
+        # Served from the same cached snapshot as /api/queue/status, already serialized
+        return current_app.response_class(
+            queue_cache.views(db.session, doctor_id).dev_view,
+            status=HTTPStatus.OK,
+            mimetype='application/json'
+        )
 
     except Exception as e:
         return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -239,28 +284,12 @@ def view_queue(doctor_id: int):
 def next_patient_status(doctor_id):
     """Get the status of the next patient in the queue"""
     try:
-        queue = Queue.query.filter_by(doctor_id=doctor_id).first()
-        if not queue:
-            return create_error_response(
-                "Queue not found for this doctor",
-                HTTPStatus.NOT_FOUND
-            )
-
-        next_patient = QueueEntry.query.filter_by(
-            queue_id=queue.id,
-            status="waiting"
-        ).order_by(QueueEntry.position).first()
-
-        if not next_patient:
-            return create_error_response(
-                "No patients in queue",
-                HTTPStatus.NOT_FOUND
-            )
-
-        return create_success_response({
-            "next_patient_id": next_patient.patient_id,
-            "position": next_patient.position
-        }, HTTPStatus.OK)
+        views = queue_cache.views(db.session, doctor_id)
+        return current_app.response_class(
+            views.next_status,
+            status=views.next_status_code,
+            mimetype='application/json'
+        )
 
     except Exception as e:
         return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -327,6 +356,7 @@ def add_slot():
 
         db.session.add(new_slot)
         db.session.commit()
+        availability.add(new_slot.doctor_id, new_slot.id, new_slot.start_time, new_slot.end_time)
 
         return create_success_response({
             "slot_id": new_slot.id,
@@ -343,29 +373,179 @@ def add_slot():
         return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
+@api.route('/post/slots/schedule', methods=['POST'])
+def add_slot_schedule():
+    """
+    Endpoint to generate doctors' slots in bulk from a weekly schedule template.
+
+    Expected JSON format:
+    {
+        "doctor_ids": [int],           # Doctors the schedule applies to
+        "start_date": str,             # ISO format date "YYYY-MM-DD"
+        "end_date": str,               # ISO format date "YYYY-MM-DD", inclusive
+        "slot_minutes": int,           # Length of each slot
+        "weekly": [                    # Working windows, weekday 0 is Monday
+            {"weekdays": [int], "start": "HH:MM", "end": "HH:MM"},
+            ...
+        ],
+        "breaks": [                    # Optional: daily breaks, on every weekday unless "weekdays" is given
+            {"start": "HH:MM", "end": "HH:MM", "weekdays": [int]},
+            ...
+        ],
+        "slot_type": str               # Optional: "appointment" or "walk_in", defaults to "appointment"
+    }
+
+    Slots overlapping an existing slot of the same doctor are skipped.
+
+    Returns:
+    {
+        "status": "success",
+        "response": {
+            "doctors": int,            # Number of doctors scheduled
+            "slots_created": int,      # Number of slots inserted
+            "overlaps_skipped": int,   # Number of generated slots dropped for overlapping
+            "elapsed_ms": float        # Time taken to expand, validate and insert
+        }
+    }
+    """
+
+    try:
+        started = time.perf_counter()
+        data = request.get_json()
+
+        if not data or not isinstance(data, dict):
+            raise BadRequest("Invalid JSON payload")
+
+        required_fields = ['doctor_ids', 'start_date', 'end_date', 'slot_minutes', 'weekly']
+        if not all(field in data for field in required_fields):
+            raise BadRequest("Missing required fields")
+
+        doctor_ids = data['doctor_ids']
+        if not isinstance(doctor_ids, list) or not doctor_ids:
+            raise BadRequest("doctor_ids must be a non-empty list")
+        # bool is an int too, but True isn't a doctor ID
+        if not all(isinstance(doctor_id, int) and not isinstance(doctor_id, bool) for doctor_id in doctor_ids):
+            raise BadRequest("doctor_ids must only contain integer IDs")
+
+        slot_minutes = data['slot_minutes']
+        if not isinstance(slot_minutes, int) or slot_minutes <= 0:
+            raise BadRequest("slot_minutes must be a positive integer")
+
+        slot_type = data.get('slot_type', 'appointment')
+        if slot_type not in SLOT_TYPES:
+            raise BadRequest(f"slot_type must be one of {', '.join(SLOT_TYPES)}")
+
+        try:
+            start_date = date.fromisoformat(data['start_date'])
+            end_date = date.fromisoformat(data['end_date'])
+        except (TypeError, ValueError):
+            raise BadRequest("Invalid date format. Use ISO format (YYYY-MM-DD)")
+
+        if end_date < start_date:
+            raise BadRequest("End date must not be before start date")
+
+        try:
+            windows = parse_weekly_rules(data['weekly'])
+            breaks = parse_breaks(data.get('breaks', []))
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+        # Verify every doctor exists with a single query
+        found = set(db.session.execute(
+            select(Doctor.id).where(Doctor.id.in_(doctor_ids))
+        ).scalars())
+        missing = sorted(set(doctor_ids) - found)
+        if missing:
+            return create_error_response(f"Doctors not found: {missing}", HTTPStatus.NOT_FOUND)
+
+        generated = expand_schedule(start_date, end_date, windows, breaks, slot_minutes)
+        range_start = datetime.combine(start_date, datetime.min.time())
+        range_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+
+        # Load the existing slots of every doctor in the range at once, already sorted for the overlap sweep
+        existing = defaultdict(list)
+        for doctor_id, slot_start, slot_end in db.session.execute(
+            select(Slot.doctor_id, Slot.start_time, Slot.end_time)
+            .where(
+                Slot.doctor_id.in_(found),
+                Slot.start_time < range_end,
+                Slot.end_time > range_start
+            )
+            .order_by(Slot.doctor_id, Slot.start_time)
+        ):
+            existing[doctor_id].append((slot_start, slot_end))
+
+        rows = []
+        overlaps_skipped = 0
+        for doctor_id in sorted(found):
+            accepted, dropped = drop_overlaps(generated, existing[doctor_id])
+            overlaps_skipped += dropped
+            rows.extend({
+                "doctor_id": doctor_id,
+                "start_time": slot_start,
+                "end_time": slot_end,
+                "is_available": True,
+                "slot_type": slot_type
+            } for slot_start, slot_end in accepted)
+
+        # Insert with executemany in chunked transactions so a large schedule doesn't hold one huge write lock
+        for chunk in chunked(rows, SLOT_INSERT_CHUNK_SIZE):
+            db.session.execute(insert(Slot), chunk)
+            db.session.commit()
+
+        # Bulk inserts don't hand back slot IDs, so let the availability calendar reload lazily
+        if rows:
+            availability.invalidate()
+
+        return create_success_response({
+            "doctors": len(found),
+            "slots_created": len(rows),
+            "overlaps_skipped": overlaps_skipped,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }, HTTPStatus.CREATED)
+
+    except BadRequest as e:
+        return create_error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Slot schedule generation failed")
+        return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
 @api.route('/get/slots', methods=['GET'])
 def get_slots():
     """
-    Get all the slots in the database.
+    Get the slots in the database, a page at a time.
+
+    Takes the same after, limit and format query parameters as /get/users.
+
+    Returns:
+        JSON response containing list of slots ordered by ID, with ISO 8601 times:
+            [
+                {
+                    "slot_id": int,
+                    "doctor_id": int,
+                    "start_time": str,
+                    "end_time": str,
+                    "slot_type": str
+                },
+                ...
+            ]
     """
     try:
-        slots = Slot.query.all()
+        after, limit = parse_page_args()
+        statement = SLOT_SCHEMA.select()
+        slot_id = SLOT_SCHEMA.column('slot_id')
 
-        slots_data = [{
-            "slot_id": slot.id,
-            "doctor_id": slot.doctor_id,
-            "start_time": slot.start_time,
-            "end_time": slot.end_time,
-            "slot_type": slot.slot_type
-        } for slot in slots]
+        if wants_ndjson():
+            return ndjson_response(statement, slot_id, after, SLOT_SCHEMA.dump)
 
-        return create_success_response(
-            slots_data,
-            HTTPStatus.OK
-        )
+        rows, next_cursor = keyset_page(statement, slot_id, after, limit)
+        return page_response(SLOT_SCHEMA.dump_all(rows), next_cursor, limit)
 
     except BadRequest as e:
         return create_error_response(
             str(e),
             HTTPStatus.BAD_REQUEST
         )
+
@@ -1,14 +1,58 @@
-from flask import request, jsonify
-from flask_restful import Resource
-from flask_httpauth import HTTPTokenAuth
-from flask_jwt_extended import jwt_required
-from flask_api import status
-from backend.models import Doctor, db
-from backend.utils import create_success_response, create_error_response
+from flask import Blueprint, request
+from app.models import Doctor, Specialty, doctor_specialty
+from app.database import db
+from app.utils.utils import create_success_response, create_error_response, fetch_all_doctors
+from app.utils.specialty_utils import normalize_specialty
+from app.utils.serialization import DOCTOR_SCHEMA
 from http import HTTPStatus
+from werkzeug.exceptions import BadRequest
+
+api = Blueprint('doctor_api', __name__)
+
+@api.route('', methods=['GET'])
+def get_doctors():
+    """
+    Get the doctors in the system, optionally only those practising a specialty.
+
+    Query parameters:
+        specialty (str): Optional, e.g. "Cardiology". Matched case-insensitively on whole specialty names.
+
+    Returns:
+        JSON response containing list of doctors with their details:
+        {
+            "status": "success",
+            "response": [
+                {
+                    "id": int,
+                    "name": str,
+                    "specialties": str,
+                    "is_available": bool
+                },
+                ...
+            ]
+        }
+    """
+    specialty = request.args.get('specialty', '').strip()
+    if not specialty:
+        return fetch_all_doctors()
+
+    try:
+        # Resolved through the specialty key and the doctor_specialty index rather than scanning the CSV column
+        doctors = db.session.execute(
+            DOCTOR_SCHEMA.select().join(
+                doctor_specialty, doctor_specialty.c.doctor_id == Doctor.id
+            ).join(
+                Specialty, Specialty.id == doctor_specialty.c.specialty_id
+            ).where(
+                Specialty.key == normalize_specialty(specialty)
+            ).order_by(Doctor.id)
+        )
+
+        return create_success_response(DOCTOR_SCHEMA.dump_all(doctors), HTTPStatus.OK)
+
+    except Exception as e:
+        return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
-api = Resource()
-auth = HTTPTokenAuth()
 
 @api.route('/availability/<int:doctor_id>', methods=['PUT'])
 def update_availability(doctor_id):
@@ -23,6 +67,12 @@ def update_availability(doctor_id):
     try:
         data = request.get_json()
 
+        if not data or not isinstance(data, dict):
+            raise BadRequest("Invalid JSON payload")
+
+        if not isinstance(data.get('is_available'), bool):
+            raise BadRequest("Missing or invalid field: is_available")
+
         doctor = Doctor.query.filter_by(id=doctor_id).first()
         if not doctor:
             return create_error_response("Doctor not found", HTTPStatus.NOT_FOUND)
@@ -32,6 +82,8 @@ def update_availability(doctor_id):
         return create_success_response({
             "doctor_id": doctor_id,
             "is_available": doctor.is_available
-        }, status.HTTP_200_OK)
+        }, HTTPStatus.OK)
+    except BadRequest as e:
+        return create_error_response(str(e), HTTPStatus.BAD_REQUEST)
     except Exception as e:
-        return create_error_response(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.models import User, Doctor
+from app.models import User
 from app.database import db
 from typing import *
-from app.utils.utils import query_builder, validate_phone_number, create_error_response, create_success_response, fetch_all_doctors
+from app.utils.utils import find_user_by_ssn, validate_phone_number, create_error_response, create_success_response, fetch_all_doctors
 from http import HTTPStatus
 from werkzeug.exceptions import BadRequest
-from app.utils.jwt_utils import generate_token
+from app.utils.jwt_utils import generate_token, get_bearer_token, revoke_token, token_required
+from app.utils.symptom_matcher import match_doctor
 
 api = Blueprint('patient_api', __name__)
     
@@ -41,21 +42,13 @@ def authenticate_patient():
 
         ssn = data['ssn']  
         
-        query = query_builder({"ssn": ssn}, "all", "ssn")
+        user = find_user_by_ssn(ssn)
 
-        if len(query) > 1:
-            return create_error_response(
-                "Multiple users found with the same SSN",
-                HTTPStatus.INTERNAL_SERVER_ERROR
-            )
-        
-        if len(query) == 0:
+        if user is None:
             return create_error_response(
                 "User not registered",
                 HTTPStatus.NOT_FOUND
             )
-        
-        user = query[0]
 
         try:
             phone = validate_phone_number(data['phone'])
@@ -97,6 +90,19 @@ def authenticate_patient():
         )
 
 
+@api.route('/logout', methods=['POST'])
+@token_required
+def logout_patient():
+    """
+    Revoke the token the request was made with, ending the kiosk session.
+
+    Returns:
+        JSON response with a success message
+    """
+    revoke_token(get_bearer_token())
+    return create_success_response("Logged out", HTTPStatus.OK)
+
+
 @api.route('/checkin', methods=['POST'])
 def checkin():
     """
@@ -105,16 +111,12 @@ def checkin():
 
     data = request.json
 
-    query = query_builder(data, "all", "ssn")
-
-    # Error handling to make sure there's only one user with the ssn
-    if len(query) > 1:
-        return jsonify({"error": "Multiple users found with the same SSN"}), 409 # Conflict
-    elif len(query) == 0:
+    # SSNs are unique, so this is a single indexed lookup
+    user = find_user_by_ssn(data['ssn'])
+    if user is None:
         # TODO: Redirect to registration
         return jsonify({"error": "User not registered"}), 400
     
-    user = query[0]
     if user.checkin_status:
         return jsonify({"message": "User already checked in"}), 200
     
@@ -137,7 +139,8 @@ def fetch_doctors():
                 {
                     "id": int,
                     "name": str,
-                    "specialties": str
+                    "specialties": str,
+                    "is_available": bool
                 },
                 ...
             ]
@@ -162,14 +165,16 @@ def patient_symptom_match():
         "data": {
             "doctor_id": int,      # Unique identifier of the matched doctor
             "doctor_name": str,     # Full name of the matched doctor
-            "doctor_specialties": str # Doctor's areas of specialization
+            "doctor_specialties": str, # Doctor's areas of specialization
+            "matched_specialties": [str], # Specialties the symptoms pointed to that the doctor practises
+            "score": float          # How strongly the symptoms matched the doctor's specialties
         }
     }
 
-    TODO: Implement sophisticated symptom-to-doctor matching algorithm based on specialties
+    Doctors are ranked by how well their specialties match the symptoms, then by
+    availability, then by the shortest queue.
     """
     
-    # Brute force implementation - returns the first doctor
     try:
         data = request.get_json()
 
@@ -179,20 +184,24 @@ def patient_symptom_match():
         required_field = 'symptoms'
         if not required_field in data:
             raise BadRequest("Missing required field")
+
+        if not isinstance(data[required_field], str):
+            raise BadRequest("Symptoms must be a string")
         
-        # Get the first doctor from the database
-        doctor = Doctor.query.first()
+        match = match_doctor(data[required_field])
 
-        if not doctor:
+        if not match:
             return create_error_response(
                 "No doctors available in the system",
                 HTTPStatus.NOT_FOUND
             )
         
         return create_success_response({
-            "doctor_id": doctor.id,
-            "doctor_name": doctor.name,
-            "doctor_specialties": doctor.specialties
+            "doctor_id": match.doctor.id,
+            "doctor_name": match.doctor.name,
+            "doctor_specialties": match.doctor.specialties,
+            "matched_specialties": match.matched_specialties,
+            "score": match.score
         }, HTTPStatus.OK)
     
     except BadRequest as e:
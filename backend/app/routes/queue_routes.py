@@ -1,10 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response
 from app.models import User, Doctor, Queue, QueueEntry
 from app.database import db
 from app.utils.utils import create_error_response, create_success_response
 from http import HTTPStatus
 from werkzeug.exceptions import BadRequest
 from app.utils.jwt_utils import token_required
+from app.utils.queue_utils import get_or_create_queue_id, enqueue_patient, dequeue_patient, queue_snapshot, queue_length, parse_priority, AlreadyInQueueError, QueueEmptyError
+from app.utils.pubsub import pubsub, queue_channel
+from app.utils.queue_cache import queue_cache
+from app.utils.wait_estimator import wait_estimator
+from app.utils.queue_balancer import choose_doctor, record_queue_length
+from sqlalchemy import select
+import json
 
 api = Blueprint('queue_api', __name__)
 
@@ -17,13 +24,18 @@ def join_queue():
     Expected JSON payload:
     {
         "doctor_id": int,
-        "patient_id": int
+        "patient_id": int,
+        "priority": int | str   # Optional triage priority, "routine" (0) by default, see TRIAGE_PRIORITIES
     }
     """
     try:
         data = request.get_json()
         if not data or not all(k in data for k in ["doctor_id", "patient_id"]):
             raise BadRequest("Missing required fields")
+        try:
+            priority = parse_priority(data.get('priority'))
+        except ValueError as e:
+            raise BadRequest(str(e))
 
         # Verify doctor and patient exist
         doctor = Doctor.query.filter_by(id=data['doctor_id']).first()
@@ -35,41 +47,37 @@ def join_queue():
             return create_error_response("Patient not found", HTTPStatus.NOT_FOUND)
 
         # Looks to see if we need to instantiate a Queue class for the Doctor
-        queue = db.session.query(Queue).filter_by(doctor_id=doctor.id).first()
-        if not queue:
-            queue = Queue(doctor_id=doctor.id)
-            db.session.add(queue)
-            db.session.flush()
-
-        # Check to see if the patient is already in the queue
-        existing_entry = db.session.query(QueueEntry).filter_by(
-            queue_id=queue.id,
-            patient_id=patient.id,
-            status="waiting"
-        ).first()
-        if existing_entry:
+        queue_id = get_or_create_queue_id(db.session, doctor.id)
+
+        try:
+            seq, position = enqueue_patient(db.session, queue_id, patient.id, priority)
+        except AlreadyInQueueError as e:
             return create_error_response(
-                "Patient already in queue",
+                str(e),
                 HTTPStatus.CONFLICT
             )
 
-        position = queue.total_patients + 1
-        new_entry = QueueEntry(
-            queue_id=queue.id,
-            patient_id=patient.id,
-            position=position,
-            status="waiting"
-        )
-        
-        queue.total_patients += 1
-        queue.estimated_wait_time = f"{position * 15} minutes"
+        queue_cache.invalidate(doctor.id)
+
+        # Routine patients join at the back, priority patients may have been slotted in ahead of others
+        total_patients = position if not priority else queue_length(db.session, queue_id)
+        record_queue_length(doctor.id, queue_id, total_patients)
 
-        db.session.add(new_entry)
-        db.session.commit()
+        # The patient waits for the ones ahead of them, the same count /status estimates a newcomer's wait from
+        wait = wait_estimator.estimate(db.session, queue_id, position - 1).as_dict()
+
+        pubsub.publish(queue_channel(doctor.id), {
+            "type": "join",
+            "seq": seq,
+            "position": position,
+            "patient_id": patient.id,
+            "total_patients": total_patients,
+            **wait
+        })
 
         return create_success_response({
             "position": position,
-            "estimated_wait": queue.estimated_wait_time
+            **wait
         }, HTTPStatus.CREATED)
 
     except BadRequest as e:
@@ -84,6 +92,103 @@ def join_queue():
             HTTPStatus.INTERNAL_SERVER_ERROR
         )
 
+@api.route('/join-best', methods=['POST'])
+@token_required
+def join_best_queue():
+    """
+    Add a walk-in patient to the queue of whichever available doctor of a specialty will see them soonest.
+
+    Expected JSON payload:
+    {
+        "specialty": str,
+        "patient_id": int,
+        "priority": int | str   # Optional triage priority, as for /join
+    }
+
+    Returns:
+        JSON response containing:
+        {
+            "doctor_id": int,                        # ID of the doctor whose queue was joined
+            "doctor_name": str,                      # Name of that doctor
+            "position": int,                         # Position of the patient in the queue
+            "estimated_wait_minutes": float,         # Estimated wait until the patient is seen
+            "estimated_wait_range": [float, float]   # 90% confidence band around the estimate, in minutes
+        }
+    """
+    try:
+        data = request.get_json()
+        if not data or not all(k in data for k in ["specialty", "patient_id"]):
+            raise BadRequest("Missing required fields")
+        if not isinstance(data['specialty'], str) or not data['specialty'].strip():
+            raise BadRequest("specialty must be a non-empty string")
+        try:
+            priority = parse_priority(data.get('priority'))
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+        patient = User.query.filter_by(id=data['patient_id']).first()
+        if not patient:
+            return create_error_response("Patient not found", HTTPStatus.NOT_FOUND)
+
+        # A walk-in waits in one queue at a time, whichever doctor it belongs to
+        already_waiting = db.session.execute(
+            select(QueueEntry.id).where(QueueEntry.patient_id == patient.id, QueueEntry.status == "waiting").limit(1)
+        ).first()
+        if already_waiting:
+            return create_error_response("Patient already in queue", HTTPStatus.CONFLICT)
+
+        doctor_id = choose_doctor(data['specialty'])
+        if doctor_id is None:
+            return create_error_response(
+                "No available doctor for this specialty",
+                HTTPStatus.NOT_FOUND
+            )
+        doctor = db.session.get(Doctor, doctor_id)
+
+        queue_id = get_or_create_queue_id(db.session, doctor_id)
+        try:
+            seq, position = enqueue_patient(db.session, queue_id, patient.id, priority)
+        except AlreadyInQueueError as e:
+            # Release the place reserved by choose_doctor
+            record_queue_length(doctor_id, queue_id, queue_length(db.session, queue_id))
+            return create_error_response(
+                str(e),
+                HTTPStatus.CONFLICT
+            )
+
+        queue_cache.invalidate(doctor_id)
+
+        total_patients = position if not priority else queue_length(db.session, queue_id)
+        record_queue_length(doctor_id, queue_id, total_patients)
+        wait = wait_estimator.estimate(db.session, queue_id, position - 1).as_dict()
+
+        pubsub.publish(queue_channel(doctor_id), {
+            "type": "join",
+            "seq": seq,
+            "position": position,
+            "patient_id": patient.id,
+            "total_patients": total_patients,
+            **wait
+        })
+
+        return create_success_response({
+            "doctor_id": doctor_id,
+            "doctor_name": doctor.name,
+            "position": position,
+            **wait
+        }, HTTPStatus.CREATED)
+
+    except BadRequest as e:
+        return create_error_response(
+            str(e),
+            HTTPStatus.BAD_REQUEST
+        )
+    except Exception as e:
+        return create_error_response(
+            str(e),
+            HTTPStatus.INTERNAL_SERVER_ERROR
+        )
+
 @api.route('/status/<int:doctor_id>', methods=['GET'])
 def get_queue_status(doctor_id):
     """
@@ -93,11 +198,13 @@ def get_queue_status(doctor_id):
         JSON response containing:
         {
             "total_patients": int,          # Total number of patients in the queue
-            "estimated_wait_time": str,     # Estimated wait time for the queue
+            "estimated_wait_minutes": float,  # Estimated wait for a patient joining now
+            "estimated_wait_range": [float, float],  # 90% confidence band around the estimate, in minutes
             "current_queue": [               # List of patients currently in the queue
                 {
                     "position": int,        # Position of the patient in the queue
                     "patient_id": int,     # ID of the patient
+                    "priority": int,       # Triage priority of the patient
                     "status": str          # Status of the patient in the queue
                 },
                 ...
@@ -106,31 +213,11 @@ def get_queue_status(doctor_id):
     """
 
     try:
-        queue = db.session.query(Queue).filter_by(doctor_id=doctor_id).first()
-        if not queue:
-            return create_success_response(
-                [],
-                HTTPStatus.OK
-            )
-
-        entries = db.session.query(QueueEntry).filter_by(
-            queue_id=queue.id,
-            status="waiting"
-        ).order_by(QueueEntry.position).all()
-
-        queue_data = {
-            "total_patients": queue.total_patients,
-            "estimated_wait_time": queue.estimated_wait_time,
-            "current_queue": [{
-                "position": entry.position,
-                "patient_id": entry.patient_id,
-                "status": entry.status
-            } for entry in entries]
-        }
-
-        return create_success_response(
-            queue_data, 
-            HTTPStatus.OK
+        # Served from the snapshot cache, already serialized, until a join or next changes the queue
+        return current_app.response_class(
+            queue_cache.views(db.session, doctor_id).status,
+            status=HTTPStatus.OK,
+            mimetype='application/json'
         )
 
     except Exception as e:
@@ -158,39 +245,80 @@ def process_next_patient(doctor_id):
                 HTTPStatus.NOT_FOUND
             )
 
-        next_patient = db.session.query(QueueEntry).filter_by(
-            queue_id=queue.id,
-            status="waiting"
-        ).order_by(QueueEntry.position).first()
-
-        if not next_patient:
+        try:
+            patient_id, remaining_patients = dequeue_patient(db.session, queue.id)
+        except QueueEmptyError as e:
             return create_error_response(
-                "No patients in queue",
+                str(e),
                 HTTPStatus.NOT_FOUND
             )
 
-        db.session.delete(next_patient)
-        queue.total_patients -= 1
-
-        remaining_patients = db.session.query(QueueEntry).filter_by(
-            queue_id=queue.id,
-            status="waiting"
-        ).all()
-        
-        for patient in remaining_patients:
-            patient.position -= 1
+        queue_cache.invalidate(doctor_id)
+        record_queue_length(doctor_id, queue.id, remaining_patients)
 
-        if queue.total_patients > 0:
-            queue.estimated_wait_time = f"{queue.total_patients * 15} minutes"
-        else:
-            queue.estimated_wait_time = "0 minutes"
-
-        db.session.commit()
+        pubsub.publish(queue_channel(doctor_id), {
+            "type": "next",
+            "patient_id": patient_id,
+            "total_patients": remaining_patients,
+            **wait_estimator.estimate(db.session, queue.id, remaining_patients).as_dict()
+        })
 
         return create_success_response({
-            "patient_id": next_patient.patient_id,
-            "remaining_patients": queue.total_patients
+            "patient_id": patient_id,
+            "remaining_patients": remaining_patients
         }, HTTPStatus.OK)
 
     except Exception as e:
         return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+
+@api.route('/stream/<int:doctor_id>', methods=['GET'])
+def stream_queue(doctor_id):
+    """
+    Stream changes to a doctor's queue as Server-Sent Events.
+
+    The first event is a snapshot of the queue, in the same format as /status. After that
+    only changes are pushed, so an idle display costs no database queries:
+        event: join  {"seq": int, "position": int, "patient_id": int, "total_patients": int,
+                      "estimated_wait_minutes": float, "estimated_wait_range": [float, float]}
+        event: next  {"patient_id": int, "total_patients": int,
+                      "estimated_wait_minutes": float, "estimated_wait_range": [float, float]}
+        event: resync  {}  # The display fell behind and should reconnect for a fresh snapshot
+
+    A comment line is sent every QUEUE_STREAM_HEARTBEAT_SECONDS to keep idle connections open.
+    """
+
+    # Subscribe before taking the snapshot so no change can slip in between the two
+    subscription = pubsub.subscribe(queue_channel(doctor_id))
+    try:
+        snapshot = queue_snapshot(db.session, doctor_id) or {
+            "total_patients": 0,
+            "estimated_wait_minutes": 0.0,
+            "estimated_wait_range": [0.0, 0.0],
+            "current_queue": []
+        }
+    except Exception as e:
+        pubsub.unsubscribe(subscription)
+        return create_error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    heartbeat = current_app.config.get('QUEUE_STREAM_HEARTBEAT_SECONDS', 15)
+
+    def generate():
+        try:
+            yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                message = subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                data = json.loads(message)
+                event_type = data.pop("type")
+                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            pubsub.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
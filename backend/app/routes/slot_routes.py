@@ -1,10 +1,14 @@
 from flask import Blueprint, request
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from app.models import Slot, Doctor, User
 from app.database import db
 from app.utils.utils import create_error_response, create_success_response
+from app.utils.specialty_utils import doctor_ids_with_specialty
 from http import HTTPStatus
 from app.utils.jwt_utils import token_required
+from app.utils.availability import availability, utc_now
+from app.utils.slot_utils import reserve_slot, reserve_slots, SlotNotFoundError, SlotUnavailableError
+from werkzeug.exceptions import BadRequest
 
 api = Blueprint('slot_api', __name__)
 
@@ -23,22 +27,17 @@ def get_available_slots(doctor_id: int):
     """
 
     try:
-        start_date = datetime.now(timezone.utc)
+        start_date = utc_now()
         end_date = start_date + timedelta(days=7)
 
-        available_slots = Slot.query.filter(
-            Slot.doctor_id == doctor_id,
-            Slot.is_available == True,
-            Slot.start_time.between(start_date, end_date)
-        ).order_by(Slot.start_time).all()
-
+        # Served from the in-memory availability calendar instead of a range scan per request
         slots_data = [{
-            "id": slot.id,
-            "start_time": slot.start_time.isoformat(),
-            "end_time": slot.end_time.isoformat(),
-            "is_available": slot.is_available,
-            "doctor_id": slot.doctor_id
-        } for slot in available_slots]
+            "id": slot_id,
+            "start_time": start_time,
+            "end_time": end_time,
+            "is_available": True,
+            "doctor_id": doctor_id
+        } for start_time, slot_id, end_time in availability.free_slots(doctor_id, start_date, end_date)]
 
         return create_success_response(
             slots_data, 
@@ -51,6 +50,53 @@ def get_available_slots(doctor_id: int):
             HTTPStatus.INTERNAL_SERVER_ERROR
         )
 
+@api.route('/next', methods=['GET'])
+@token_required
+def get_next_available_slot():
+    """
+    Get the earliest free slot across every doctor with a given specialty
+
+    Query parameters:
+        specialty (str): The specialty to search, e.g. "Cardiology"
+
+    Return JSON Payload:
+    {
+        "id": int,
+        "start_time": isoformat str datetime,
+        "end_time": isoformat str datetime,
+        "is_available": bool,
+        "doctor_id": int
+    }
+    """
+
+    try:
+        specialty = request.args.get('specialty', '').strip()
+        if not specialty:
+            return create_error_response("Missing required parameter: specialty", HTTPStatus.BAD_REQUEST)
+
+        doctor_ids = doctor_ids_with_specialty(specialty)
+        found = availability.next_free_slot(doctor_ids, utc_now())
+        if found is None:
+            return create_error_response(
+                "No free slots for this specialty",
+                HTTPStatus.NOT_FOUND
+            )
+
+        doctor_id, (start_time, slot_id, end_time) = found
+        return create_success_response({
+            "id": slot_id,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "is_available": True,
+            "doctor_id": doctor_id
+        }, HTTPStatus.OK)
+
+    except Exception as e:
+        return create_error_response(
+            str(e), 
+            HTTPStatus.INTERNAL_SERVER_ERROR
+        )
+
 @api.route('/book', methods=['POST'])
 @token_required
 def book_slot():
@@ -73,23 +119,18 @@ def book_slot():
                 HTTPStatus.FORBIDDEN
             )
             
-        slot = Slot.query.filter_by(id=data['slot_id']).first()
-        if not slot:
-            return create_error_response("Slot not found", HTTPStatus.NOT_FOUND)
-        
-        if not slot.is_available:
-            return create_error_response(
-                "Slot is no longer available",
-                HTTPStatus.CONFLICT
-            )
+        try:
+            start_time, doctor_id = reserve_slot(db.session, data['slot_id'], data['patient_id'])
+        except SlotNotFoundError as e:
+            return create_error_response(str(e), HTTPStatus.NOT_FOUND)
+        except SlotUnavailableError as e:
+            return create_error_response(str(e), HTTPStatus.CONFLICT)
 
-        slot.is_available = False
-        slot.patient_id = data['patient_id']
-        db.session.commit()
+        availability.remove(doctor_id, data['slot_id'], start_time)
 
         return create_success_response({
-            "appointment_time": slot.start_time.isoformat(),
-            "doctor_id": slot.doctor_id
+            "appointment_time": start_time.isoformat(),
+            "doctor_id": doctor_id
         }, HTTPStatus.OK)
 
     except Exception as e:
@@ -99,6 +140,82 @@ def book_slot():
         )
     
 
+@api.route('/book/batch', methods=['POST'])
+@token_required
+def book_slots_batch():
+    """
+    Book several slots for a patient at once, e.g. for a family visit. Either every slot is booked or none are.
+
+    Expected JSON payload:
+    {
+        "slot_ids": [int],
+        "patient_id": int
+    }
+
+    Returns:
+    On success (HTTP 200):
+    {
+        "status": "success",
+        "response": [
+            {
+                "slot_id": int,
+                "appointment_time": isoformat str datetime,
+                "doctor_id": int
+            },
+            ...
+        ]
+    }
+    On conflict (HTTP 409), with nothing booked:
+    {
+        "status": "error",
+        "response": {
+            "message": str,
+            "unavailable_slot_ids": [int]
+        }
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data, dict) or not all(k in data for k in ["slot_ids", "patient_id"]):
+            raise BadRequest("Missing required fields")
+
+        slot_ids = data['slot_ids']
+        if not isinstance(slot_ids, list) or not slot_ids or not all(isinstance(slot_id, int) for slot_id in slot_ids):
+            raise BadRequest("slot_ids must be a non-empty list of integers")
+
+        # Verify that the authenticated user is booking for themselves
+        if str(data['patient_id']) != str(request.user['user_id']):
+            return create_error_response(
+                "Unauthorized to book for another patient",
+                HTTPStatus.FORBIDDEN
+            )
+
+        try:
+            booked = reserve_slots(db.session, slot_ids, data['patient_id'])
+        except SlotUnavailableError as e:
+            return create_error_response({
+                "message": str(e),
+                "unavailable_slot_ids": e.slot_ids
+            }, HTTPStatus.CONFLICT)
+
+        for slot_id, start_time, doctor_id in booked:
+            availability.remove(doctor_id, slot_id, start_time)
+
+        return create_success_response([{
+            "slot_id": slot_id,
+            "appointment_time": start_time.isoformat(),
+            "doctor_id": doctor_id
+        } for slot_id, start_time, doctor_id in booked], HTTPStatus.OK)
+
+    except BadRequest as e:
+        return create_error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return create_error_response(
+            str(e), 
+            HTTPStatus.INTERNAL_SERVER_ERROR
+        )
+
+
 @api.route('/delete/slot/<int:slot_id>', methods=['DELETE'])
 def delete_slot(slot_id):
     """
@@ -120,6 +237,7 @@ def delete_slot(slot_id):
         # Delete the slot
         db.session.delete(slot)
         db.session.commit()
+        availability.remove(slot.doctor_id, slot.id, slot.start_time)
 
         return create_success_response(
             "Slot deleted successfully",
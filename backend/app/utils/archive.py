@@ -0,0 +1,178 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.database import db
+from app.models import QueueEntry, QueueEntryArchive, Slot, SlotArchive
+from app.utils.availability import utc_now
+
+# Rows moved per transaction, so the live tables are never locked for long
+ARCHIVE_CHUNK_SIZE = 5000
+ARCHIVE_RETENTION_DAYS = 30
+
+
+class ArchiveReport:
+    """Rows moved to each archive table, whether every eligible row was reached, and how long it took."""
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.complete = True
+        self.elapsed = 0.0
+
+    def as_dict(self) -> dict:
+        return {"rows": dict(self.rows), "complete": self.complete, "elapsed_seconds": round(self.elapsed, 2)}
+
+
+def _archive_table(session: Session, model, archive_model, condition, chunk_size: int, archived_at: datetime) -> int:
+    """
+    Moves the rows of model matching condition into archive_model, chunk_size rows per transaction.
+
+    Rows are walked in ID order and each chunk is copied with INSERT ... SELECT and deleted
+    in the same transaction, so a row is always in exactly one of the two tables. Rows locked
+    by a request are skipped rather than waited on (PostgreSQL), and picked up by a later run.
+    """
+    table = model.__table__
+    # The newest row always stays: SQLite hands out the highest remaining ID + 1 to the next
+    # insert, so deleting it would let a new row take an ID that is already archived
+    newest = session.execute(select(func.max(table.c.id))).scalar()
+    if newest is None:
+        return 0
+
+    columns = [column.name for column in table.columns]
+    moved = 0
+    last_id = 0
+    while True:
+        ids = session.execute(
+            select(table.c.id)
+            .where(table.c.id > last_id, table.c.id < newest, condition)
+            .order_by(table.c.id)
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            return moved
+
+        session.execute(insert(archive_model).from_select(
+            [*columns, 'archived_at'],
+            select(*table.columns, literal(archived_at, DateTime)).where(table.c.id.in_(ids))
+        ))
+        session.execute(delete(table).where(table.c.id.in_(ids)))
+        session.commit()
+        moved += len(ids)
+        last_id = ids[-1]
+
+
+def optimize_tables(engine: Engine, tables, vacuum: bool = False) -> None:
+    """
+    Refreshes the planner statistics of tables after rows were moved out of them, and
+    reclaims the freed space when vacuum is set.
+
+    SQLite can only VACUUM the whole database file, which rewrites it and holds a write
+    lock for the duration, so it is best left to an off-peak run. PostgreSQL vacuums each table.
+    """
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if conn.dialect.name == 'postgresql':
+            for table in tables:
+                conn.exec_driver_sql(f"{'VACUUM ANALYZE' if vacuum else 'ANALYZE'} {table}")
+        elif conn.dialect.name == 'sqlite':
+            if vacuum:
+                conn.exec_driver_sql("VACUUM")
+            for table in tables:
+                conn.exec_driver_sql(f"ANALYZE {table}")
+
+
+def run_archive(session: Session, retention_days: int = ARCHIVE_RETENTION_DAYS, chunk_size: int = ARCHIVE_CHUNK_SIZE,
+                vacuum: bool = False, now: Optional[datetime] = None) -> ArchiveReport:
+    """
+    Moves slots and finished queue entries older than the retention window into the archive tables.
+
+    Slots are archived once they ended more than retention_days ago, booked or not. Queue entries
+    are archived once they were served more than retention_days ago, waiting entries never are.
+    Entries finished before served_at was recorded have no time to go by and are archived on the
+    first run. The live tables stay small for the kiosk's queries while the history remains
+    queryable from slot_archive and queue_entry_archive. The tables are analyzed afterwards.
+
+    A run interrupted by a busy database stops where it got to, every chunk already moved stays
+    moved and the next run carries on from there.
+
+    Parameters:
+    - session (Session): Session to run in, committed after every chunk.
+    - retention_days (int): Days of history kept in the live tables.
+    - chunk_size (int): Rows moved per transaction.
+    - vacuum (bool): Whether to also reclaim the freed space, see optimize_tables.
+    - now (Optional[datetime]): Time the retention window ends at, the current UTC time by default.
+
+    Returns:
+    - ArchiveReport: The rows moved to each archive table and the time taken.
+    """
+    started = time.perf_counter()
+    archived_at = now or utc_now()
+    cutoff = archived_at - timedelta(days=retention_days)
+    report = ArchiveReport()
+
+    jobs = (
+        (Slot, SlotArchive, Slot.end_time < cutoff),
+        (QueueEntry, QueueEntryArchive,
+         (QueueEntry.status != "waiting") & ((QueueEntry.served_at < cutoff) | QueueEntry.served_at.is_(None))),
+    )
+    for model, archive_model, condition in jobs:
+        report.rows[archive_model.__tablename__] = 0
+    try:
+        for model, archive_model, condition in jobs:
+            report.rows[archive_model.__tablename__] = _archive_table(
+                session, model, archive_model, condition, chunk_size, archived_at
+            )
+    except OperationalError:
+        session.rollback()
+        report.complete = False
+
+    if report.complete:
+        optimize_tables(session.get_bind(), [model.__tablename__ for model, _, _ in jobs], vacuum)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+class ArchiveScheduler:
+    """
+    Runs the archive job in a background thread of the app every ARCHIVE_INTERVAL_HOURS.
+
+    Off unless ARCHIVE_INTERVAL_HOURS is set. The CLI command, `flask archive`, run from cron
+    does the same job out of process. Every gunicorn worker would start its own scheduler, so
+    with several workers prefer the CLI, runs overlapping on SQLite only wait on each other.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def init_app(self, app) -> None:
+        interval_hours = app.config.get('ARCHIVE_INTERVAL_HOURS') or 0
+        if interval_hours <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(app, interval_hours * 3600), name='archive-scheduler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, app, interval: float) -> None:
+        while not self._stop.wait(interval):
+            with app.app_context():
+                try:
+                    report = run_archive(
+                        db.session,
+                        retention_days=app.config.get('ARCHIVE_RETENTION_DAYS', ARCHIVE_RETENTION_DAYS),
+                        vacuum=app.config.get('ARCHIVE_VACUUM', False)
+                    )
+                    app.logger.info("Archive run: %s", report.as_dict())
+                except Exception:
+                    app.logger.exception("Archive run failed")
+
+
+archive_scheduler = ArchiveScheduler()
@@ -0,0 +1,131 @@
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from app.database import db
+from app.models import Slot
+from app.utils.versioned_cache import BuildStamp, reset_on_ddl
+
+# How far ahead of now free slots are indexed
+AVAILABILITY_WINDOW_DAYS = 30
+AVAILABILITY_MAX_AGE_SECONDS = 60
+
+# (start_time, slot_id, end_time), ordered by start time
+FreeSlot = Tuple[datetime, int, datetime]
+
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, matching how slot times are stored."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class AvailabilityIndex:
+    """
+    In-memory calendar of every doctor's free slots over a rolling window.
+
+    Each doctor has a list of free slots sorted by start time, so a range lookup is two
+    binary searches plus a slice, O(log n + k), instead of a range scan and one dict per row.
+    The index is built lazily on first use, patched in place when slots are added, booked
+    or deleted, and rebuilt when the window has rolled forward or the index has aged out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Optional[Dict[int, List[FreeSlot]]] = None
+        self._horizon: Optional[datetime] = None
+        self.stamp = BuildStamp(AVAILABILITY_MAX_AGE_SECONDS)
+
+    def invalidate(self) -> None:
+        """Drops the index so the next read rebuilds it from the database."""
+        with self._lock:
+            self._slots = None
+            self.stamp.invalidate()
+
+    def _ensure_loaded(self, until: datetime) -> Dict[int, List[FreeSlot]]:
+        slots = self._slots
+        if slots is not None and until <= self._horizon and not self.stamp.is_stale():
+            return slots
+
+        now = utc_now()
+        horizon = max(until, now + timedelta(days=AVAILABILITY_WINDOW_DAYS))
+        rows = db.session.execute(
+            select(Slot.doctor_id, Slot.start_time, Slot.id, Slot.end_time)
+            .where(Slot.is_available == True, Slot.start_time.between(now, horizon))
+            .order_by(Slot.doctor_id, Slot.start_time, Slot.id)
+        )
+
+        slots = {}
+        for doctor_id, start_time, slot_id, end_time in rows:
+            slots.setdefault(doctor_id, []).append((start_time, slot_id, end_time))
+
+        with self._lock:
+            self._slots = slots
+            self._horizon = horizon
+            self.stamp.mark_built()
+        return slots
+
+    def add(self, doctor_id: int, slot_id: int, start_time: datetime, end_time: datetime) -> None:
+        """Records a newly created free slot."""
+        with self._lock:
+            if self._slots is None or start_time > self._horizon:
+                return
+            insort(self._slots.setdefault(doctor_id, []), (start_time, slot_id, end_time))
+
+    def remove(self, doctor_id: int, slot_id: int, start_time: datetime) -> None:
+        """Forgets a slot that was booked or deleted."""
+        with self._lock:
+            if self._slots is None:
+                return
+            doctor_slots = self._slots.get(doctor_id)
+            if not doctor_slots:
+                return
+            i = bisect_left(doctor_slots, (start_time, slot_id))
+            if i < len(doctor_slots) and doctor_slots[i][1] == slot_id:
+                del doctor_slots[i]
+
+    def free_slots(self, doctor_id: int, start: datetime, end: datetime) -> List[FreeSlot]:
+        """
+        Returns a doctor's free slots starting between start and end.
+
+        Parameters:
+        - doctor_id (int): ID of the doctor.
+        - start (datetime): Earliest start time, naive UTC.
+        - end (datetime): Latest start time, naive UTC.
+
+        Returns:
+        - List[FreeSlot]: The free (start_time, slot_id, end_time) slots ordered by start time.
+        """
+        slots = self._ensure_loaded(end)
+        with self._lock:
+            doctor_slots = slots.get(doctor_id, [])
+            lo = bisect_left(doctor_slots, (start,))
+            hi = bisect_right(doctor_slots, (end, sys.maxsize))
+            return doctor_slots[lo:hi]
+
+    def next_free_slot(self, doctor_ids: Iterable[int], after: datetime) -> Optional[Tuple[int, FreeSlot]]:
+        """
+        Returns the earliest free slot starting at or after a time across several doctors.
+
+        One binary search per doctor, O(d log n), instead of a slot scan per doctor.
+
+        Returns:
+        - Optional[Tuple[int, FreeSlot]]: The doctor's ID and their slot, or None if nobody has a free slot in the window.
+        """
+        slots = self._ensure_loaded(after)
+        best = None
+        with self._lock:
+            for doctor_id in doctor_ids:
+                doctor_slots = slots.get(doctor_id)
+                if not doctor_slots:
+                    continue
+                i = bisect_left(doctor_slots, (after,))
+                if i < len(doctor_slots) and (best is None or doctor_slots[i] < best[1]):
+                    best = (doctor_id, doctor_slots[i])
+        return best
+
+
+availability = AvailabilityIndex()
+
+reset_on_ddl(Slot.__table__, availability.invalidate)
@@ -0,0 +1,261 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+from flask import current_app
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+from app.models import User, Doctor, Queue, QueueEntry, Slot, Specialty, doctor_specialty
+from app.utils.availability import utc_now
+from app.utils.queue_utils import triage_sort_key
+from app.utils.specialty_utils import normalize_specialty
+from app.utils.ssn_utils import ssn_hasher
+
+# Rows sent per executemany, memory stays bounded by this however many rows are generated
+GENERATOR_CHUNK_SIZE = 10000
+# SQLite page cache while generating, in KiB. Patients arrive in random SSN hash order, and the
+# unique hash index stops thrashing the default 2 MiB cache once it has room to stay resident
+GENERATOR_SQLITE_CACHE_KIB = 256 * 1024
+
+# Specialties with how common they are among doctors, general medicine by far the most
+SPECIALTY_WEIGHTS = {
+    "General Medicine": 30, "Pediatrics": 10, "Gynecology": 8, "Orthopedics": 8, "Cardiology": 7,
+    "Dermatology": 6, "Otolaryngology": 5, "Ophthalmology": 5, "Neurology": 4, "Psychiatry": 4,
+    "Gastroenterology": 4, "Pulmonology": 3, "Endocrinology": 3, "Urology": 3,
+}
+
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Amit", "Ananya", "Arjun", "Deepa", "Divya", "Farhan", "Gaurav", "Isha", "Kabir",
+    "Kavya", "Meera", "Neha", "Nikhil", "Pooja", "Priya", "Rahul", "Riya", "Rohan", "Sanjay", "Sara",
+    "Sneha", "Tanvi", "Varun", "Vikram", "Zara", "James", "Maria", "David", "Linda", "Michael", "Susan",
+)
+LAST_NAMES = (
+    "Agarwal", "Bose", "Chopra", "Das", "Desai", "Gupta", "Iyer", "Joshi", "Kapoor", "Khan", "Kumar",
+    "Mehta", "Menon", "Nair", "Patel", "Rao", "Reddy", "Shah", "Sharma", "Singh", "Verma", "Brown",
+    "Garcia", "Johnson", "Miller", "Smith", "Williams",
+)
+
+# Triage priorities of walk-ins, mostly routine
+PRIORITY_WEIGHTS = {0: 85, 1: 8, 2: 5, 3: 2}
+
+# First SSN number handed out to generated patients and doctors, each ID maps to one number
+PATIENT_SSN_BASE = 100_000_000
+DOCTOR_SSN_BASE = 900_000_000
+
+
+class GeneratorSettings(NamedTuple):
+    doctors: int = 100
+    patients: int = 10000
+    # Days of slots generated per doctor, starting today, and slots per working day from 9:00
+    slot_days: int = 14
+    slots_per_day: int = 32
+    slot_minutes: int = 15
+    # Share of the slots already booked by a patient
+    booked_ratio: float = 0.3
+    # Average number of patients waiting per queue, and served patients of each queue's history
+    queue_depth: int = 10
+    served_per_queue: int = 20
+    seed: int = 42
+
+
+class GenerationReport:
+    """Rows written to each table and how long it took."""
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def as_dict(self) -> dict:
+        return {"rows": dict(self.rows), "elapsed_seconds": round(self.elapsed, 2)}
+
+
+def format_ssn(number: int) -> str:
+    """Formats a nine digit number as an SSN, e.g. 100000042 as "100-00-0042"."""
+    digits = f"{number:09d}"
+    return f"{digits[:3]}-{digits[3:5]}-{digits[5:]}"
+
+
+def patient_ssn(patient_id: int) -> str:
+    """Returns the SSN the generator gives a patient, so benchmarks can log generated patients in."""
+    return format_ssn(PATIENT_SSN_BASE + patient_id)
+
+
+def _phone(rng: random.Random) -> str:
+    # Ten digit mobile numbers starting 6 to 9, the form parse_phone_number stores
+    return str(rng.randrange(6 * 10 ** 9, 10 ** 10))
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _next_id(conn: Connection, column) -> int:
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def _write(conn: Connection, table, rows: Iterable[dict], chunk_size: int) -> int:
+    """Inserts rows an executemany of chunk_size at a time, returning how many were written."""
+    written = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return written
+        conn.execute(insert(table), chunk)
+        written += len(chunk)
+
+
+def _specialty_ids(conn: Connection) -> Dict[str, int]:
+    """Returns the ID of every generated specialty, creating the ones that don't exist yet."""
+    existing = dict(conn.execute(select(Specialty.key, Specialty.id)).all())
+    missing = [{"name": name, "key": normalize_specialty(name)} for name in SPECIALTY_WEIGHTS
+               if normalize_specialty(name) not in existing]
+    if missing:
+        conn.execute(insert(Specialty), missing)
+        existing = dict(conn.execute(select(Specialty.key, Specialty.id)).all())
+    return {name: existing[normalize_specialty(name)] for name in SPECIALTY_WEIGHTS}
+
+
+def generate(conn: Connection, settings: GeneratorSettings = GeneratorSettings(), ssn_key: Optional[str] = None,
+             chunk_size: int = GENERATOR_CHUNK_SIZE, now: Optional[datetime] = None) -> GenerationReport:
+    """
+    Generates a synthetic hospital: doctors with specialties, patients, slot calendars and queues.
+
+    Every row comes from one random generator seeded with settings.seed, so the same settings
+    produce the same data. Rows are built lazily and written with Core executemany inserts a
+    chunk at a time, bypassing the ORM, so millions of rows take seconds and memory stays
+    bounded by the chunk size. IDs continue after the highest existing ID of each table.
+    doctor_specialty is filled in directly, as the ORM hook that maintains it doesn't see Core inserts.
+
+    Parameters:
+    - conn (Connection): Connection to write through, the caller owns the transaction.
+    - settings (GeneratorSettings): Size and shape of the hospital.
+    - ssn_key (Optional[str]): Key of the SSN hashes, the app's SSN_HASH_KEY when omitted.
+    - chunk_size (int): Rows per executemany.
+    - now (Optional[datetime]): Time the calendars start from and queue history ends at, the current UTC time by default.
+
+    Returns:
+    - GenerationReport: The rows written to each table and the time taken.
+    """
+    if conn.dialect.name != 'sqlite':
+        return _generate(conn, settings, ssn_key, chunk_size, now)
+
+    cache_size = conn.exec_driver_sql("PRAGMA cache_size").scalar()
+    conn.exec_driver_sql(f"PRAGMA cache_size=-{GENERATOR_SQLITE_CACHE_KIB}")
+    try:
+        return _generate(conn, settings, ssn_key, chunk_size, now)
+    finally:
+        # The connection goes back to the pool afterwards, it shouldn't keep the large cache
+        conn.exec_driver_sql(f"PRAGMA cache_size={int(cache_size)}")
+
+
+def _generate(conn: Connection, settings: GeneratorSettings, ssn_key: Optional[str], chunk_size: int,
+              now: Optional[datetime]) -> GenerationReport:
+    started = time.perf_counter()
+    rng = random.Random(settings.seed)
+    now = now or utc_now()
+    report = GenerationReport()
+    # Keyed once rather than per patient, there may be millions of them
+    hash_ssn = ssn_hasher(ssn_key or current_app.config['SSN_HASH_KEY'])
+
+    first_patient = _next_id(conn, User.id)
+    first_doctor = _next_id(conn, Doctor.id)
+    first_queue = _next_id(conn, Queue.id)
+    patient_ids = range(first_patient, first_patient + settings.patients)
+    doctor_ids = range(first_doctor, first_doctor + settings.doctors)
+
+    def patients() -> Iterator[dict]:
+        for patient_id in patient_ids:
+            ssn = patient_ssn(patient_id)
+            yield {
+                "id": patient_id, "ssn": ssn, "ssn_hash": hash_ssn(ssn), "name": _name(rng),
+                "phone": _phone(rng), "checkin_status": False
+            }
+
+    report.rows["user"] = _write(conn, User, patients(), chunk_size)
+
+    specialty_ids = _specialty_ids(conn)
+    names, weights = list(SPECIALTY_WEIGHTS), list(SPECIALTY_WEIGHTS.values())
+    links: List[dict] = []
+
+    def doctors() -> Iterator[dict]:
+        for doctor_id in doctor_ids:
+            # One specialty, sometimes two
+            specialties = list(dict.fromkeys(rng.choices(names, weights, k=1 if rng.random() < 0.8 else 2)))
+            links.extend({"doctor_id": doctor_id, "specialty_id": specialty_ids[name]} for name in specialties)
+            yield {
+                "id": doctor_id, "ssn": format_ssn(DOCTOR_SSN_BASE + doctor_id), "name": f"Dr. {_name(rng)}",
+                "specialties": ", ".join(specialties), "experience": rng.randint(1, 35),
+                "opd_rate": float(rng.randrange(200, 2001, 50)), "is_available": rng.random() < 0.9,
+                "phone": _phone(rng)
+            }
+
+    report.rows["doctor"] = _write(conn, Doctor, doctors(), chunk_size)
+    report.rows["doctor_specialty"] = _write(conn, doctor_specialty, links, chunk_size)
+
+    day_start = now.replace(hour=9, minute=0, second=0, microsecond=0)
+    length = timedelta(minutes=settings.slot_minutes)
+
+    def slots() -> Iterator[dict]:
+        for doctor_id in doctor_ids:
+            for day in range(settings.slot_days):
+                start = day_start + timedelta(days=day)
+                for _ in range(settings.slots_per_day):
+                    booked = rng.random() < settings.booked_ratio
+                    yield {
+                        "doctor_id": doctor_id, "start_time": start, "end_time": start + length,
+                        "is_available": not booked,
+                        "patient_id": rng.choice(patient_ids) if booked and patient_ids else None,
+                        "slot_type": "appointment"
+                    }
+                    start += length
+
+    report.rows["slot"] = _write(conn, Slot, slots(), chunk_size)
+
+    # A patient waits in at most one queue, so waiting patients are drawn without replacement
+    depths = [rng.randint(0, 2 * settings.queue_depth) for _ in doctor_ids]
+    waiting = rng.sample(patient_ids, min(sum(depths), len(patient_ids)))
+    served = settings.served_per_queue if patient_ids else 0
+    queues: List[dict] = []
+    taken = 0
+    for queue_id, doctor_id, depth in zip(range(first_queue, first_queue + settings.doctors), doctor_ids, depths):
+        waiting_count = min(depth, len(waiting) - taken)
+        taken += waiting_count
+        consult_minutes = rng.uniform(8, 25)
+        queues.append({
+            "id": queue_id, "doctor_id": doctor_id, "total_patients": waiting_count, "last_seq": served + waiting_count,
+            # Only set while patients are waiting, as dequeue_patient leaves it
+            "last_served_at": now - timedelta(minutes=rng.uniform(0, consult_minutes)) if served and waiting_count else None,
+            "avg_consult_minutes": consult_minutes, "consult_variance": (consult_minutes / 3) ** 2,
+            "consult_samples": served
+        })
+    report.rows["queue"] = _write(conn, Queue, queues, chunk_size)
+
+    priorities, priority_weights = list(PRIORITY_WEIGHTS), list(PRIORITY_WEIGHTS.values())
+
+    def entries() -> Iterator[dict]:
+        waiting_patients = iter(waiting)
+        for queue in queues:
+            consult_minutes = queue["avg_consult_minutes"]
+            served_at = now - timedelta(minutes=consult_minutes * (served + 1))
+            seq = 0
+            for _ in range(served):
+                seq += 1
+                served_at += timedelta(minutes=max(1.0, rng.gauss(consult_minutes, consult_minutes / 3)))
+                yield {
+                    "queue_id": queue["id"], "patient_id": rng.choice(patient_ids), "seq": seq, "priority": 0,
+                    "sort_key": seq, "status": "served", "served_at": served_at
+                }
+            for patient_id in islice(waiting_patients, queue["total_patients"]):
+                seq += 1
+                priority = rng.choices(priorities, priority_weights)[0]
+                yield {
+                    "queue_id": queue["id"], "patient_id": patient_id, "seq": seq, "priority": priority,
+                    "sort_key": triage_sort_key(seq, priority), "status": "waiting", "served_at": None
+                }
+
+    report.rows["queue_entry"] = _write(conn, QueueEntry, entries(), chunk_size)
+
+    report.elapsed = time.perf_counter() - started
+    return report
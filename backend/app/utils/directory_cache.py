@@ -0,0 +1,104 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, NamedTuple, Optional
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import Doctor
+from app.utils.serialization import dumps
+from app.utils.versioned_cache import BuildStamp, VersionCounter, rebuild_if_stale, reset_on_ddl
+
+DIRECTORY_MAX_AGE_SECONDS = 30
+
+
+class _Directory(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+
+_rebuild_lock = threading.Lock()
+_roster = VersionCounter()
+_stamp = BuildStamp(DIRECTORY_MAX_AGE_SECONDS)
+_directory: Optional[_Directory] = None
+
+
+def bump_roster_version() -> None:
+    """Marks the cached doctor directory as stale so the next read rebuilds it."""
+    _roster.bump()
+
+
+def roster_version() -> int:
+    """Returns the current roster version, which changes whenever a doctor is added, changed or removed."""
+    return _roster.value
+
+
+def _build_directory(load_doctors: Callable[[], List[dict]], version: int) -> None:
+    global _directory
+    body = dumps({
+        "status": "success",
+        "response": load_doctors()
+    })
+    # The ETag is derived from the content so every worker hands out the same one for the same roster
+    etag = hashlib.sha1(body).hexdigest()
+    previous = _directory
+    if previous is not None and previous.etag == etag:
+        last_modified = previous.last_modified
+    else:
+        # New content, possibly changed by another worker, so it must never look as old as what a
+        # client already holds. Last-Modified has second precision, hence the step past the previous one
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        if previous is not None and last_modified <= previous.last_modified:
+            last_modified = previous.last_modified + timedelta(seconds=1)
+    _directory = _Directory(body=body, etag=etag, last_modified=last_modified)
+    _stamp.mark_built(version)
+
+
+def directory_response(load_doctors: Callable[[], List[dict]]):
+    """
+    Returns the serialized doctor directory as a conditional response.
+
+    The JSON body is built once per roster version and reused for every poll after that.
+    The response carries an ETag and Last-Modified, and a request with a matching
+    If-None-Match or If-Modified-Since is answered with 304 Not Modified and no body.
+
+    Parameters:
+    - load_doctors (Callable[[], List[dict]]): Loads the doctors from the database, only called on a cache miss.
+
+    Returns:
+    - Response: The directory response, or a 304 response if the client's copy is current.
+    """
+    if _stamp.is_stale(_roster.value):
+        with _rebuild_lock:
+            # Checked again under the lock, another thread may have rebuilt it meanwhile
+            rebuild_if_stale(_stamp, roster_version, lambda version: _build_directory(load_doctors, version))
+    directory = _directory
+
+    response = current_app.response_class(directory.body, status=200, mimetype='application/json')
+    response.set_etag(directory.etag)
+    response.last_modified = directory.last_modified
+    # Clients may keep the directory but have to revalidate it on every poll
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_roster_changes(session, flush_context):
+    if any(isinstance(obj, Doctor) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['roster_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    # Bumping only once the transaction is visible stops a concurrent reader from caching the old roster under the new version
+    if session.info.pop('roster_changed', False):
+        bump_roster_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('roster_changed', None)
+
+
+reset_on_ddl(Doctor.__table__, bump_roster_version)
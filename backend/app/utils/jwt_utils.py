@@ -1,6 +1,11 @@
 import jwt
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from functools import wraps
+from typing import Dict, Optional, Tuple
 from flask import request, jsonify
 from dotenv import load_dotenv
 import os
@@ -11,7 +16,122 @@ load_dotenv()
 # Get the JWT secret key from environment variable
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
 JWT_ALGORITHM = 'HS256'
-JWT_EXPIRATION_DELTA = timedelta(days=1)  # Token expires in 1 day, TODO add backend validation to check for expired jwt token
+JWT_EXPIRATION_DELTA = timedelta(days=1)  # Token expires in 1 day
+# Maximum number of verified tokens remembered per process
+JWT_CACHE_SIZE = 10000
+
+
+class TokenError(Exception):
+    """Base class for tokens that can't be used to authenticate."""
+
+
+class TokenExpiredError(TokenError):
+    """Raised when a token is past its expiry time."""
+
+    def __init__(self):
+        super().__init__('Token has expired')
+
+
+class InvalidTokenError(TokenError):
+    """Raised when a token is malformed or its signature doesn't verify."""
+
+    def __init__(self):
+        super().__init__('Invalid token')
+
+
+class TokenRevokedError(TokenError):
+    """Raised when a token has been revoked before its expiry time."""
+
+    def __init__(self):
+        super().__init__('Token has been revoked')
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified token -> claims.
+
+    Kiosks send the same token on every call of a session, so once a token's signature has
+    been verified its claims are kept until the token's own exp, and later requests skip the
+    decode and HMAC check. Only tokens that verified are cached, so garbage tokens can't
+    push real sessions out.
+    """
+
+    def __init__(self, max_size: int = JWT_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Returns the cached claims of a token, or None if it isn't cached.
+
+        Raises:
+        - TokenExpiredError: If the token is cached but has expired since.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[token]
+                raise TokenExpiredError()
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        """Caches the claims of a verified token until its exp, evicting the least recently used token if full."""
+        expires_at = claims.get('exp')
+        if self.max_size <= 0 or expires_at is None:
+            return
+        with self._lock:
+            self._entries[token] = (claims, float(expires_at))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationList:
+    """
+    In-memory set of revoked tokens, each kept only until it would have expired anyway.
+
+    The list lives in the process that revoked the token, so with several workers a revoked
+    token is only refused by the worker that handled the revocation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, float] = {}
+
+    def revoke(self, token: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            # Forget revocations of tokens that have expired on their own
+            for revoked, expiry in list(self._revoked.items()):
+                if expiry <= now:
+                    del self._revoked[revoked]
+            self._revoked[token] = expires_at
+
+    def __contains__(self, token: str) -> bool:
+        # Unlocked read, a single dict lookup is atomic
+        return token in self._revoked
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+
+
+token_cache = TokenCache()
+revoked_tokens = RevocationList()
+
 
 def generate_token(user_id: int, ssn: str) -> str:
     """Generate a JWT token for a user."""
@@ -19,41 +139,88 @@ def generate_token(user_id: int, ssn: str) -> str:
         'user_id': user_id,
         'ssn': ssn,
         'exp': datetime.now(timezone.utc) + JWT_EXPIRATION_DELTA,
-        'iat': datetime.now(timezone.utc)
+        'iat': datetime.now(timezone.utc),
+        # Keeps tokens issued in the same second distinct, so revoking one doesn't revoke the other
+        'jti': secrets.token_hex(8)
     }
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
-def decode_token(token: str) -> dict:
-    """Decode a JWT token and return the payload."""
+
+def verify_token(token: str) -> dict:
+    """
+    Fully decodes and verifies a JWT token, bypassing the cache.
+
+    Raises:
+    - TokenExpiredError: If the token has expired.
+    - InvalidTokenError: If the token is malformed or its signature doesn't verify.
+    """
     try:
         return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
-        raise Exception('Token has expired')
+        raise TokenExpiredError()
     except jwt.InvalidTokenError:
-        raise Exception('Invalid token')
+        raise InvalidTokenError()
+
+
+def decode_token(token: str) -> dict:
+    """
+    Decode a JWT token and return the payload, served from the verified token cache when possible.
+
+    Parameters:
+    - token (str): The encoded JWT token.
+
+    Returns:
+    - dict: The token's claims.
+
+    Raises:
+    - TokenRevokedError: If the token has been revoked.
+    - TokenExpiredError: If the token has expired.
+    - InvalidTokenError: If the token is malformed or its signature doesn't verify.
+    """
+    if token in revoked_tokens:
+        raise TokenRevokedError()
+
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = verify_token(token)
+        token_cache.put(token, claims)
+    return claims
+
+
+def revoke_token(token: str) -> None:
+    """
+    Revokes a token so it is refused until it expires.
+
+    Raises:
+    - TokenError: If the token isn't valid to begin with.
+    """
+    claims = decode_token(token)
+    revoked_tokens.revoke(token, float(claims['exp']))
+    token_cache.discard(token)
+
+
+def get_bearer_token() -> Optional[str]:
+    """Returns the token from the request's Authorization header, if any."""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header[7:] or None
+    return None
+
 
 def token_required(f):
     """Decorator to protect routes that require authentication."""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Get token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-        
+        token = get_bearer_token()
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
-        
+
         try:
-            # Decode token and get user info
-            payload = decode_token(token)
-            # Add user info to request context
-            request.user = payload
-        except Exception as e:
+            # Claims are shared with the cache, so copy them before handing them to the route
+            request.user = dict(decode_token(token))
+        except TokenError as e:
             return jsonify({'message': str(e)}), 401
-        
+
         return f(*args, **kwargs)
-    
-    return decorated 
\ No newline at end of file
+
+    return decorated
@@ -0,0 +1,277 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the statements-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+# A request running the same statement this many times is flagged as an N+1 pattern
+N_PLUS_ONE_THRESHOLD = 10
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Requests that matched no route share one label so bad URLs can't grow the series without bound
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+class Histogram:
+    """Fixed bucket histogram. Counts are kept per bucket and only made cumulative when exported."""
+
+    __slots__ = ('buckets', 'counts', 'total')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram') -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+
+
+class RequestStats:
+    """SQL activity of one sampled request, filled in by the cursor execute events."""
+
+    __slots__ = ('queries', 'db_seconds', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Counter = Counter()
+
+
+class _Shard:
+    """One thread's share of the metrics. Only its own thread writes to it, so updates need no lock."""
+
+    __slots__ = ('latency', 'requests', 'query_counts', 'queries', 'db_seconds', 'n_plus_one')
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Counter = Counter()
+        self.query_counts: Dict[str, Histogram] = {}
+        self.queries: Counter = Counter()
+        self.db_seconds: Counter = Counter()
+        self.n_plus_one: Counter = Counter()
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+
+class Metrics:
+    """
+    Request level performance metrics, exported in the Prometheus text format on /metrics.
+
+    Every request's latency is recorded in a per-endpoint histogram along with a count by
+    status code. A sampled share of requests, METRICS_SAMPLE_RATE, also has its SQL statements
+    counted and timed through the engine's cursor execute events, and is flagged when it runs
+    the same statement METRICS_N_PLUS_ONE_THRESHOLD times or more, the signature of an N+1
+    query loop. The statement is logged the first time an endpoint is flagged.
+
+    Each thread records into its own shard and the shards are only summed when /metrics is
+    scraped, so the request path takes no lock. Metrics are per process: with several gunicorn
+    workers each one reports its own share.
+    """
+
+    def __init__(self):
+        self.sample_rate = 1.0
+        self.n_plus_one_threshold = N_PLUS_ONE_THRESHOLD
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._flagged: set = set()
+        self._flagged_lock = threading.Lock()
+        self._app = None
+
+    def init_app(self, app) -> None:
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        self._app = app
+        self.sample_rate = app.config.get('METRICS_SAMPLE_RATE', 1.0)
+        self.n_plus_one_threshold = app.config.get('METRICS_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        # Teardown runs even when the view raised, so failing requests are recorded and their stats reset too
+        app.teardown_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _start_request(self) -> None:
+        request.environ['metrics.start'] = time.perf_counter()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        # Always set, so an unsampled request never inherits a previous request's stats on this thread
+        request.environ['metrics.token'] = _request_stats.set(RequestStats() if sampled else None)
+
+    def _record_status(self, response: Response) -> Response:
+        request.environ['metrics.status'] = response.status_code
+        return response
+
+    def _finish_request(self, exc: Optional[BaseException]) -> None:
+        start = request.environ.pop('metrics.start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        # A request that raised never got a response of its own, it was answered with a 500
+        status = 500 if exc is not None else request.environ.pop('metrics.status', 500)
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        shard = self._shard()
+
+        histogram = shard.latency.get((request.blueprint or '', endpoint))
+        if histogram is None:
+            histogram = shard.latency[(request.blueprint or '', endpoint)] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(elapsed)
+        shard.requests[(endpoint, status)] += 1
+
+        token = request.environ.pop('metrics.token', None)
+        if token is not None:
+            stats = _request_stats.get()
+            _request_stats.reset(token)
+            if stats is not None:
+                self._record_queries(shard, endpoint, stats)
+
+    def _record_queries(self, shard: _Shard, endpoint: str, stats: RequestStats) -> None:
+        histogram = shard.query_counts.get(endpoint)
+        if histogram is None:
+            histogram = shard.query_counts[endpoint] = Histogram(QUERY_COUNT_BUCKETS)
+        histogram.observe(stats.queries)
+        shard.queries[endpoint] += stats.queries
+        shard.db_seconds[endpoint] += stats.db_seconds
+
+        if stats.statements:
+            statement, count = stats.statements.most_common(1)[0]
+            if count >= self.n_plus_one_threshold:
+                shard.n_plus_one[endpoint] += 1
+                with self._flagged_lock:
+                    first = endpoint not in self._flagged
+                    self._flagged.add(endpoint)
+                if first:
+                    self._app.logger.warning(
+                        "Possible N+1 query in %s, statement ran %d times in one request: %s",
+                        endpoint, count, " ".join(statement.split())[:300]
+                    )
+
+    def reset(self) -> None:
+        """Zeroes every metric, for tests."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.__init__()
+        with self._flagged_lock:
+            self._flagged.clear()
+
+    def collect(self) -> _Shard:
+        """Sums every thread's shard into one snapshot."""
+        total = _Shard()
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, histogram in list(shard.latency.items()):
+                total.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).merge(histogram)
+            for key, histogram in list(shard.query_counts.items()):
+                total.query_counts.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).merge(histogram)
+            total.requests.update(dict(shard.requests))
+            total.queries.update(dict(shard.queries))
+            total.db_seconds.update(dict(shard.db_seconds))
+            total.n_plus_one.update(dict(shard.n_plus_one))
+        return total
+
+    def render(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        snapshot = self.collect()
+        lines: List[str] = []
+
+        _header(lines, 'kiosk_http_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+        for (blueprint, endpoint), histogram in sorted(snapshot.latency.items()):
+            _histogram(lines, 'kiosk_http_request_duration_seconds',
+                       {'blueprint': blueprint, 'endpoint': endpoint}, histogram)
+
+        _header(lines, 'kiosk_http_requests_total', 'counter', 'Requests by endpoint and status code.')
+        for (endpoint, status), count in sorted(snapshot.requests.items()):
+            lines.append(f'kiosk_http_requests_total{_labels({"endpoint": endpoint, "status": status})} {count}')
+
+        _header(lines, 'kiosk_db_statements_per_request', 'histogram', 'SQL statements run by each sampled request.')
+        for endpoint, histogram in sorted(snapshot.query_counts.items()):
+            _histogram(lines, 'kiosk_db_statements_per_request', {'endpoint': endpoint}, histogram)
+
+        _header(lines, 'kiosk_db_statements_total', 'counter', 'SQL statements run by sampled requests.')
+        for endpoint, count in sorted(snapshot.queries.items()):
+            lines.append(f'kiosk_db_statements_total{_labels({"endpoint": endpoint})} {count}')
+
+        _header(lines, 'kiosk_db_seconds_total', 'counter', 'Time spent executing SQL by sampled requests.')
+        for endpoint, seconds in sorted(snapshot.db_seconds.items()):
+            lines.append(f'kiosk_db_seconds_total{_labels({"endpoint": endpoint})} {seconds:.6f}')
+
+        _header(lines, 'kiosk_n_plus_one_requests_total', 'counter',
+                'Sampled requests that ran one statement at least the N+1 threshold number of times.')
+        for endpoint, count in sorted(snapshot.n_plus_one.items()):
+            lines.append(f'kiosk_n_plus_one_requests_total{_labels({"endpoint": endpoint})} {count}')
+
+        _header(lines, 'kiosk_metrics_sample_rate', 'gauge', 'Share of requests whose SQL is instrumented.')
+        lines.append(f'kiosk_metrics_sample_rate {self.sample_rate}')
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self) -> Response:
+        return Response(self.render(), mimetype=PROMETHEUS_MIMETYPE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault('metrics.started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get('metrics.started')
+    if started:
+        stats.db_seconds += time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.statements[statement] += 1
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    def escape(value: object) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _histogram(lines: List[str], name: str, labels: Dict[str, object], histogram: Histogram) -> None:
+    cumulative = 0
+    bounds: Iterable = (*histogram.buckets, '+Inf')
+    for bound, count in zip(bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels({**labels, "le": bound})} {cumulative}')
+    lines.append(f'{name}_sum{_labels(labels)} {histogram.total:.6f}')
+    lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+
+metrics = Metrics()
@@ -0,0 +1,99 @@
+from typing import Callable, Iterable, List, Optional, Tuple
+from flask import Response, request, stream_with_context
+from sqlalchemy import Select
+from werkzeug.exceptions import BadRequest
+from app.database import db
+from app.utils.utils import create_success_response
+from app.utils.serialization import dumps
+from http import HTTPStatus
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# Rows fetched from the cursor and written to the response at a time when streaming
+STREAM_BATCH_SIZE = 1000
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def parse_page_args() -> Tuple[Optional[int], int]:
+    """
+    Reads the keyset cursor and page size from the query string.
+
+    ?after=<id> continues after the row with that ID, ?limit=<n> sets the page size.
+
+    Returns:
+    - Tuple[Optional[int], int]: The ID to continue after, or None for the first page, and the page size.
+
+    Raises:
+    - BadRequest: If either value isn't a valid integer or the limit is out of range.
+    """
+    try:
+        after = request.args.get('after', type=int)
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("after and limit must be integers")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return after, limit
+
+
+def wants_ndjson() -> bool:
+    """Whether the client asked for a streamed NDJSON response, with ?format=ndjson or the Accept header."""
+    return request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def keyset_page(statement: Select, id_column, after: Optional[int], limit: int) -> Tuple[List, Optional[int]]:
+    """
+    Fetches one page of a statement ordered by id_column, starting after a cursor.
+
+    Seeking to the cursor through the primary key index costs the same on every page,
+    unlike OFFSET, which reads and throws away every row before the page.
+
+    Returns:
+    - Tuple[List, Optional[int]]: The page's rows and the cursor of the next page, or None if this is the last page.
+    """
+    if after is not None:
+        statement = statement.where(id_column > after)
+    # Fetch one extra row to learn whether there is a next page without a COUNT
+    rows = db.session.execute(statement.order_by(id_column).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]._mapping[id_column]
+    return rows, None
+
+
+def page_response(items: List[dict], next_cursor: Optional[int], limit: int):
+    """Returns a page in the standard success envelope, with a Link header pointing at the next page if there is one."""
+    response, status = create_success_response(items, HTTPStatus.OK)
+    if next_cursor is not None:
+        response.headers['Link'] = f'<{request.base_url}?after={next_cursor}&limit={limit}>; rel="next"'
+    return response, status
+
+
+def ndjson_response(statement: Select, id_column, after: Optional[int], serialize: Callable[[tuple], dict]) -> Response:
+    """
+    Streams every row of a statement as newline delimited JSON, one object per line.
+
+    Rows are pulled from the database STREAM_BATCH_SIZE at a time with yield_per and each batch
+    is written out before the next is fetched, so memory stays flat whatever the table size.
+
+    Parameters:
+    - statement (Select): The column select to stream.
+    - id_column: The primary key column rows are ordered and resumed by.
+    - after (Optional[int]): Only stream rows after this ID.
+    - serialize (Callable): Turns a row into a JSON serializable dict.
+    """
+    if after is not None:
+        statement = statement.where(id_column > after)
+    statement = statement.order_by(id_column).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    def generate() -> Iterable[bytes]:
+        result = db.session.execute(statement)
+        try:
+            for batch in result.partitions():
+                yield b"".join(dumps(serialize(row)) + b"\n" for row in batch)
+        finally:
+            result.close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
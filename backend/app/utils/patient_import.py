@@ -0,0 +1,180 @@
+import csv
+import json
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import User
+from app.utils.ssn_utils import hash_ssn
+from app.utils.utils import validate_phone_number
+
+# Rows inserted per transaction, also the size of each set-based duplicate lookup
+IMPORT_CHUNK_SIZE = 2000
+# Row errors listed in the report, any beyond that are only counted
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+class RowError(NamedTuple):
+    row: int
+    error: str
+
+
+class ImportReport:
+    """Outcome of an import: rows inserted, rows skipped as duplicates and the rows that were rejected."""
+
+    def __init__(self):
+        self.imported = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors: List[RowError] = []
+
+    def reject(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(row, error))
+
+    def as_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "errors": [error._asdict() for error in self.errors]
+        }
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """Guesses the import format from a file name's extension or a MIME type, None if neither gives it away."""
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension == 'csv':
+            return 'csv'
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+    if content_type:
+        if content_type in ('text/csv', 'application/csv'):
+            return 'csv'
+        if content_type in ('application/x-ndjson', 'application/jsonl', 'application/ndjson'):
+            return 'ndjson'
+    return None
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Optional[dict]]]:
+    """
+    Lazily reads patient records from a CSV file with a header row or from NDJSON.
+
+    Parameters:
+    - stream (IO[str]): The text stream to read.
+    - fmt (str): Either "csv" or "ndjson".
+
+    Returns:
+    - Iterator[Tuple[int, Optional[dict]]]: The row number of each record and the record,
+      or None if the line couldn't be parsed.
+    """
+    if fmt == 'csv':
+        # Row 1 is the header
+        for row_number, record in enumerate(csv.DictReader(stream), start=2):
+            yield row_number, record
+    elif fmt == 'ndjson':
+        for row_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield row_number, record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+
+
+def _validate(record: Optional[dict]) -> Tuple[Optional[dict], Optional[str]]:
+    if record is None:
+        return None, "Malformed record"
+
+    ssn, name, phone = (str(record.get(field) or '').strip() for field in ('ssn', 'name', 'phone'))
+    if not ssn or not name or not phone:
+        return None, "Missing required fields"
+    if len(ssn) > User.ssn.type.length or len(name) > User.name.type.length:
+        return None, "SSN or name too long"
+    try:
+        phone = validate_phone_number(phone)
+    except ValueError as e:
+        return None, f"Invalid phone number: {e}"
+    return {"ssn": ssn, "name": name, "phone": phone, "checkin_status": False}, None
+
+
+def _insert_chunk(session: Session, chunk: List[dict], report: ImportReport) -> None:
+    # One IN query finds every patient of the chunk who is already registered
+    hashes = [values["ssn_hash"] for values in chunk]
+    existing: Set[str] = set(session.execute(select(User.ssn_hash).where(User.ssn_hash.in_(hashes))).scalars())
+    rows = [values for values in chunk if values["ssn_hash"] not in existing]
+    report.duplicates += len(chunk) - len(rows)
+
+    if not rows:
+        return
+    try:
+        session.execute(insert(User), rows)
+        session.commit()
+        report.imported += len(rows)
+    except IntegrityError:
+        # Somebody registered one of these patients since the lookup, insert the rows one by one instead
+        session.rollback()
+        for values in rows:
+            try:
+                session.execute(insert(User), [values])
+                session.commit()
+                report.imported += 1
+            except IntegrityError:
+                session.rollback()
+                report.duplicates += 1
+
+
+def import_patients(session: Session, records: Iterable[Tuple[int, Optional[dict]]],
+                    chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportReport:
+    """
+    Registers patients in bulk, skipping those already registered.
+
+    Records are validated in a single streaming pass and inserted a chunk at a time with
+    one set-based duplicate lookup and one multi-row INSERT per chunk, so memory stays
+    bounded by the chunk size and a bad row is reported without aborting the import.
+    Patients are considered duplicates when their SSN hash matches, so "123-45-6789"
+    and "123456789" are the same patient.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - records (Iterable): (row number, record) pairs, e.g. from read_records.
+    - chunk_size (int): Rows inserted per transaction.
+
+    Returns:
+    - ImportReport: Counts of imported, duplicate and failed rows, and the errors of the failed rows.
+    """
+    report = ImportReport()
+    key = current_app.config.get('SSN_HASH_KEY')
+    chunk: List[dict] = []
+    # Earlier chunks are already in the database, so only repeats within the chunk need remembering
+    seen: Set[str] = set()
+
+    for row_number, record in records:
+        values, error = _validate(record)
+        if error:
+            report.reject(row_number, error)
+            continue
+
+        values["ssn_hash"] = hash_ssn(values["ssn"], key)
+        if values["ssn_hash"] in seen:
+            report.duplicates += 1
+            continue
+        seen.add(values["ssn_hash"])
+
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            _insert_chunk(session, chunk, report)
+            chunk = []
+            seen.clear()
+
+    if chunk:
+        _insert_chunk(session, chunk, report)
+    return report
@@ -0,0 +1,128 @@
+import json
+import queue
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+# Number of undelivered messages a subscriber may fall behind by before it is told to resync
+SUBSCRIBER_BUFFER_SIZE = 100
+
+
+class Subscription:
+    """
+    A single subscriber's mailbox on a channel.
+
+    Messages are delivered as already serialized JSON strings, so fanning a message out
+    to many subscribers costs one serialization, not one per subscriber.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._messages = queue.Queue(maxsize=SUBSCRIBER_BUFFER_SIZE)
+
+    def deliver(self, message: str) -> None:
+        try:
+            self._messages.put_nowait(message)
+        except queue.Full:
+            # A subscriber that can't keep up loses its backlog and is told to fetch a fresh snapshot instead
+            with self._messages.mutex:
+                self._messages.queue.clear()
+            self._messages.put_nowait(json.dumps({"type": "resync"}))
+
+    def get(self, timeout: float) -> Optional[str]:
+        """Blocks for up to timeout seconds waiting for the next message, returning None if none arrived."""
+        try:
+            return self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class InProcessBackend:
+    """Delivers messages to subscribers living in the same process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+class RedisBackend(InProcessBackend):
+    """
+    Relays messages through a local Redis server so subscribers connected to any worker process receive them.
+
+    Each process keeps one Redis connection listening on the queue channels and fans the messages
+    out to its own subscribers, so an idle stream still costs nothing beyond its mailbox.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("PUBSUB_REDIS_URL is set but the 'redis' package is not installed")
+
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{'queue:*': self._relay})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _relay(self, message: dict) -> None:
+        channel = message['channel'].decode()
+        super().publish(channel, message['data'].decode())
+
+    def publish(self, channel: str, message: str) -> None:
+        self._redis.publish(channel, message)
+
+
+class PubSub:
+    """
+    Publish/subscribe hub used to push queue changes to connected displays.
+
+    Uses the in-process backend unless PUBSUB_REDIS_URL is configured, in which case
+    messages are relayed through Redis so every worker process sees them.
+    """
+
+    def __init__(self):
+        self.backend = InProcessBackend()
+
+    def init_app(self, app) -> None:
+        redis_url = app.config.get('PUBSUB_REDIS_URL')
+        if redis_url:
+            self.backend = RedisBackend(redis_url)
+
+    def subscribe(self, channel: str) -> Subscription:
+        return self.backend.subscribe(channel)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.backend.unsubscribe(subscription)
+
+    def publish(self, channel: str, message: dict) -> None:
+        self.backend.publish(channel, json.dumps(message))
+
+
+pubsub = PubSub()
+
+
+def queue_channel(doctor_id: int) -> str:
+    """Returns the channel on which changes to a doctor's queue are published."""
+    return f"queue:{doctor_id}"
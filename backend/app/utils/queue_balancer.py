@@ -0,0 +1,161 @@
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from app.database import db
+from app.models import Doctor, Queue, Specialty, doctor_specialty
+from app.utils.directory_cache import roster_version
+from app.utils.specialty_utils import normalize_specialty
+from app.utils.versioned_cache import BuildStamp, rebuild_if_stale, reset_on_ddl
+from app.utils.wait_estimator import wait_estimator
+
+# Joins made by another worker only reach this one's queue lengths through a rebuild
+BALANCER_MAX_AGE_SECONDS = 30
+
+# (expected wait for the next patient in minutes, doctor ID, stamp of the doctor's load it was computed from)
+HeapEntry = Tuple[float, int, int]
+
+
+class DoctorLoad:
+    """The current queue length and consultation length of one available doctor."""
+
+    __slots__ = ('total_patients', 'mean_minutes', 'specialties', 'stamp')
+
+    def __init__(self, total_patients: int, mean_minutes: float):
+        self.total_patients = total_patients
+        self.mean_minutes = mean_minutes
+        self.specialties: List[str] = []
+        self.stamp = 0
+
+    def expected_wait(self) -> float:
+        """Expected wait of a patient joining now, behind everyone already queued and the consultation in progress."""
+        return (self.total_patients + 1) * self.mean_minutes
+
+
+class QueueBalancer:
+    """
+    Picks the available doctor of a specialty with the shortest expected wait.
+
+    Each specialty has a min-heap of its doctors keyed by expected wait. When a doctor's
+    queue changes a fresh entry is pushed and the old one is left behind, recognised as
+    stale by its stamp and dropped when it reaches the top, so both updates and picks are
+    O(log n). Picking reserves a place in the chosen queue under the lock, so a burst of
+    concurrent joins is spread across the doctors instead of all landing on the same one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heaps: Dict[str, List[HeapEntry]] = {}
+        self._doctors: Dict[int, DoctorLoad] = {}
+        self.stamp = BuildStamp(BALANCER_MAX_AGE_SECONDS)
+
+    def build(self, rows: Iterable[Tuple[int, str, int, float]], version: Optional[int] = None) -> None:
+        """
+        Rebuilds every heap.
+
+        Parameters:
+        - rows (Iterable): (doctor_id, specialty_key, total_patients, mean_minutes) for every available
+          doctor and each of their specialties.
+        - version (Optional[int]): The roster version the rows were loaded at.
+        """
+        doctors: Dict[int, DoctorLoad] = {}
+        heaps: Dict[str, List[HeapEntry]] = {}
+        for doctor_id, specialty, total_patients, mean_minutes in rows:
+            load = doctors.get(doctor_id)
+            if load is None:
+                load = doctors[doctor_id] = DoctorLoad(total_patients, mean_minutes)
+            load.specialties.append(specialty)
+            heaps.setdefault(specialty, []).append((load.expected_wait(), doctor_id, load.stamp))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+
+        with self._lock:
+            self._doctors = doctors
+            self._heaps = heaps
+            self.stamp.mark_built(version)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.stamp.invalidate()
+
+    def _push(self, doctor_id: int, load: DoctorLoad) -> None:
+        load.stamp += 1
+        entry = (load.expected_wait(), doctor_id, load.stamp)
+        for specialty in load.specialties:
+            heap = self._heaps[specialty]
+            heapq.heappush(heap, entry)
+            # Compact once stale entries outnumber live ones, keeping the heap O(doctors)
+            if len(heap) > 4 * len(self._doctors) + 16:
+                self._heaps[specialty] = [item for item in heap if self._doctors[item[1]].stamp == item[2]]
+                heapq.heapify(self._heaps[specialty])
+
+    def choose(self, specialty: str) -> Optional[int]:
+        """
+        Picks the doctor of a specialty with the shortest expected wait and reserves a place in their queue.
+
+        Parameters:
+        - specialty (str): The normalized specialty key.
+
+        Returns:
+        - Optional[int]: The chosen doctor's ID, or None if no available doctor practises the specialty.
+        """
+        with self._lock:
+            heap = self._heaps.get(specialty)
+            while heap:
+                _, doctor_id, stamp = heap[0]
+                load = self._doctors[doctor_id]
+                if load.stamp != stamp:
+                    heapq.heappop(heap)
+                    continue
+                load.total_patients += 1
+                self._push(doctor_id, load)
+                return doctor_id
+            return None
+
+    def update(self, doctor_id: int, total_patients: int, mean_minutes: Optional[float] = None) -> None:
+        """Records a doctor's queue length after a join or dequeue, and their latest consultation length."""
+        with self._lock:
+            load = self._doctors.get(doctor_id)
+            if load is None:
+                return
+            load.total_patients = total_patients
+            if mean_minutes is not None:
+                load.mean_minutes = mean_minutes
+            self._push(doctor_id, load)
+
+
+balancer = QueueBalancer()
+
+
+def _doctor_loads():
+    rows = db.session.execute(
+        select(doctor_specialty.c.doctor_id, Specialty.key, Queue.id, Queue.total_patients, Queue.avg_consult_minutes)
+        .join(Specialty, Specialty.id == doctor_specialty.c.specialty_id)
+        .join(Doctor, Doctor.id == doctor_specialty.c.doctor_id)
+        .outerjoin(Queue, Queue.doctor_id == doctor_specialty.c.doctor_id)
+        .where(Doctor.is_available == True)
+    )
+    for doctor_id, specialty, queue_id, total_patients, avg_minutes in rows:
+        yield doctor_id, specialty, total_patients or 0, wait_estimator.mean_minutes(queue_id, avg_minutes)
+
+
+def choose_doctor(specialty: str) -> Optional[int]:
+    """
+    Picks the available doctor of a specialty a walk-in patient will be seen soonest by.
+
+    Parameters:
+    - specialty (str): The specialty, e.g. "Cardiology" or "general".
+
+    Returns:
+    - Optional[int]: The chosen doctor's ID, or None if no available doctor practises the specialty.
+    """
+    rebuild_if_stale(balancer.stamp, roster_version, lambda version: balancer.build(_doctor_loads(), version))
+    return balancer.choose(normalize_specialty(specialty))
+
+
+def record_queue_length(doctor_id: int, queue_id: int, total_patients: int) -> None:
+    """Keeps the balancer current after a patient joins or leaves a doctor's queue."""
+    balancer.update(doctor_id, total_patients, wait_estimator.mean_minutes(queue_id))
+
+
+reset_on_ddl(Queue.__table__, balancer.invalidate)
@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+import time
+from http import HTTPStatus
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from app.models import Queue
+from app.utils.queue_utils import queue_snapshot
+from app.utils.serialization import dumps
+from app.utils.versioned_cache import reset_on_ddl
+
+# Also bounds how long a snapshot is served after a change that didn't go through join or next, such as a bulk import
+QUEUE_CACHE_MAX_AGE_SECONDS = 5
+
+
+class QueueViews(NamedTuple):
+    """Serialized response bodies of every endpoint reading a doctor's queue, built from one snapshot."""
+    # /api/queue/status
+    status: bytes
+    # /api/dev/view
+    dev_view: bytes
+    # /api/dev/next-status, which answers 404 when nobody is waiting
+    next_status: bytes
+    next_status_code: int
+
+
+class CachedSnapshot(NamedTuple):
+    # Bumped by every invalidation, a snapshot is only stored if nothing invalidated it while it was built
+    generation: int
+    # None once invalidated
+    views: Optional[QueueViews]
+    # Wall clock time the views were built at, comparable between processes
+    built_at: float
+
+
+def build_views(snapshot: Optional[dict]) -> QueueViews:
+    """Serializes every view of a queue snapshot, as returned by queue_snapshot."""
+    if not snapshot:
+        return QueueViews(
+            status=dumps({"status": "success", "response": []}),
+            dev_view=dumps({"status": "success", "response": []}),
+            next_status=dumps({"status": "error", "response": "Queue not found for this doctor"}),
+            next_status_code=HTTPStatus.NOT_FOUND
+        )
+
+    current_queue = snapshot["current_queue"]
+    if current_queue:
+        # The head of the queue is always at position 1
+        next_status = dumps({"status": "success", "response": {
+            "next_patient_id": current_queue[0]["patient_id"],
+            "position": 1
+        }})
+        next_status_code = HTTPStatus.OK
+    else:
+        next_status = dumps({"status": "error", "response": "No patients in queue"})
+        next_status_code = HTTPStatus.NOT_FOUND
+
+    return QueueViews(
+        status=dumps({"status": "success", "response": snapshot}),
+        dev_view=dumps({"status": "success", "response": {
+            "total_patients": snapshot["total_patients"],
+            "current_queue": [{
+                "position": entry["position"],
+                "patient_id": entry["patient_id"],
+                "status": entry["status"]
+            } for entry in current_queue]
+        }}),
+        next_status=next_status,
+        next_status_code=next_status_code
+    )
+
+
+class InProcessStore:
+    """
+    Keeps the snapshots in a dict of the current process.
+
+    Entries are replaced whole, never modified, so reads are a plain dict lookup without a lock.
+    Only writers serialize on the lock, to compare generations before storing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, CachedSnapshot] = {}
+
+    def get(self, doctor_id: int) -> Optional[CachedSnapshot]:
+        return self._entries.get(doctor_id)
+
+    def put(self, doctor_id: int, generation: int, views: QueueViews) -> None:
+        with self._lock:
+            current = self._entries.get(doctor_id)
+            if (current.generation if current else 0) == generation:
+                self._entries[doctor_id] = CachedSnapshot(generation, views, time.time())
+
+    def invalidate(self, doctor_id: int) -> None:
+        with self._lock:
+            current = self._entries.get(doctor_id)
+            self._entries[doctor_id] = CachedSnapshot((current.generation if current else 0) + 1, None, 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteStore:
+    """
+    Keeps the snapshots in a SQLite file shared by every worker process on the host.
+
+    The file is in WAL mode, so reads never wait on a writer, and the generation check is
+    part of the upsert that stores a snapshot, so an invalidation by any worker is seen by all.
+    Each thread has its own connection, reopened after a fork.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue_views ("
+            "doctor_id INTEGER PRIMARY KEY, generation INTEGER NOT NULL, status BLOB, dev_view BLOB, "
+            "next_status BLOB, next_status_code INTEGER, built_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit, every statement is its own transaction
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            # Losing the cache in a power cut costs one rebuild per queue, so it is never synced to disk
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, doctor_id: int) -> Optional[CachedSnapshot]:
+        row = self._connection().execute(
+            "SELECT generation, status, dev_view, next_status, next_status_code, built_at "
+            "FROM queue_views WHERE doctor_id = ?", (doctor_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        generation, status, dev_view, next_status, next_status_code, built_at = row
+        views = QueueViews(status, dev_view, next_status, next_status_code) if status is not None else None
+        return CachedSnapshot(generation, views, built_at)
+
+    def put(self, doctor_id: int, generation: int, views: QueueViews) -> None:
+        self._connection().execute(
+            "INSERT INTO queue_views "
+            "(doctor_id, generation, status, dev_view, next_status, next_status_code, built_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (doctor_id) DO UPDATE SET status = excluded.status, dev_view = excluded.dev_view, "
+            "next_status = excluded.next_status, next_status_code = excluded.next_status_code, "
+            "built_at = excluded.built_at "
+            "WHERE queue_views.generation = excluded.generation",
+            (doctor_id, generation, *views, time.time())
+        )
+
+    def invalidate(self, doctor_id: int) -> None:
+        self._connection().execute(
+            "INSERT INTO queue_views (doctor_id, generation, built_at) VALUES (?, 1, 0) "
+            "ON CONFLICT (doctor_id) DO UPDATE SET generation = generation + 1, status = NULL, dev_view = NULL, "
+            "next_status = NULL, next_status_code = NULL",
+            (doctor_id,)
+        )
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM queue_views")
+
+
+class QueueCache:
+    """
+    Read-through cache of the serialized responses reading each doctor's queue.
+
+    Waiting room displays poll the queue far more often than it changes, so the response
+    bodies of /api/queue/status, /api/dev/view and /api/dev/next-status are built together
+    from one snapshot and served as is until join or next invalidates them, or they are older
+    than QUEUE_CACHE_MAX_AGE_SECONDS. Views built while the queue changed are discarded rather
+    than stored, by comparing the entry's generation from before and after the build.
+
+    Uses the in-process store unless QUEUE_CACHE_PATH is configured, in which case snapshots and
+    invalidations are shared by every worker process through a SQLite file at that path.
+    """
+
+    def __init__(self):
+        self.backend = InProcessStore()
+        self.max_age = QUEUE_CACHE_MAX_AGE_SECONDS
+
+    def init_app(self, app) -> None:
+        self.max_age = app.config.get('QUEUE_CACHE_MAX_AGE_SECONDS', QUEUE_CACHE_MAX_AGE_SECONDS)
+        path = app.config.get('QUEUE_CACHE_PATH')
+        if path:
+            self.backend = SQLiteStore(path)
+
+    def views(self, session: Session, doctor_id: int) -> QueueViews:
+        """
+        Returns the serialized views of a doctor's queue.
+
+        Parameters:
+        - session (Session): The session to build the snapshot with on a cache miss.
+        - doctor_id (int): ID of the doctor owning the queue.
+
+        Returns:
+        - QueueViews: The response bodies, see build_views.
+        """
+        cached = self.backend.get(doctor_id)
+        if cached is not None and cached.views is not None and time.time() - cached.built_at <= self.max_age:
+            return cached.views
+
+        views = build_views(queue_snapshot(session, doctor_id))
+        self.backend.put(doctor_id, cached.generation if cached else 0, views)
+        return views
+
+    def invalidate(self, doctor_id: int) -> None:
+        """Drops a doctor's views, called once a change to their queue is committed."""
+        self.backend.invalidate(doctor_id)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+queue_cache = QueueCache()
+
+reset_on_ddl(Queue.__table__, queue_cache.clear)
@@ -0,0 +1,254 @@
+from typing import Optional, Tuple, Union
+from sqlalchemy import and_, case, event, func, or_, update, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import Queue, QueueEntry
+from app.utils.availability import utc_now
+from app.utils.wait_estimator import wait_estimator
+
+
+# Triage priorities patients can be queued with, from routine to emergency
+TRIAGE_PRIORITIES = {"routine": 0, "elderly": 1, "urgent": 2, "emergency": 3}
+# How many tickets ahead of their arrival a patient of each priority is placed. The boost is
+# bounded, so a waiting patient can only ever be overtaken by patients who arrived within the
+# boost after them, and nobody is starved however many urgent patients keep arriving.
+PRIORITY_BOOSTS = {0: 0, 1: 5, 2: 15, 3: 50}
+
+# Order in which waiting patients are seen
+QUEUE_ORDER = (QueueEntry.sort_key, QueueEntry.seq)
+
+
+class AlreadyInQueueError(Exception):
+    """Raised when a patient already has a waiting entry in the queue."""
+
+
+class QueueEmptyError(Exception):
+    """Raised when there is nobody waiting in the queue."""
+
+
+def parse_priority(value: Union[int, str, None]) -> int:
+    """
+    Parses a triage priority given either as a level or as one of the TRIAGE_PRIORITIES names.
+
+    Raises:
+    - ValueError: If the priority isn't known.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str) and value.lower() in TRIAGE_PRIORITIES:
+        return TRIAGE_PRIORITIES[value.lower()]
+    if isinstance(value, int) and not isinstance(value, bool) and value in PRIORITY_BOOSTS:
+        return value
+    raise ValueError(f"priority must be one of {', '.join(TRIAGE_PRIORITIES)} or 0-{max(PRIORITY_BOOSTS)}")
+
+
+def triage_sort_key(seq: int, priority: int) -> int:
+    """Returns the immutable place in line of a ticket, moved forward by its priority's boost."""
+    return seq - PRIORITY_BOOSTS[priority]
+
+
+def get_or_create_queue_id(session: Session, doctor_id: int) -> int:
+    """
+    Returns the ID of the doctor's queue, creating the queue if it doesn't exist yet.
+
+    Queue.doctor_id is unique, so if two requests race to create the same queue the
+    loser's insert fails and it falls back to the row created by the winner.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - doctor_id (int): ID of the doctor owning the queue.
+
+    Returns:
+    - int: The ID of the doctor's queue.
+    """
+    queue_id = session.execute(
+        select(Queue.id).where(Queue.doctor_id == doctor_id)
+    ).scalar_one_or_none()
+    if queue_id is not None:
+        return queue_id
+
+    try:
+        queue = Queue(doctor_id=doctor_id, total_patients=0, last_seq=0)
+        session.add(queue)
+        session.commit()
+        return queue.id
+    except IntegrityError:
+        session.rollback()
+        return session.execute(
+            select(Queue.id).where(Queue.doctor_id == doctor_id)
+        ).scalar_one()
+
+
+def enqueue_patient(session: Session, queue_id: int, patient_id: int, priority: int = 0) -> Tuple[int, int]:
+    """
+    Atomically adds a patient to a queue and commits.
+
+    The ticket counter and patient count are bumped by a single conditional
+    UPDATE ... RETURNING, which takes the row lock on the queue, so two concurrent
+    joins can never be handed the same ticket. Duplicate waiting entries are rejected
+    by the partial unique index on (queue_id, patient_id), in which case the whole
+    transaction, including the counter bump, is rolled back.
+
+    Patients are placed by an immutable sort key, so a priority patient is slotted in
+    without rewriting anybody else's entry. A routine patient always ends up last, while
+    a priority patient's position is counted from the index.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - queue_id (int): ID of the queue to join.
+    - patient_id (int): ID of the patient joining.
+    - priority (int): The patient's triage priority, see PRIORITY_BOOSTS.
+
+    Returns:
+    - Tuple[int, int]: The patient's ticket number and their position in the queue.
+
+    Raises:
+    - AlreadyInQueueError: If the patient is already waiting in the queue.
+    """
+    seq, position = session.execute(
+        update(Queue)
+        .where(Queue.id == queue_id)
+        .values(last_seq=Queue.last_seq + 1, total_patients=Queue.total_patients + 1)
+        .returning(Queue.last_seq, Queue.total_patients)
+    ).one()
+
+    sort_key = triage_sort_key(seq, priority)
+    try:
+        session.add(QueueEntry(
+            queue_id=queue_id, patient_id=patient_id, seq=seq, priority=priority, sort_key=sort_key, status="waiting"
+        ))
+        session.flush()
+    except IntegrityError:
+        session.rollback()
+        raise AlreadyInQueueError("Patient already in queue")
+
+    if priority:
+        position = session.execute(
+            select(func.count())
+            .select_from(QueueEntry)
+            .where(
+                QueueEntry.queue_id == queue_id,
+                QueueEntry.status == "waiting",
+                or_(QueueEntry.sort_key < sort_key, and_(QueueEntry.sort_key == sort_key, QueueEntry.seq < seq))
+            )
+        ).scalar_one() + 1
+    session.commit()
+
+    return seq, position
+
+
+def find_queue(session: Session, doctor_id: int):
+    """Returns the (id, total_patients) row of a doctor's queue, or None if the doctor has no queue yet."""
+    return session.execute(
+        select(Queue.id, Queue.total_patients).where(Queue.doctor_id == doctor_id)
+    ).first()
+
+
+def waiting_entries(session: Session, queue_id: int):
+    """
+    Returns the waiting entries of a queue in the order they will be seen, as
+    (patient_id, priority, status) rows rather than ORM objects.
+    """
+    return session.execute(
+        select(QueueEntry.patient_id, QueueEntry.priority, QueueEntry.status)
+        .where(QueueEntry.queue_id == queue_id, QueueEntry.status == "waiting")
+        .order_by(*QUEUE_ORDER)
+    ).all()
+
+
+def queue_length(session: Session, queue_id: int) -> int:
+    """Returns the number of patients waiting in a queue, from its aggregate row."""
+    return session.execute(select(Queue.total_patients).where(Queue.id == queue_id)).scalar_one()
+
+
+def dequeue_patient(session: Session, queue_id: int) -> Tuple[int, int]:
+    """
+    Atomically marks the head of the queue as served and commits.
+
+    Only the head entry and the queue aggregate are written. The head is claimed with
+    a conditional UPDATE on its waiting status, so if two "next" calls race for the
+    same entry only one of them claims it and the other moves on to the next ticket.
+
+    The time since the previous patient was called is fed to the doctor's wait estimator
+    as one consultation, unless the queue ran empty in between.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - queue_id (int): ID of the queue to dequeue from.
+
+    Returns:
+    - Tuple[int, int]: The ID of the patient being served and the number of patients still waiting.
+
+    Raises:
+    - QueueEmptyError: If nobody is waiting in the queue.
+    """
+    while True:
+        head = session.execute(
+            select(QueueEntry.id, QueueEntry.patient_id, Queue.last_served_at)
+            .join(Queue, Queue.id == QueueEntry.queue_id)
+            .where(QueueEntry.queue_id == queue_id, QueueEntry.status == "waiting")
+            .order_by(*QUEUE_ORDER)
+            .limit(1)
+        ).one_or_none()
+
+        if head is None:
+            raise QueueEmptyError("No patients in queue")
+
+        served_at = utc_now()
+        claimed = session.execute(
+            update(QueueEntry)
+            .where(QueueEntry.id == head.id, QueueEntry.status == "waiting")
+            .values(status="served", served_at=served_at)
+        ).rowcount
+        if claimed:
+            break
+        session.rollback()
+
+    # Only remember when this patient was called if someone is left waiting, so an idle gap is never timed
+    remaining = session.execute(
+        update(Queue)
+        .where(Queue.id == queue_id)
+        .values(
+            total_patients=Queue.total_patients - 1,
+            last_served_at=case((Queue.total_patients > 1, served_at), else_=None)
+        )
+        .returning(Queue.total_patients)
+    ).scalar_one()
+    session.commit()
+
+    wait_estimator.record_consultation(session, queue_id, head.last_served_at, served_at)
+    return head.patient_id, remaining
+
+
+def queue_snapshot(session: Session, doctor_id: int) -> Optional[dict]:
+    """
+    Builds the current state of a doctor's queue as returned by /api/queue/status.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - doctor_id (int): ID of the doctor owning the queue.
+
+    Returns:
+    - Optional[dict]: The queue state, or None if the doctor has no queue yet.
+    """
+    queue = find_queue(session, doctor_id)
+    if not queue:
+        return None
+
+    # Positions are derived from triage order rather than stored on the entries
+    return {
+        "total_patients": queue.total_patients,
+        **wait_estimator.estimate(session, queue.id, queue.total_patients).as_dict(),
+        "current_queue": [{
+            "position": position,
+            "patient_id": patient_id,
+            "priority": priority,
+            "status": status
+        } for position, (patient_id, priority, status) in enumerate(waiting_entries(session, queue.id), start=1)]
+    }
+
+
+@event.listens_for(Queue.__table__, 'after_create')
+@event.listens_for(Queue.__table__, 'after_drop')
+def _reset_estimates_on_ddl(target, connection, **kw):
+    wait_estimator.clear()
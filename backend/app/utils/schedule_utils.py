@@ -0,0 +1,144 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+def parse_weekly_rules(rules: List[Dict]) -> Dict[int, List[Tuple[time, time]]]:
+    """
+    Parses weekly recurrence rules into the working windows of each weekday.
+
+    Each rule looks like {"weekdays": [0, 1, 2, 3, 4], "start": "09:00", "end": "17:00"},
+    with Monday as weekday 0.
+
+    Parameters:
+    - rules (List[Dict]): The weekly recurrence rules.
+
+    Returns:
+    - Dict[int, List[Tuple[time, time]]]: The (start, end) windows keyed by weekday.
+
+    Raises:
+    - ValueError: If a rule is malformed.
+    """
+    windows: Dict[int, List[Tuple[time, time]]] = {}
+    for rule in rules:
+        start, end = _parse_window(rule)
+        weekdays = rule.get('weekdays')
+        if not isinstance(weekdays, list) or not all(isinstance(day, int) and 0 <= day <= 6 for day in weekdays):
+            raise ValueError("weekdays must be a list of integers between 0 (Monday) and 6 (Sunday)")
+        for day in weekdays:
+            windows.setdefault(day, []).append((start, end))
+    return windows
+
+
+def parse_breaks(breaks: List[Dict]) -> Dict[int, List[Tuple[time, time]]]:
+    """
+    Parses daily breaks, e.g. {"start": "12:00", "end": "13:00"}, keyed by weekday.
+
+    A break applies to every day unless it lists its own "weekdays".
+    """
+    parsed: Dict[int, List[Tuple[time, time]]] = {day: [] for day in range(7)}
+    for item in breaks:
+        start, end = _parse_window(item)
+        weekdays = item.get('weekdays', list(range(7)))
+        if not isinstance(weekdays, list) or not all(isinstance(day, int) and 0 <= day <= 6 for day in weekdays):
+            raise ValueError("weekdays must be a list of integers between 0 (Monday) and 6 (Sunday)")
+        for day in weekdays:
+            parsed[day].append((start, end))
+    return parsed
+
+
+def _parse_window(window: Dict) -> Tuple[time, time]:
+    try:
+        start = time.fromisoformat(window['start'])
+        end = time.fromisoformat(window['end'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Windows need a start and end time in HH:MM format")
+    if end <= start:
+        raise ValueError("Window end time must be after its start time")
+    return start, end
+
+
+def expand_schedule(
+    start_date: date,
+    end_date: date,
+    windows: Dict[int, List[Tuple[time, time]]],
+    breaks: Dict[int, List[Tuple[time, time]]],
+    slot_minutes: int
+) -> List[Interval]:
+    """
+    Expands weekly windows over a date range into consecutive slots, skipping any slot that touches a break.
+
+    Parameters:
+    - start_date (date): First day of the range.
+    - end_date (date): Last day of the range, inclusive.
+    - windows (Dict): Working windows keyed by weekday, from parse_weekly_rules.
+    - breaks (Dict): Breaks keyed by weekday, from parse_breaks.
+    - slot_minutes (int): Length of every slot.
+
+    Returns:
+    - List[Interval]: The generated (start, end) slots sorted by start time.
+    """
+    length = timedelta(minutes=slot_minutes)
+    slots: List[Interval] = []
+
+    day = start_date
+    while day <= end_date:
+        day_breaks = [(datetime.combine(day, start), datetime.combine(day, end))
+                      for start, end in breaks.get(day.weekday(), [])]
+        for window_start, window_end in windows.get(day.weekday(), []):
+            slot_start = datetime.combine(day, window_start)
+            window_close = datetime.combine(day, window_end)
+            while slot_start + length <= window_close:
+                slot_end = slot_start + length
+                if not any(slot_start < break_end and break_start < slot_end for break_start, break_end in day_breaks):
+                    slots.append((slot_start, slot_end))
+                slot_start = slot_end
+        day += timedelta(days=1)
+
+    slots.sort()
+    return slots
+
+
+def drop_overlaps(generated: List[Interval], existing: Iterable[Interval]) -> Tuple[List[Interval], int]:
+    """
+    Removes generated slots that overlap an existing slot or an earlier generated slot.
+
+    Both inputs must be sorted by start time. They are merged in a single sweep, so the
+    cost is linear in the number of slots instead of one overlap query per slot.
+
+    Parameters:
+    - generated (List[Interval]): The slots about to be inserted, sorted by start.
+    - existing (Iterable[Interval]): The doctor's slots already in the database, sorted by start.
+
+    Returns:
+    - Tuple[List[Interval], int]: The slots that can be inserted and the number that were dropped.
+    """
+    existing = iter(existing)
+    upcoming = next(existing, None)
+    # End of the latest interval accepted so far, existing or generated
+    busy_until = None
+    accepted: List[Interval] = []
+    dropped = 0
+
+    for start, end in generated:
+        # Pull in every existing slot that starts before this one ends
+        while upcoming is not None and upcoming[0] < end:
+            if busy_until is None or upcoming[1] > busy_until:
+                busy_until = upcoming[1]
+            upcoming = next(existing, None)
+
+        if busy_until is not None and start < busy_until:
+            dropped += 1
+            continue
+
+        accepted.append((start, end))
+        busy_until = end
+
+    return accepted, dropped
+
+
+def chunked(items: List, size: int) -> Iterable[List]:
+    """Yields consecutive chunks of at most size items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
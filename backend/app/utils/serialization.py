@@ -0,0 +1,164 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+from uuid import UUID
+from flask.json.provider import JSONProvider
+from sqlalchemy import Select, select
+from app.models import User, Doctor, Slot
+
+
+class Encoder(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Any], Any]
+
+
+def _default(obj: Any) -> Any:
+    """Renders the types neither encoder handles natively."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+ENCODERS: Dict[str, Encoder] = {
+    'json': Encoder('json', _stdlib_dumps, json.loads),
+}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    # Integer keys are allowed so dicts keyed by ID encode the same as with the stdlib encoder
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    ENCODERS['orjson'] = Encoder('orjson', _orjson_dumps, orjson.loads)
+
+_encoder = ENCODERS.get('orjson', ENCODERS['json'])
+
+
+def set_encoder(name: str) -> Encoder:
+    """
+    Selects the JSON encoder every response is written with.
+
+    Parameters:
+    - name (str): "orjson", "json" or "auto", which picks orjson when it is installed.
+
+    Returns:
+    - Encoder: The encoder now in use.
+
+    Raises:
+    - ValueError: If the encoder is unknown or its package isn't installed.
+    """
+    global _encoder
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in ENCODERS else 'json'
+    if name not in ENCODERS:
+        raise ValueError(f"JSON encoder '{name}' is not available, choose from {', '.join(ENCODERS)} or auto")
+    _encoder = ENCODERS[name]
+    return _encoder
+
+
+def encoder_name() -> str:
+    return _encoder.name
+
+
+def dumps(obj: Any) -> bytes:
+    """Encodes obj as compact UTF-8 JSON, rendering datetimes and dates in ISO 8601."""
+    return _encoder.dumps(obj)
+
+
+def loads(data: Any) -> Any:
+    return _encoder.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by the selected encoder, so jsonify, create_success_response
+    and request.get_json all go through orjson when it is installed.
+
+    Datetimes are written in ISO 8601, the format the API already documents, rather than
+    Flask's default HTTP date format.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return _encoder.dumps(obj).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return _encoder.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_encoder.dumps(obj), mimetype='application/json')
+
+
+class Schema:
+    """
+    The fields a model is serialized with, each mapped to the column it is read from.
+
+    select() loads exactly those columns as plain rows, labelled with their output names, so
+    list endpoints skip ORM object hydration and the identity map entirely, and dump() turns
+    a row into its response dict without per-field code in the route. Values are left as
+    loaded, datetimes included, and rendered by the encoder.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.keys = tuple(fields)
+        self.columns = tuple(
+            column if column.key == name else column.label(name) for name, column in fields.items()
+        )
+        self._by_name = dict(zip(self.keys, self.columns))
+
+    def select(self) -> Select:
+        """Returns a select of the schema's columns, to be narrowed with where, join and order_by."""
+        return select(*self.columns)
+
+    def column(self, name: str):
+        """Returns the selected column of a field, usable in where and order_by clauses and as a row key."""
+        return self._by_name[name]
+
+    def dump(self, row: Iterable) -> dict:
+        return dict(zip(self.keys, row))
+
+    def dump_all(self, rows: Iterable[Iterable]) -> List[dict]:
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+
+USER_SCHEMA = Schema(
+    id=User.id,
+    name=User.name,
+    ssn=User.ssn,
+    phone=User.phone,
+    checkin_status=User.checkin_status
+)
+
+DOCTOR_SCHEMA = Schema(
+    id=Doctor.id,
+    name=Doctor.name,
+    specialties=Doctor.specialties,
+    is_available=Doctor.is_available
+)
+
+SLOT_SCHEMA = Schema(
+    slot_id=Slot.id,
+    doctor_id=Slot.doctor_id,
+    start_time=Slot.start_time,
+    end_time=Slot.end_time,
+    slot_type=Slot.slot_type
+)
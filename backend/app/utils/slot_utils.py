@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models import Slot
+
+
+class SlotNotFoundError(Exception):
+    """Raised when a slot being booked doesn't exist."""
+
+
+class SlotUnavailableError(Exception):
+    """Raised when a slot being booked has already been taken."""
+
+    def __init__(self, message: str, slot_ids: List[int]):
+        super().__init__(message)
+        self.slot_ids = slot_ids
+
+
+def reserve_slot(session: Session, slot_id: int, patient_id: int) -> Tuple[datetime, int]:
+    """
+    Books a slot for a patient and commits.
+
+    The availability check and the booking are one conditional UPDATE, so when two patients
+    race for the same slot exactly one of them matches the row and the other gets a conflict.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - slot_id (int): ID of the slot to book.
+    - patient_id (int): ID of the patient booking the slot.
+
+    Returns:
+    - Tuple[datetime, int]: The start time of the booked slot and its doctor's ID.
+
+    Raises:
+    - SlotNotFoundError: If the slot doesn't exist.
+    - SlotUnavailableError: If the slot has already been booked.
+    """
+    booked = session.execute(
+        update(Slot)
+        .where(Slot.id == slot_id, Slot.is_available == True)
+        .values(is_available=False, patient_id=patient_id)
+        .returning(Slot.start_time, Slot.doctor_id)
+    ).one_or_none()
+    session.commit()
+
+    if booked is None:
+        exists = session.execute(select(Slot.id).where(Slot.id == slot_id)).scalar_one_or_none()
+        if exists is None:
+            raise SlotNotFoundError("Slot not found")
+        raise SlotUnavailableError("Slot is no longer available", [slot_id])
+
+    return booked.start_time, booked.doctor_id
+
+
+def reserve_slots(session: Session, slot_ids: List[int], patient_id: int) -> List[Tuple[int, datetime, int]]:
+    """
+    Books several slots for a patient at once, either all of them or none, and commits.
+
+    Every free slot is claimed by a single conditional UPDATE. If any slot was missing or
+    already taken, the transaction is rolled back so none of the slots stay booked.
+
+    Parameters:
+    - session (Session): The session to run the queries on.
+    - slot_ids (List[int]): IDs of the slots to book.
+    - patient_id (int): ID of the patient booking the slots.
+
+    Returns:
+    - List[Tuple[int, datetime, int]]: The ID, start time and doctor ID of each booked slot, ordered by start time.
+
+    Raises:
+    - SlotUnavailableError: If any slot doesn't exist or has already been booked, listing those slots.
+    """
+    wanted = set(slot_ids)
+    booked = session.execute(
+        update(Slot)
+        .where(Slot.id.in_(wanted), Slot.is_available == True)
+        .values(is_available=False, patient_id=patient_id)
+        .returning(Slot.id, Slot.start_time, Slot.doctor_id)
+    ).all()
+
+    if len(booked) != len(wanted):
+        session.rollback()
+        unavailable = sorted(wanted - {row.id for row in booked})
+        raise SlotUnavailableError("Some slots are no longer available", unavailable)
+
+    session.commit()
+    return sorted(((row.id, row.start_time, row.doctor_id) for row in booked), key=lambda row: row[1])
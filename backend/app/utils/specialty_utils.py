@@ -0,0 +1,98 @@
+import re
+from typing import Dict, List, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.database import db
+from app.models import Doctor, Specialty, doctor_specialty
+
+# Specialty names as doctors tend to write them, mapped to the canonical name used for matching
+SPECIALTY_ALIASES = {
+    "general": "general medicine",
+    "general physician": "general medicine",
+    "family medicine": "general medicine",
+    "internal medicine": "general medicine",
+    "orthopaedics": "orthopedics",
+    "orthopedic surgery": "orthopedics",
+    "ent": "otolaryngology",
+    "ear nose and throat": "otolaryngology",
+    "obstetrics and gynecology": "gynecology",
+    "obgyn": "gynecology",
+    "skin": "dermatology",
+    "heart": "cardiology",
+}
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def normalize_specialty(name: str) -> str:
+    """
+    Normalizes a specialty name into its lookup key.
+
+    Case, punctuation and spacing are ignored and common aliases are folded together,
+    e.g. "General" and "general  medicine" both become "general medicine".
+    """
+    name = " ".join(_WORD.findall(name.lower()))
+    return SPECIALTY_ALIASES.get(name, name)
+
+
+def split_specialties(specialties: str) -> List[Tuple[str, str]]:
+    """
+    Splits a CSV specialties string into (display name, lookup key) pairs, dropping blanks and duplicates.
+
+    Parameters:
+    - specialties (str): Specialties in csv format, e.g. "Cardiology, General Medicine".
+
+    Returns:
+    - List[Tuple[str, str]]: The display name and lookup key of each distinct specialty, in order.
+    """
+    seen = set()
+    result = []
+    for item in (specialties or "").split(','):
+        name = item.strip()
+        key = normalize_specialty(name)
+        if key and key not in seen:
+            seen.add(key)
+            result.append((name, key))
+    return result
+
+
+def doctor_ids_with_specialty(specialty: str) -> List[int]:
+    """
+    Returns the IDs of the doctors practising a specialty, through the indexed specialty tables.
+
+    Parameters:
+    - specialty (str): The specialty to look for, e.g. "Cardiology".
+
+    Returns:
+    - List[int]: IDs of the matching doctors.
+    """
+    return list(db.session.execute(
+        select(doctor_specialty.c.doctor_id)
+        .join(Specialty, Specialty.id == doctor_specialty.c.specialty_id)
+        .where(Specialty.key == normalize_specialty(specialty))
+    ).scalars())
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_doctor_specialties(session, flush_context, instances):
+    """Keeps Doctor.specialty_list in step with the Doctor.specialties CSV column whenever a doctor is flushed."""
+    pending: Dict[str, Specialty] = {}
+
+    for doctor in (*session.new, *session.dirty):
+        if not isinstance(doctor, Doctor):
+            continue
+        if doctor not in session.new and not db.inspect(doctor).attrs.specialties.history.has_changes():
+            continue
+
+        specialties = []
+        for name, key in split_specialties(doctor.specialties):
+            specialty = pending.get(key)
+            if specialty is None:
+                with session.no_autoflush:
+                    specialty = session.execute(select(Specialty).where(Specialty.key == key)).scalar_one_or_none()
+                if specialty is None:
+                    specialty = Specialty(name=name, key=key)
+                    session.add(specialty)
+                pending[key] = specialty
+            specialties.append(specialty)
+        doctor.specialty_list = specialties
@@ -0,0 +1,52 @@
+import hashlib
+import hmac
+import re
+from typing import Callable
+from flask import current_app
+
+_SEPARATORS = re.compile(r"[\s-]")
+
+
+def normalize_ssn(ssn: str) -> str:
+    """Strips spaces and dashes so "123-45-6789" and "123456789" are the same SSN."""
+    return _SEPARATORS.sub("", str(ssn))
+
+
+def hash_ssn(ssn: str, key: str = None) -> str:
+    """
+    Computes the keyed hash under which an SSN is stored and looked up.
+
+    An HMAC rather than a plain hash, so SSNs can't be recovered from the column by
+    hashing every possible SSN without also knowing the key.
+
+    Parameters:
+    - ssn (str): The SSN, with or without separators.
+    - key (str): The HMAC key, defaults to the app's SSN_HASH_KEY.
+
+    Returns:
+    - str: The hex encoded HMAC-SHA256 of the normalized SSN.
+
+    Raises:
+    - RuntimeError: If no key is given and SSN_HASH_KEY isn't configured.
+    """
+    if key is None:
+        key = current_app.config.get('SSN_HASH_KEY')
+        if not key:
+            raise RuntimeError("SSN_HASH_KEY is not configured")
+    return hmac.new(key.encode(), normalize_ssn(ssn).encode(), hashlib.sha256).hexdigest()
+
+
+def ssn_hasher(key: str) -> Callable[[str], str]:
+    """
+    Returns a function computing the same hashes as hash_ssn(ssn, key), for hashing many SSNs.
+
+    The HMAC is keyed once and copied for each SSN instead of being keyed again per call.
+    """
+    keyed = hmac.new(key.encode(), digestmod=hashlib.sha256)
+
+    def hash_one(ssn: str) -> str:
+        digest = keyed.copy()
+        digest.update(normalize_ssn(ssn).encode())
+        return digest.hexdigest()
+
+    return hash_one
@@ -0,0 +1,309 @@
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from app.database import db
+from app.models import Doctor, Queue
+from app.utils.directory_cache import roster_version
+from app.utils.specialty_utils import split_specialties
+from app.utils.versioned_cache import BuildStamp, rebuild_if_stale
+
+# Symptom keywords and phrases mapped to the specialties that treat them, weighted by how specific the symptom is
+SYMPTOM_SPECIALTIES: Dict[str, Dict[str, float]] = {
+    "chest pain": {"cardiology": 3.0, "general medicine": 1.0},
+    "palpitations": {"cardiology": 3.0},
+    "high blood pressure": {"cardiology": 2.0, "general medicine": 1.0},
+    "shortness of breath": {"pulmonology": 2.0, "cardiology": 1.5},
+    "swollen ankles": {"cardiology": 1.5},
+    "fainting": {"cardiology": 1.5, "neurology": 1.5},
+    "headache": {"neurology": 2.0, "general medicine": 1.0},
+    "migraine": {"neurology": 3.0},
+    "seizure": {"neurology": 3.0},
+    "numbness": {"neurology": 2.0},
+    "dizziness": {"neurology": 1.5, "otolaryngology": 1.0, "cardiology": 0.5},
+    "memory loss": {"neurology": 3.0, "psychiatry": 1.0},
+    "tremor": {"neurology": 2.5},
+    "rash": {"dermatology": 3.0},
+    "itching": {"dermatology": 2.0},
+    "acne": {"dermatology": 3.0},
+    "mole": {"dermatology": 2.5},
+    "hair loss": {"dermatology": 2.0, "endocrinology": 0.5},
+    "joint pain": {"orthopedics": 2.5, "general medicine": 0.5},
+    "back pain": {"orthopedics": 2.5},
+    "fracture": {"orthopedics": 3.0},
+    "sprain": {"orthopedics": 2.5},
+    "knee pain": {"orthopedics": 3.0},
+    "stomach pain": {"gastroenterology": 2.5, "general medicine": 1.0},
+    "nausea": {"gastroenterology": 2.0, "general medicine": 0.5},
+    "vomiting": {"gastroenterology": 2.0, "general medicine": 0.5},
+    "diarrhea": {"gastroenterology": 2.5},
+    "constipation": {"gastroenterology": 2.5},
+    "heartburn": {"gastroenterology": 2.5},
+    "cough": {"pulmonology": 2.0, "general medicine": 1.0},
+    "wheezing": {"pulmonology": 3.0},
+    "asthma": {"pulmonology": 3.0},
+    "sore throat": {"otolaryngology": 2.5, "general medicine": 1.0},
+    "ear pain": {"otolaryngology": 3.0},
+    "hearing loss": {"otolaryngology": 3.0},
+    "sinus": {"otolaryngology": 2.5},
+    "nosebleed": {"otolaryngology": 2.5},
+    "blurred vision": {"ophthalmology": 3.0, "neurology": 0.5},
+    "eye pain": {"ophthalmology": 3.0},
+    "red eye": {"ophthalmology": 2.5},
+    "anxiety": {"psychiatry": 3.0},
+    "depression": {"psychiatry": 3.0},
+    "insomnia": {"psychiatry": 2.0, "neurology": 1.0},
+    "pregnancy": {"gynecology": 3.0},
+    "menstrual pain": {"gynecology": 3.0},
+    "painful urination": {"urology": 3.0},
+    "blood in urine": {"urology": 3.0},
+    "frequent urination": {"urology": 2.0, "endocrinology": 1.5},
+    "excessive thirst": {"endocrinology": 2.5},
+    "weight gain": {"endocrinology": 1.5},
+    "thyroid": {"endocrinology": 3.0},
+    "diabetes": {"endocrinology": 3.0},
+    "fever": {"general medicine": 2.0, "pediatrics": 0.5},
+    "fatigue": {"general medicine": 1.5, "endocrinology": 0.5},
+    "cold": {"general medicine": 2.0},
+    "flu": {"general medicine": 2.0},
+    "child": {"pediatrics": 2.0},
+    "baby": {"pediatrics": 3.0},
+    "infant": {"pediatrics": 3.0},
+}
+
+# Everyday wording mapped to the keyword it means
+SYMPTOM_SYNONYMS = {
+    "chest tightness": "chest pain",
+    "heart racing": "palpitations",
+    "racing heart": "palpitations",
+    "hypertension": "high blood pressure",
+    "breathless": "shortness of breath",
+    "breathlessness": "shortness of breath",
+    "short of breath": "shortness of breath",
+    "head ache": "headache",
+    "passed out": "fainting",
+    "blackout": "fainting",
+    "fits": "seizure",
+    "convulsions": "seizure",
+    "pins and needles": "numbness",
+    "tingling": "numbness",
+    "vertigo": "dizziness",
+    "lightheaded": "dizziness",
+    "forgetfulness": "memory loss",
+    "shaking": "tremor",
+    "hives": "rash",
+    "eczema": "rash",
+    "itchy": "itching",
+    "pimples": "acne",
+    "balding": "hair loss",
+    "arthritis": "joint pain",
+    "broken bone": "fracture",
+    "twisted ankle": "sprain",
+    "bellyache": "stomach pain",
+    "abdominal pain": "stomach pain",
+    "tummy ache": "stomach pain",
+    "throwing up": "vomiting",
+    "acid reflux": "heartburn",
+    "indigestion": "heartburn",
+    "loose motions": "diarrhea",
+    "coughing": "cough",
+    "earache": "ear pain",
+    "blocked nose": "sinus",
+    "runny nose": "cold",
+    "blurry vision": "blurred vision",
+    "panic attacks": "anxiety",
+    "feeling low": "depression",
+    "sleeplessness": "insomnia",
+    "cant sleep": "insomnia",
+    "period pain": "menstrual pain",
+    "cramps": "menstrual pain",
+    "burning urination": "painful urination",
+    "always thirsty": "excessive thirst",
+    "tired": "fatigue",
+    "exhausted": "fatigue",
+    "temperature": "fever",
+    "chills": "fever",
+    "toddler": "child",
+    "kid": "child",
+    "newborn": "infant",
+}
+
+# Specialty consulted when no symptom is recognised
+FALLBACK_SPECIALTY = "general medicine"
+
+_WORD = re.compile(r"[a-z]+")
+# Dropped before splitting into words, so "can't" reads as "cant" rather than "can t"
+_APOSTROPHES = re.compile(r"['\u2019]")
+
+MATCHER_MAX_AGE_SECONDS = 30
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(_APOSTROPHES.sub("", text.lower()))
+
+
+class DoctorEntry(NamedTuple):
+    id: int
+    name: str
+    specialties: str
+    is_available: bool
+
+
+class Match(NamedTuple):
+    doctor: DoctorEntry
+    score: float
+    matched_specialties: List[str]
+
+
+def compile_vocabulary(
+    symptoms: Dict[str, Dict[str, float]],
+    synonyms: Dict[str, str]
+) -> Tuple[Dict[str, Dict[str, float]], int]:
+    """
+    Flattens keywords and synonyms into one phrase -> {specialty: weight} lookup table.
+
+    Returns:
+    - Tuple[Dict, int]: The lookup table and the longest phrase length in words.
+    """
+    vocabulary = {" ".join(_words(phrase)): dict(weights) for phrase, weights in symptoms.items()}
+    for synonym, keyword in synonyms.items():
+        vocabulary[" ".join(_words(synonym))] = vocabulary[keyword]
+    longest = max((len(phrase.split()) for phrase in vocabulary), default=1)
+    return vocabulary, longest
+
+
+class SymptomMatcher:
+    """
+    Matches free text symptoms to the best suited doctor.
+
+    Symptoms are scored against a phrase vocabulary with a hash lookup per word n-gram, so the
+    cost grows with the length of the text, not the size of the vocabulary. Doctors are found
+    through an inverted index from specialty to doctors, built from the CSV Doctor.specialties
+    column and rebuilt when the roster changes.
+    """
+
+    def __init__(self, symptoms: Dict[str, Dict[str, float]] = None, synonyms: Dict[str, str] = None):
+        self.vocabulary, self.max_phrase_words = compile_vocabulary(
+            SYMPTOM_SPECIALTIES if symptoms is None else symptoms,
+            SYMPTOM_SYNONYMS if synonyms is None else synonyms
+        )
+        self._lock = threading.Lock()
+        self._doctor_ids_by_specialty: Dict[str, List[int]] = {}
+        self._doctors: Dict[int, DoctorEntry] = {}
+        self._specialties_of: Dict[int, frozenset] = {}
+        self.stamp = BuildStamp(MATCHER_MAX_AGE_SECONDS)
+
+    def build(self, doctors: Iterable[DoctorEntry], version: Optional[int] = None) -> None:
+        """Rebuilds the specialty -> doctors inverted index."""
+        index: Dict[str, List[int]] = {}
+        by_id: Dict[int, DoctorEntry] = {}
+        specialties_of: Dict[int, frozenset] = {}
+        for doctor in doctors:
+            doctor = DoctorEntry(*doctor)
+            by_id[doctor.id] = doctor
+            specialties = frozenset(key for _, key in split_specialties(doctor.specialties))
+            specialties_of[doctor.id] = specialties
+            for specialty in specialties:
+                index.setdefault(specialty, []).append(doctor.id)
+
+        with self._lock:
+            self._doctor_ids_by_specialty = index
+            self._doctors = by_id
+            self._specialties_of = specialties_of
+            self.stamp.mark_built(version)
+
+    def specialty_scores(self, symptoms: str) -> Dict[str, float]:
+        """Scores every specialty mentioned by the symptoms, longest phrases first so "chest pain" beats "pain"."""
+        words = _words(symptoms)
+        scores: Dict[str, float] = {}
+        i = 0
+        while i < len(words):
+            for size in range(min(self.max_phrase_words, len(words) - i), 0, -1):
+                weights = self.vocabulary.get(" ".join(words[i:i + size]))
+                if weights is not None:
+                    for specialty, weight in weights.items():
+                        scores[specialty] = scores.get(specialty, 0.0) + weight
+                    i += size
+                    break
+            else:
+                i += 1
+        return scores
+
+    def best_match(
+        self,
+        symptoms: str,
+        queue_lengths: Callable[[List[int]], Dict[int, int]]
+    ) -> Optional[Match]:
+        """
+        Picks the doctor best suited to the symptoms.
+
+        Doctors are ranked by the summed score of their matching specialties, then by whether
+        they are available, then by the shortest current queue.
+
+        Parameters:
+        - symptoms (str): The patient's description of their symptoms.
+        - queue_lengths (Callable): Returns the queue length of each of the given doctor IDs,
+          only called for the doctors tied for the best score and availability.
+
+        Returns:
+        - Optional[Match]: The best doctor, or None if there are no doctors at all.
+        """
+        scores = self.specialty_scores(symptoms)
+        if not scores:
+            scores = {FALLBACK_SPECIALTY: 1.0}
+
+        with self._lock:
+            index = self._doctor_ids_by_specialty
+            doctors = self._doctors
+            specialties_of = self._specialties_of
+
+        # Accumulate plain floats per doctor ID to keep the hot loop allocation free
+        candidates: Dict[int, float] = {}
+        for specialty, weight in scores.items():
+            for doctor_id in index.get(specialty, ()):
+                candidates[doctor_id] = candidates.get(doctor_id, 0.0) + weight
+
+        if not candidates:
+            # Nobody practises a matching specialty, so fall back to anyone who can see the patient
+            if not doctors:
+                return None
+            candidates = dict.fromkeys(doctors, 0.0)
+
+        best_key = max((score, doctors[doctor_id].is_available) for doctor_id, score in candidates.items())
+        tied = [doctor_id for doctor_id, score in candidates.items()
+                if (score, doctors[doctor_id].is_available) == best_key]
+
+        if len(tied) > 1:
+            lengths = queue_lengths(tied)
+            tied.sort(key=lambda doctor_id: (lengths.get(doctor_id, 0), doctor_id))
+
+        best = tied[0]
+        return Match(doctors[best], best_key[0], sorted(specialties_of[best].intersection(scores)))
+
+symptom_matcher = SymptomMatcher()
+
+
+def _queue_lengths(doctor_ids: List[int]) -> Dict[int, int]:
+    return dict(db.session.execute(
+        select(Queue.doctor_id, Queue.total_patients).where(Queue.doctor_id.in_(doctor_ids))
+    ).all())
+
+
+def match_doctor(symptoms: str) -> Optional[Match]:
+    """
+    Matches symptoms to a doctor, rebuilding the specialty index first if the roster has changed since it was built
+    or the index is older than MATCHER_MAX_AGE_SECONDS.
+
+    Parameters:
+    - symptoms (str): The patient's description of their symptoms.
+
+    Returns:
+    - Optional[Match]: The best doctor, or None if there are no doctors in the system.
+    """
+    def rebuild(version: int) -> None:
+        symptom_matcher.build(db.session.execute(
+            select(Doctor.id, Doctor.name, Doctor.specialties, Doctor.is_available)
+        ), version)
+
+    rebuild_if_stale(symptom_matcher.stamp, roster_version, rebuild)
+    return symptom_matcher.best_match(symptoms, _queue_lengths)
@@ -1,35 +1,27 @@
-from typing import Dict, List
+from typing import Dict, Optional
+from sqlalchemy import select
+from app.database import db
 from app.models import User, Doctor
 import re
 from flask import jsonify
 from http import HTTPStatus
+from app.utils.directory_cache import directory_response
+from app.utils.ssn_utils import hash_ssn
+from app.utils.serialization import DOCTOR_SCHEMA
 
-def query_builder(data: Dict[str, str], query_type: str, queried_param: str) -> List[User]:
+def find_user_by_ssn(ssn: str) -> Optional[User]:
     """
-    Constructs and executes a database query on the User model based on the specified query type and parameter.
+    Looks a patient up by SSN with a single probe of the unique User.ssn_hash index.
 
     Parameters:
-    - data (Dict[str, str]): A dictionary containing the data to be queried, typically including user attributes like 'ssn'.
-    - query_type (str): The type of query to perform. It can be 'all', 'one', or 'first', determining the method of retrieval.
-    - queried_param (str): The key in the data dictionary that specifies which attribute to filter by, e.g., 'ssn'.
+    - ssn (str): The patient's SSN, with or without separators.
 
     Returns:
-    - List[User]: A list of User objects that match the query criteria. The list may contain one or more users, or be empty.
-    
-    The function supports three query types:
-    - 'all': Retrieves all User records matching the specified parameter.
-    - 'one': Retrieves exactly one User record matching the specified parameter, raising an error if none or more than one is found.
-    - 'first': Retrieves the first User record matching the specified parameter, or None if no match is found.
+    - Optional[User]: The patient, or None if no patient has this SSN.
     """
-
-    if query_type == "all":
-        query = User.query.filter_by(ssn=data[queried_param]).all()
-    elif query_type == "one":
-        query = User.query.filter_by(ssn=data[queried_param]).one()
-    elif query_type == "first":
-        query = User.query.filter_by(ssn=data[queried_param]).first()
-    
-    return query
+    return db.session.execute(
+        select(User).where(User.ssn_hash == hash_ssn(ssn))
+    ).scalar_one_or_none()
 
     
 def parse_phone_number(phone: str) -> str:
@@ -79,20 +71,16 @@ def create_success_response(message: str, status_code: int) -> tuple[Dict, int]:
 def fetch_all_doctors():
     """
     Logic to fetch/get all the doctors in the system.
+
+    The serialized directory is cached until the roster changes and served with an ETag,
+    so polling clients sending If-None-Match get a 304 without touching the database.
     """
+    def load_doctors():
+        # Only the listed columns are read, no Doctor objects are built for a read-only listing
+        return DOCTOR_SCHEMA.dump_all(db.session.execute(DOCTOR_SCHEMA.select().order_by(Doctor.id)))
+
     try:
-        doctors = Doctor.query.all()
-        
-        doctors_data = [{
-            "id": doctor.id,
-            "name": doctor.name,
-            "specialties": doctor.specialties
-        } for doctor in doctors]
-        
-        return create_success_response(
-            doctors_data,
-            HTTPStatus.OK
-        )
+        return directory_response(load_doctors)
 
     except Exception as e:
         return create_error_response(
@@ -119,3 +107,4 @@ def validate_phone_number(phone_number: str) -> str:
         raise ValueError("Phone number cannot be null")
     return phone
 
+
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Callable, Optional
+from sqlalchemy import Table, event
+
+# Per-process caches are rebuilt when the version of the data they were built from moves, or once
+# they are older than their max age. A version bump is only seen by the process that made the change,
+# so the max age bounds how long a worker serves data that another worker has changed since.
+
+
+class VersionCounter:
+    """A version number bumped whenever the data it tracks changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def bump(self) -> None:
+        with self._lock:
+            self.value += 1
+
+
+class BuildStamp:
+    """The version a cache was built at and when, to tell whether it has to be rebuilt."""
+
+    __slots__ = ('max_age', 'version', 'built_at')
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self.version: Optional[int] = None
+        # None until the first build, and again once invalidated
+        self.built_at: Optional[float] = None
+
+    def is_stale(self, version: Optional[int] = None) -> bool:
+        return self.built_at is None or self.version != version or time.monotonic() - self.built_at > self.max_age
+
+    def mark_built(self, version: Optional[int] = None) -> None:
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self.built_at = None
+
+
+def rebuild_if_stale(stamp: BuildStamp, current_version: Callable[[], int], rebuild: Callable[[int], None]) -> None:
+    """
+    Calls rebuild with the current version if the cache stamped by stamp is stale.
+
+    The version is read before rebuild loads anything, so a change committed during the load
+    leaves the cache behind the new version and triggers another rebuild.
+    """
+    version = current_version()
+    if stamp.is_stale(version):
+        rebuild(version)
+
+
+def reset_on_ddl(table: Table, reset: Callable[[], None]) -> None:
+    """Calls reset whenever table is created or dropped, so a cache never outlives the schema it was built from."""
+    def _reset(target, connection, **kw):
+        reset()
+
+    event.listen(table, 'after_create', _reset)
+    event.listen(table, 'after_drop', _reset)
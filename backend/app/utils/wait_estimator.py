@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+from app.models import Queue
+
+# Consultation length assumed for a doctor nobody has timed yet
+DEFAULT_CONSULT_MINUTES = 15.0
+# Spread assumed around the default until real consultations have been observed
+DEFAULT_CONSULT_STDDEV_MINUTES = 7.5
+# Weight of the newest consultation in the moving average, roughly the last 1 / alpha patients dominate
+EWMA_ALPHA = 0.2
+# Gaps between two patients longer than this are breaks, not consultations, and are ignored
+MAX_CONSULT_MINUTES = 120
+# How often in-memory estimates are written back to the queue rows
+PERSIST_INTERVAL_SECONDS = 60
+# Two sided 90% normal band around the estimate
+BAND_Z = 1.645
+
+
+class WaitEstimate(NamedTuple):
+    minutes: float
+    low: float
+    high: float
+
+    def as_dict(self) -> dict:
+        return {
+            "estimated_wait_minutes": self.minutes,
+            "estimated_wait_range": [self.low, self.high]
+        }
+
+
+class ConsultStats:
+    """Exponentially weighted mean and variance of one doctor's consultation length, in minutes."""
+
+    __slots__ = ('mean', 'variance', 'samples', 'dirty')
+
+    def __init__(self, mean: Optional[float] = None, variance: Optional[float] = None, samples: Optional[int] = None):
+        self.mean = DEFAULT_CONSULT_MINUTES if mean is None else mean
+        self.variance = DEFAULT_CONSULT_STDDEV_MINUTES ** 2 if variance is None else variance
+        self.samples = samples or 0
+        self.dirty = False
+
+    def observe(self, minutes: float) -> None:
+        """Folds one consultation into the moving mean and variance in O(1)."""
+        diff = minutes - self.mean
+        increment = EWMA_ALPHA * diff
+        self.mean += increment
+        self.variance = (1 - EWMA_ALPHA) * (self.variance + diff * increment)
+        self.samples += 1
+        self.dirty = True
+
+    def estimate(self, patients_ahead: int) -> WaitEstimate:
+        """
+        Estimates the wait behind a number of patients.
+
+        The wait is the sum of their consultations, so its spread grows with the square root
+        of the number of patients ahead rather than linearly.
+        """
+        if patients_ahead <= 0:
+            return WaitEstimate(0.0, 0.0, 0.0)
+        minutes = patients_ahead * self.mean
+        spread = BAND_Z * math.sqrt(patients_ahead * self.variance)
+        return WaitEstimate(round(minutes, 1), round(max(0.0, minutes - spread), 1), round(minutes + spread, 1))
+
+
+class WaitEstimator:
+    """
+    Per-queue consultation length estimates, kept in memory and persisted periodically.
+
+    Every served patient updates the estimate in constant time, so neither dequeues nor
+    status requests query the queue's history. Estimates are loaded from their queue row
+    the first time a process needs them, and dirty estimates are written back at most once
+    every PERSIST_INTERVAL_SECONDS, from whichever dequeue notices the interval has passed.
+    """
+
+    def __init__(self, persist_interval: float = PERSIST_INTERVAL_SECONDS):
+        self.persist_interval = persist_interval
+        self._lock = threading.Lock()
+        self._stats: Dict[int, ConsultStats] = {}
+        self._last_persist = time.monotonic()
+
+    def stats(self, session: Session, queue_id: int) -> ConsultStats:
+        """Returns a queue's estimate, loading it from the queue row the first time."""
+        stats = self._stats.get(queue_id)
+        if stats is not None:
+            return stats
+
+        row = session.execute(
+            select(Queue.avg_consult_minutes, Queue.consult_variance, Queue.consult_samples)
+            .where(Queue.id == queue_id)
+        ).one_or_none()
+        loaded = ConsultStats(*row) if row is not None else ConsultStats()
+        with self._lock:
+            return self._stats.setdefault(queue_id, loaded)
+
+    def mean_minutes(self, queue_id: Optional[int], persisted: Optional[float] = None) -> float:
+        """Returns a queue's average consultation length without touching the database, falling back to the persisted value."""
+        stats = self._stats.get(queue_id)
+        if stats is not None:
+            return stats.mean
+        return DEFAULT_CONSULT_MINUTES if persisted is None else persisted
+
+    def estimate(self, session: Session, queue_id: int, patients_ahead: int) -> WaitEstimate:
+        """
+        Estimates a wait in a queue.
+
+        patients_ahead counts the patients who will be seen before the one waiting, not the
+        patient themselves: everyone waiting for a newcomer, position - 1 for a patient in line.
+        """
+        return self.stats(session, queue_id).estimate(patients_ahead)
+
+    def record_consultation(self, session: Session, queue_id: int, previous_served_at: Optional[datetime],
+                            served_at: datetime) -> None:
+        """
+        Records the consultation that ended when the next patient was called.
+
+        Parameters:
+        - session (Session): Session used to load the estimate and to persist estimates when due.
+        - queue_id (int): ID of the queue.
+        - previous_served_at (Optional[datetime]): When the previous patient was called, or None if the
+          queue emptied since, in which case the gap includes idle time and isn't a consultation.
+        - served_at (datetime): When the next patient was called.
+        """
+        if previous_served_at is not None:
+            minutes = (served_at - previous_served_at).total_seconds() / 60
+            if 0 < minutes <= MAX_CONSULT_MINUTES:
+                stats = self.stats(session, queue_id)
+                with self._lock:
+                    stats.observe(minutes)
+
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist(session)
+
+    def persist(self, session: Session) -> int:
+        """
+        Writes every estimate changed since the last persist to its queue row and commits.
+
+        Returns:
+        - int: The number of queues written.
+        """
+        with self._lock:
+            self._last_persist = time.monotonic()
+            dirty = [(queue_id, stats) for queue_id, stats in self._stats.items() if stats.dirty]
+            rows = [{
+                "queue_id": queue_id,
+                "mean": stats.mean,
+                "variance": stats.variance,
+                "samples": stats.samples
+            } for queue_id, stats in dirty]
+            for _, stats in dirty:
+                stats.dirty = False
+
+        if rows:
+            session.connection().execute(
+                update(Queue.__table__)
+                .where(Queue.__table__.c.id == bindparam('queue_id'))
+                .values(
+                    avg_consult_minutes=bindparam('mean'),
+                    consult_variance=bindparam('variance'),
+                    consult_samples=bindparam('samples')
+                ),
+                rows
+            )
+            session.commit()
+        return len(rows)
+
+    def clear(self) -> None:
+        """Forgets every in-memory estimate, they are reloaded from the queue rows on next use."""
+        with self._lock:
+            self._stats.clear()
+
+
+wait_estimator = WaitEstimator()
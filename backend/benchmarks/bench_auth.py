@@ -0,0 +1,40 @@
+"""
+Microbenchmark of the authentication overhead token_required adds to every protected request.
+
+Times a no-op view wrapped in token_required inside a request context, once with the
+verified token cache disabled (a full decode and HMAC check per request, the old path)
+and once with it enabled, so only the auth step itself is measured.
+
+Usage:
+    JWT_SECRET_KEY=... python -m benchmarks.bench_auth [--repeat 20000]
+"""
+import argparse
+from flask import Flask
+from app.utils import jwt_utils
+from app.utils.jwt_utils import TokenCache, generate_token, token_required
+from benchmarks.common import measure, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="Timed requests per variant")
+    args = parser.parse_args()
+
+    if not jwt_utils.JWT_SECRET_KEY:
+        jwt_utils.JWT_SECRET_KEY = "bench-secret"
+
+    app = Flask(__name__)
+    token = generate_token(1, "123456")
+    view = token_required(lambda: "ok")
+
+    rows = []
+    for variant, cache in [("uncached decode", TokenCache(max_size=0)), ("verified token cache", TokenCache())]:
+        jwt_utils.token_cache = cache
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            stats = measure(view, repeat=args.repeat, warmup=100)
+        rows.append({"variant": variant, **stats, "mean_us": round(stats["mean_ms"] * 1000, 2)})
+    print_table(rows, ["variant", "mean_us", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmarks concurrent slot booking with N parallel clients.
+
+Every client repeatedly tries to book a random slot out of a small pool of popular slots.
+Two strategies are compared on a throwaway SQLite database:
+- read-check-write: the previous book_slot logic, reading is_available and flipping it in Python
+- conditional update: slot_utils.reserve_slot, a single UPDATE ... WHERE is_available
+
+For each it reports successful bookings per second, the conflict rate and the number of
+double bookings, i.e. successful bookings beyond the number of slots.
+
+Usage:
+    python -m benchmarks.bench_booking [--clients 16] [--slots 200] [--attempts 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from app.database import db
+from app.models import User, Doctor, Slot
+from app.utils.ssn_utils import hash_ssn
+from app.utils.slot_utils import reserve_slot, SlotUnavailableError
+from benchmarks.common import print_table
+
+
+def read_check_write(session: Session, slot_id: int, patient_id: int) -> bool:
+    slot = session.get(Slot, slot_id)
+    if not slot.is_available:
+        session.rollback()
+        return False
+    # Widen the race window the way a slow request would
+    time.sleep(0.0005)
+    slot.is_available = False
+    slot.patient_id = patient_id
+    session.commit()
+    return True
+
+
+def conditional_update(session: Session, slot_id: int, patient_id: int) -> bool:
+    try:
+        reserve_slot(session, slot_id, patient_id)
+        return True
+    except SlotUnavailableError:
+        return False
+
+
+def run(strategy, clients: int, slots: int, attempts: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}", connect_args={"timeout": 60})
+        db.metadata.create_all(engine)
+
+        start = datetime(2025, 3, 3, 9)
+        with engine.begin() as conn:
+            conn.execute(insert(Doctor), [{
+                "id": 1, "ssn": "D1", "name": "Doctor", "specialties": "General Medicine",
+                "experience": 5, "opd_rate": 100.0, "is_available": True
+            }])
+            conn.execute(insert(User), [{
+                "id": i, "ssn": f"P{i}", "ssn_hash": hash_ssn(f"P{i}", "bench-ssn-key"), "name": f"Patient {i}", "phone": "5550000000", "checkin_status": False
+            } for i in range(1, clients + 1)])
+            conn.execute(insert(Slot), [{
+                "id": i, "doctor_id": 1, "start_time": start + timedelta(minutes=15 * i),
+                "end_time": start + timedelta(minutes=15 * (i + 1)), "is_available": True, "slot_type": "appointment"
+            } for i in range(1, slots + 1)])
+
+        successes = []
+        lock = threading.Lock()
+
+        def client(patient_id: int) -> int:
+            rng = random.Random(patient_id)
+            won = 0
+            with Session(engine) as session:
+                for _ in range(attempts):
+                    if strategy(session, rng.randint(1, slots), patient_id):
+                        won += 1
+            with lock:
+                successes.append(won)
+            return won
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(client, range(1, clients + 1)))
+        elapsed = time.perf_counter() - began
+        engine.dispose()
+
+    booked = sum(successes)
+    total = clients * attempts
+    return {
+        "strategy": strategy.__name__,
+        "clients": clients,
+        "bookings": booked,
+        "bookings_per_s": round(booked / elapsed, 1),
+        "attempts_per_s": round(total / elapsed, 1),
+        "conflict_rate": f"{(total - booked) / total:.1%}",
+        "double_bookings": max(0, booked - slots),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="Number of parallel clients")
+    parser.add_argument("--slots", type=int, default=200, help="Number of slots the clients compete for")
+    parser.add_argument("--attempts", type=int, default=50, help="Booking attempts per client")
+    args = parser.parse_args()
+
+    results = [run(strategy, args.clients, args.slots, args.attempts)
+               for strategy in (read_check_write, conditional_update)]
+    print_table(results, ["strategy", "clients", "bookings", "bookings_per_s", "attempts_per_s",
+                          "conflict_rate", "double_bookings"])
+
+
+if __name__ == "__main__":
+    main()
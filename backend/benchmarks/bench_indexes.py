@@ -0,0 +1,142 @@
+"""
+Benchmarks the hot query shapes in app/models.py with and without their secondary indexes.
+
+Seeds a throwaway SQLite database with 100k slots and 100k queue entries, then prints the
+query plan and latency of each query, first with the indexes dropped and then with them created.
+
+Usage:
+    python -m benchmarks.bench_indexes [--rows 100000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+from app.database import db
+from app.models import User, Doctor, Queue, QueueEntry, Slot
+from app.utils.ssn_utils import hash_ssn
+from benchmarks.common import measure, print_table
+
+NUM_DOCTORS = 200
+
+QUERIES = {
+    "queue head": (
+        "SELECT id, patient_id FROM queue_entry WHERE queue_id = :queue_id AND status = 'waiting' "
+        "ORDER BY sort_key, seq LIMIT 1"
+    ),
+    "queue listing": (
+        "SELECT seq, patient_id, status FROM queue_entry WHERE queue_id = :queue_id AND status = 'waiting' "
+        "ORDER BY sort_key, seq"
+    ),
+    "available slots": (
+        "SELECT id, start_time, end_time FROM slot WHERE doctor_id = :doctor_id AND is_available = 1 "
+        "AND start_time BETWEEN :start AND :end ORDER BY start_time"
+    ),
+    "slots by patient": "SELECT id FROM slot WHERE patient_id = :patient_id",
+    "entries by patient": "SELECT id FROM queue_entry WHERE patient_id = :patient_id",
+}
+
+
+def waiting_patient_id(i: int, num_patients: int) -> int:
+    """
+    Patient of the i-th queue entry while it is waiting. A queue's entries get consecutive
+    patients from an offset of their own, so nobody waits twice in the same queue, as
+    uq_queue_entry_waiting_patient requires, however many patients are seeded.
+    """
+    queue_offset = (i % NUM_DOCTORS) * max(1, num_patients // NUM_DOCTORS)
+    return (i // NUM_DOCTORS + queue_offset) % num_patients + 1
+
+
+def seed(engine, rows: int) -> None:
+    """Seeds doctors, patients, queues, queue entries and slots with Core bulk inserts."""
+    rng = random.Random(42)
+    num_patients = rows // 2
+    now = datetime(2025, 1, 1, 8, 0)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Doctor), [{
+            "id": i, "ssn": f"D{i:07d}", "name": f"Doctor {i}", "specialties": "General Medicine",
+            "experience": 5, "opd_rate": 100.0, "is_available": True
+        } for i in range(1, NUM_DOCTORS + 1)])
+        conn.execute(insert(User), [{
+            "id": i, "ssn": f"P{i:07d}", "ssn_hash": hash_ssn(f"P{i:07d}", "bench-ssn-key"), "name": f"Patient {i}", "phone": "5550000000", "checkin_status": False
+        } for i in range(1, num_patients + 1)])
+        conn.execute(insert(Queue), [{
+            "id": i, "doctor_id": i, "total_patients": 0, "last_seq": 0
+        } for i in range(1, NUM_DOCTORS + 1)])
+
+        # Most entries have already been served, as they would be after a few weeks of operation
+        first_waiting = rows - NUM_DOCTORS * 20
+        conn.execute(insert(QueueEntry), [{
+            "queue_id": (i % NUM_DOCTORS) + 1,
+            "patient_id": waiting_patient_id(i, num_patients) if i >= first_waiting else i % num_patients + 1,
+            "seq": i // NUM_DOCTORS + 1,
+            "sort_key": i // NUM_DOCTORS + 1,
+            "status": "waiting" if i >= first_waiting else "served"
+        } for i in range(rows)])
+
+        slots = []
+        for i in range(rows):
+            start = now + timedelta(minutes=15 * (i // NUM_DOCTORS))
+            booked = rng.random() < 0.3
+            slots.append({
+                "doctor_id": (i % NUM_DOCTORS) + 1,
+                "start_time": start,
+                "end_time": start + timedelta(minutes=15),
+                "is_available": not booked,
+                "patient_id": rng.randint(1, num_patients) if booked else None,
+                "slot_type": "appointment"
+            })
+        conn.execute(insert(Slot), slots)
+        conn.execute(text("ANALYZE"))
+
+
+def run_queries(engine, repeat: int, label: str) -> list:
+    """Prints the plan of every query and returns its latency summary."""
+    params = {
+        "queue_id": 7, "doctor_id": 7, "patient_id": 1234,
+        "start": datetime(2025, 1, 10), "end": datetime(2025, 1, 17)
+    }
+    results = []
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+            print(f"[{label}] {name}: {' | '.join(row[-1] for row in plan)}")
+            stats = measure(lambda: conn.execute(text(sql), params).fetchall(), repeat=repeat)
+            results.append({"query": name, "indexes": label, **stats})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of slots and of queue entries to seed")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed executions per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        db.metadata.create_all(engine)
+
+        indexes = [index for table in (QueueEntry.__table__, Slot.__table__) for index in table.indexes
+                   if not index.unique]
+        for index in indexes:
+            index.drop(engine)
+
+        seed(engine, args.rows)
+        results = run_queries(engine, args.repeat, "without")
+
+        for index in indexes:
+            index.create(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        results += run_queries(engine, args.repeat, "with")
+
+        print()
+        print_table(sorted(results, key=lambda row: row["query"]),
+                    ["query", "indexes", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
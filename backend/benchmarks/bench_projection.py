@@ -0,0 +1,133 @@
+"""
+Compares ORM hydration with column projections on the read paths of the queue and doctor listings.
+
+Seeds a throwaway SQLite database with one queue of 10k waiting patients and 10k doctors, then
+builds each response body both ways:
+- orm: the previous code, loading full Queue, QueueEntry and Doctor objects into the session
+- projection: the column selects the routes use now, returning plain rows
+
+For each it reports latency, and from tracemalloc the peak memory and the number of
+allocations still live at the peak of one call.
+
+Usage:
+    python -m benchmarks.bench_projection [--rows 10000] [--repeat 50]
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from app.database import db
+from app.models import User, Doctor, Queue, QueueEntry
+from app.utils.queue_utils import QUEUE_ORDER, find_queue, waiting_entries
+from app.utils.serialization import DOCTOR_SCHEMA
+from app.utils.ssn_utils import hash_ssn
+from benchmarks.common import measure, print_table
+
+
+def seed(engine, rows: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(insert(Doctor), [{
+            "id": i, "ssn": f"D{i:07d}", "name": f"Doctor {i}", "specialties": "General Medicine",
+            "experience": 5, "opd_rate": 100.0, "is_available": True
+        } for i in range(1, rows + 1)])
+        conn.execute(insert(User), [{
+            "id": i, "ssn": f"P{i:07d}", "ssn_hash": hash_ssn(f"P{i:07d}", "bench-ssn-key"), "name": f"Patient {i}",
+            "phone": "5550000000", "checkin_status": False
+        } for i in range(1, rows + 1)])
+        conn.execute(insert(Queue), [{"id": 1, "doctor_id": 1, "total_patients": rows, "last_seq": rows}])
+        conn.execute(insert(QueueEntry), [{
+            "queue_id": 1, "patient_id": i, "seq": i, "sort_key": i, "priority": 0, "status": "waiting"
+        } for i in range(1, rows + 1)])
+
+
+def queue_orm(session: Session) -> dict:
+    queue = session.query(Queue).filter_by(doctor_id=1).first()
+    entries = session.query(QueueEntry).filter_by(queue_id=queue.id, status="waiting").order_by(*QUEUE_ORDER).all()
+    return {
+        "total_patients": queue.total_patients,
+        "current_queue": [{
+            "position": position,
+            "patient_id": entry.patient_id,
+            "priority": entry.priority,
+            "status": entry.status
+        } for position, entry in enumerate(entries, start=1)]
+    }
+
+
+def queue_projection(session: Session) -> dict:
+    queue = find_queue(session, 1)
+    return {
+        "total_patients": queue.total_patients,
+        "current_queue": [{
+            "position": position,
+            "patient_id": patient_id,
+            "priority": priority,
+            "status": status
+        } for position, (patient_id, priority, status) in enumerate(waiting_entries(session, queue.id), start=1)]
+    }
+
+
+def doctors_orm(session: Session) -> list:
+    return [{
+        "id": doctor.id,
+        "name": doctor.name,
+        "specialties": doctor.specialties,
+        "is_available": doctor.is_available
+    } for doctor in session.query(Doctor).all()]
+
+
+def doctors_projection(session: Session) -> list:
+    return DOCTOR_SCHEMA.dump_all(session.execute(DOCTOR_SCHEMA.select().order_by(Doctor.id)))
+
+
+VARIANTS = {
+    "queue listing": {"orm": queue_orm, "projection": queue_projection},
+    "doctor directory": {"orm": doctors_orm, "projection": doctors_projection},
+}
+
+
+def profile(session: Session, fn) -> dict:
+    """Peak traced memory and live allocations at the end of one call, with a clean session."""
+    session.expunge_all()
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fn(session)
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+    del result
+    return {"peak_kb": peak // 1024, "live_blocks": blocks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="Queue entries and doctors to seed")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed calls per variant")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        db.metadata.create_all(engine)
+        seed(engine, args.rows)
+
+        with Session(engine) as session:
+            for path, variants in VARIANTS.items():
+                for variant, fn in variants.items():
+                    def call():
+                        fn(session)
+                        # Each request starts with an empty session, as it does under Flask-SQLAlchemy
+                        session.expunge_all()
+                    stats = measure(call, repeat=args.repeat)
+                    results.append({"path": path, "variant": variant, **stats, **profile(session, fn)})
+        engine.dispose()
+
+    print_table(results, ["path", "variant", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "peak_kb", "live_blocks"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmarks end-to-end response time of the large list endpoints through the Flask test client.
+
+Seeds an in-memory database with patients, doctors and slots, then times each endpoint
+three ways:
+- legacy: the previous handlers, hydrating ORM objects, building dicts field by field and
+  encoding with Flask's default stdlib JSON provider
+- schema + json: column selects dumped through the model schemas, stdlib encoder
+- schema + orjson: the same with orjson, skipped if it isn't installed
+
+Usage:
+    JWT_SECRET_KEY=... python -m benchmarks.bench_serialization [--rows 20000] [--repeat 30]
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+from flask import Blueprint
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+from app import create_app
+from app.database import db
+from app.models import User, Doctor, Slot, Specialty, doctor_specialty
+from app.utils.serialization import ENCODERS, set_encoder
+from app.utils.ssn_utils import hash_ssn
+from benchmarks.common import measure, print_table
+
+PAGE_SIZE = 5000
+
+legacy = Blueprint('legacy', __name__)
+
+
+@legacy.route('/users')
+def legacy_users():
+    return [{
+        "id": user.id,
+        "name": user.name,
+        "ssn": user.ssn,
+        "phone": user.phone,
+        "checkin_status": user.checkin_status
+    } for user in User.query.order_by(User.id).limit(PAGE_SIZE).all()]
+
+
+@legacy.route('/slots')
+def legacy_slots():
+    return [{
+        "slot_id": slot.id,
+        "doctor_id": slot.doctor_id,
+        "start_time": slot.start_time.isoformat(),
+        "end_time": slot.end_time.isoformat(),
+        "slot_type": slot.slot_type
+    } for slot in Slot.query.order_by(Slot.id).limit(PAGE_SIZE).all()]
+
+
+@legacy.route('/doctors')
+def legacy_doctors():
+    return [{
+        "id": doctor.id,
+        "name": doctor.name,
+        "specialties": doctor.specialties,
+        "is_available": doctor.is_available
+    } for doctor in Doctor.query.join(
+        doctor_specialty, doctor_specialty.c.doctor_id == Doctor.id
+    ).filter(doctor_specialty.c.specialty_id == 1).order_by(Doctor.id).all()]
+
+
+ENDPOINTS = {
+    "users page": ('/api/dev/get/users?limit=5000', '/legacy/users'),
+    "slots page": ('/api/dev/get/slots?limit=5000', '/legacy/slots'),
+    "doctors by specialty": ('/api/doctors?specialty=General%20Medicine', '/legacy/doctors'),
+}
+
+
+def seed(rows: int) -> None:
+    """Seeds rows patients and rows slots over rows // 10 doctors, all practising one specialty."""
+    num_doctors = max(1, rows // 10)
+    start = datetime(2025, 3, 3, 9)
+    db.session.execute(insert(Specialty), [{"id": 1, "name": "General Medicine", "key": "general medicine"}])
+    db.session.execute(insert(Doctor), [{
+        "id": i, "ssn": f"D{i:07d}", "name": f"Doctor {i}", "specialties": "General Medicine",
+        "experience": 5, "opd_rate": 100.0, "is_available": True
+    } for i in range(1, num_doctors + 1)])
+    db.session.execute(insert(doctor_specialty), [{"doctor_id": i, "specialty_id": 1} for i in range(1, num_doctors + 1)])
+    db.session.execute(insert(User), [{
+        "id": i, "ssn": f"P{i:07d}", "ssn_hash": hash_ssn(f"P{i:07d}", "bench-ssn-key"), "name": f"Patient {i}",
+        "phone": "5550000000", "checkin_status": False
+    } for i in range(1, rows + 1)])
+    db.session.execute(insert(Slot), [{
+        "doctor_id": i % num_doctors + 1, "start_time": start + timedelta(minutes=15 * i),
+        "end_time": start + timedelta(minutes=15 * (i + 1)), "is_available": True, "slot_type": "appointment"
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Patients and slots to seed")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed requests per endpoint and variant")
+    args = parser.parse_args()
+
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+    app = create_app('Test')
+    app.register_blueprint(legacy, url_prefix='/legacy')
+    fast_provider, default_provider = app.json, DefaultJSONProvider(app)
+
+    variants = [("legacy", "json", 1)] + [(f"schema + {name}", name, 0) for name in ENCODERS]
+    results = []
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+        client = app.test_client()
+
+        for endpoint, urls in ENDPOINTS.items():
+            for variant, encoder, url_index in variants:
+                set_encoder(encoder)
+                app.json = default_provider if variant == "legacy" else fast_provider
+                url = urls[url_index]
+                size = len(client.get(url).get_data())
+                stats = measure(lambda: client.get(url).get_data(), repeat=args.repeat, warmup=3)
+                results.append({"endpoint": endpoint, "variant": variant, "kb": size // 1024, **stats})
+
+        app.json = fast_provider
+        set_encoder('auto')
+        db.drop_all()
+
+    print_table(results, ["endpoint", "variant", "kb", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
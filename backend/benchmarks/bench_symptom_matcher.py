@@ -0,0 +1,74 @@
+"""
+Microbenchmark for the symptom matcher behind /api/patients/symptoms/match.
+
+Builds the matcher over a synthetic roster of doctors with a vocabulary padded with
+synthetic synonyms, then times index builds and individual matches. Queue lengths
+are served from memory so only the matcher itself is measured.
+
+Usage:
+    python -m benchmarks.bench_symptom_matcher [--doctors 5000] [--synonyms 50000]
+"""
+import argparse
+import random
+import time
+from app.utils.symptom_matcher import SymptomMatcher, SYMPTOM_SPECIALTIES, SYMPTOM_SYNONYMS, DoctorEntry
+from benchmarks.common import measure, print_table
+
+SPECIALTIES = sorted({specialty.title() for weights in SYMPTOM_SPECIALTIES.values() for specialty in weights})
+
+SAMPLE_SYMPTOMS = [
+    "I have had chest pain and palpitations since this morning",
+    "my child has a fever and a runny nose",
+    "itchy rash on both arms, it started after hiking",
+    "feeling low, can't sleep and always tired",
+    "twisted ankle playing football, cannot put weight on it",
+    "something just feels off",
+]
+
+
+def synthetic_roster(count: int, rng: random.Random):
+    for i in range(count):
+        yield DoctorEntry(
+            id=i + 1,
+            name=f"Doctor {i + 1}",
+            specialties=", ".join(rng.sample(SPECIALTIES, rng.randint(1, 3))),
+            is_available=rng.random() < 0.8
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=5000, help="Number of doctors in the roster")
+    parser.add_argument("--synonyms", type=int, default=50000, help="Synthetic synonyms added to the vocabulary")
+    parser.add_argument("--repeat", type=int, default=2000, help="Timed matches per sample")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    keywords = list(SYMPTOM_SPECIALTIES)
+    synonyms = dict(SYMPTOM_SYNONYMS)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    while len(synonyms) < len(SYMPTOM_SYNONYMS) + args.synonyms:
+        phrase = " ".join("".join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 3)))
+        synonyms[phrase] = rng.choice(keywords)
+
+    matcher = SymptomMatcher(SYMPTOM_SPECIALTIES, synonyms)
+    roster = list(synthetic_roster(args.doctors, rng))
+    queue_lengths = {doctor.id: rng.randint(0, 40) for doctor in roster}
+
+    def lookup(doctor_ids):
+        return {doctor_id: queue_lengths[doctor_id] for doctor_id in doctor_ids}
+
+    started = time.perf_counter()
+    matcher.build(roster)
+    print(f"vocabulary: {len(matcher.vocabulary)} phrases, index build for {args.doctors} doctors: "
+          f"{(time.perf_counter() - started) * 1000:.2f} ms")
+
+    rows = []
+    for symptoms in SAMPLE_SYMPTOMS:
+        stats = measure(lambda: matcher.best_match(symptoms, lookup), repeat=args.repeat)
+        rows.append({"symptoms": symptoms[:40], **stats})
+    print_table(rows, ["symptoms", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The benchmarks are plain scripts rather than tests, run from the backend directory, e.g.:
+    python -m benchmarks.bench_indexes
+"""
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+
+def measure(fn: Callable[[], object], repeat: int = 200, warmup: int = 5) -> Dict[str, float]:
+    """
+    Calls fn repeatedly and summarizes its latency.
+
+    Parameters:
+    - fn (Callable): The zero-argument callable to time.
+    - repeat (int): Number of timed calls.
+    - warmup (int): Number of untimed calls made first to warm caches.
+
+    Returns:
+    - Dict[str, float]: Mean, p50, p95 and p99 latency in milliseconds.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return summarize(samples)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarizes a list of latency samples given in milliseconds."""
+    samples = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    return {
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(percentile(50), 4),
+        "p95_ms": round(percentile(95), 4),
+        "p99_ms": round(percentile(99), 4),
+    }
+
+
+def print_table(rows: List[Dict[str, object]], columns: List[str], file=None) -> None:
+    """Prints a list of dicts as a left aligned text table, to stdout unless another file is given."""
+    file = file or sys.stdout
+    widths = {col: max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns), file=file)
+    for row in rows:
+        print("  ".join(str(row.get(col, '')).ljust(widths[col]) for col in columns), file=file)
@@ -0,0 +1,363 @@
+"""
+Benchmark harness for the kiosk hot paths, with results saved as JSON and compared to a baseline.
+
+Seeds a synthetic hospital of configurable size into a throwaway SQLite database and times
+patient login, queue join, queue next, available slots and slot booking with two drivers:
+- client: each scenario in turn through the Flask test client, no network or server in the way
+- http: all scenarios mixed, from concurrent keep-alive clients against gunicorn
+
+Each scenario reports requests/s, p50/p95/p99 latency and its status codes. Statuses the
+scenario expects under contention, e.g. 409 for a slot someone else booked first, are not errors.
+
+Usage (from the backend directory):
+    python -m benchmarks.harness [--doctors 50] [--patients 2000] [--slots-per-doctor 200] [--queue-depth 20]
+        [--drivers client http] [--requests 500] [--clients 16] [--duration 10] [--workers 2]
+        [--output results.json] [--baseline benchmarks/baseline.json] [--save-baseline benchmarks/baseline.json]
+
+With --baseline the run is compared scenario by scenario, and the exit status is 1 if any
+p95 grew or throughput fell by more than --tolerance (20% by default).
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+import jwt
+from sqlalchemy import create_engine, insert
+from app.database import db
+from app.models import User, Doctor, Queue, QueueEntry, Slot
+from app.utils import jwt_utils
+from app.utils.ssn_utils import hash_ssn
+from benchmarks.common import summarize, print_table
+from benchmarks.load_test import BACKEND_DIR, free_port, wait_for_server
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+SSN_HASH_KEY = "bench-ssn-key"
+# Patients that get a token up front, the ones booking slots
+TOKEN_PATIENTS = 200
+
+
+class Hospital(NamedTuple):
+    doctors: int
+    patients: int
+    slots_per_doctor: int
+    queue_depth: int
+
+
+class Call(NamedTuple):
+    method: str
+    path: str
+    body: Optional[dict]
+    headers: Dict[str, str]
+
+
+def seed(database_path: str, hospital: Hospital) -> None:
+    """Seeds doctors, patients, a queue of queue_depth patients per doctor and upcoming slots."""
+    engine = create_engine(f"sqlite:///{database_path}")
+    db.metadata.create_all(engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(insert(Doctor), [{
+            "id": i, "ssn": f"D{i}", "name": f"Doctor {i}", "specialties": "General Medicine",
+            "experience": 5, "opd_rate": 100.0, "is_available": True
+        } for i in range(1, hospital.doctors + 1)])
+        conn.execute(insert(User), [{
+            "id": i, "ssn": f"P{i}", "ssn_hash": hash_ssn(f"P{i}", SSN_HASH_KEY), "name": f"Patient {i}",
+            "phone": "5550000000", "checkin_status": False
+        } for i in range(1, hospital.patients + 1)])
+        conn.execute(insert(Queue), [{
+            "id": i, "doctor_id": i, "total_patients": hospital.queue_depth, "last_seq": hospital.queue_depth
+        } for i in range(1, hospital.doctors + 1)])
+        if hospital.queue_depth:
+            conn.execute(insert(QueueEntry), [{
+                "queue_id": q, "patient_id": (q * hospital.queue_depth + seq) % hospital.patients + 1,
+                "seq": seq, "sort_key": seq, "status": "waiting"
+            } for q in range(1, hospital.doctors + 1) for seq in range(1, hospital.queue_depth + 1)])
+        conn.execute(insert(Slot), [{
+            "id": (d - 1) * hospital.slots_per_doctor + i + 1, "doctor_id": d,
+            "start_time": now + timedelta(hours=1, minutes=15 * i),
+            "end_time": now + timedelta(hours=1, minutes=15 * (i + 1)), "is_available": True, "slot_type": "appointment"
+        } for d in range(1, hospital.doctors + 1) for i in range(hospital.slots_per_doctor)])
+    engine.dispose()
+
+
+class Scenarios:
+    """
+    Builds the requests of each scenario.
+
+    Joins hand out patients round robin, so a patient only rejoins a queue after every other
+    patient has been through the rotation.
+    """
+
+    def __init__(self, hospital: Hospital, secret: str):
+        self.hospital = hospital
+        expires = datetime.now(timezone.utc) + timedelta(hours=2)
+        self.tokens = {
+            patient_id: jwt.encode({"user_id": patient_id, "ssn": f"P{patient_id}", "exp": expires}, secret, algorithm="HS256")
+            for patient_id in range(1, min(TOKEN_PATIENTS, hospital.patients) + 1)
+        }
+        self._next_patient = 0
+        self._lock = threading.Lock()
+
+    def _patient(self) -> int:
+        with self._lock:
+            self._next_patient = self._next_patient % self.hospital.patients + 1
+            return self._next_patient
+
+    def _auth_header(self, patient_id: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[patient_id]}"}
+
+    def auth(self, rng: random.Random) -> Call:
+        patient_id = rng.randint(1, self.hospital.patients)
+        return Call("POST", "/api/patients/auth", {"ssn": f"P{patient_id}", "phone": "5550000000"}, {})
+
+    def join(self, rng: random.Random) -> Call:
+        return Call("POST", "/api/queue/join", {"doctor_id": rng.randint(1, self.hospital.doctors), "patient_id": self._patient()},
+                    self._auth_header(rng.choice(list(self.tokens))))
+
+    def next(self, rng: random.Random) -> Call:
+        return Call("GET", f"/api/queue/next/{rng.randint(1, self.hospital.doctors)}", None, {})
+
+    def available(self, rng: random.Random) -> Call:
+        return Call("GET", f"/api/slots/available/{rng.randint(1, self.hospital.doctors)}", None,
+                    self._auth_header(rng.choice(list(self.tokens))))
+
+    def book(self, rng: random.Random) -> Call:
+        patient_id = rng.choice(list(self.tokens))
+        slot_id = rng.randint(1, self.hospital.doctors * self.hospital.slots_per_doctor)
+        return Call("POST", "/api/slots/book", {"slot_id": slot_id, "patient_id": patient_id}, self._auth_header(patient_id))
+
+
+# Scenario name, builder, statuses that count as success, weight in the HTTP mix
+SCENARIOS = [
+    ("auth", Scenarios.auth, {200}, 2),
+    ("available", Scenarios.available, {200}, 4),
+    ("join", Scenarios.join, {200, 201, 409}, 2),
+    ("next", Scenarios.next, {200, 404}, 1),
+    ("book", Scenarios.book, {200, 409}, 1),
+]
+
+
+def _result(latencies: List[float], statuses: Counter, expected: set, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        **summarize(latencies or [0.0]),
+        "errors": sum(count for status, count in statuses.items() if status not in expected),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def run_client(database_path: str, hospital: Hospital, secret: str, requests: int) -> Dict[str, dict]:
+    """Times each scenario in turn through the Flask test client, one request at a time."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ["SSN_HASH_KEY"] = SSN_HASH_KEY
+    from app import create_app
+    app = create_app('Prod')
+    client = app.test_client()
+    scenarios = Scenarios(hospital, secret)
+    rng = random.Random(1)
+
+    results = {}
+    for name, build, expected, _ in SCENARIOS:
+        latencies, statuses = [], Counter()
+        started = time.perf_counter()
+        for _ in range(requests):
+            call = build(scenarios, rng)
+            start = time.perf_counter()
+            response = client.open(call.path, method=call.method, json=call.body, headers=call.headers)
+            response.get_data()
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] += 1
+        results[name] = _result(latencies, statuses, expected, time.perf_counter() - started)
+    return results
+
+
+def run_http(database_path: str, hospital: Hospital, secret: str, clients: int, duration: float,
+             workers: int, threads: int) -> Dict[str, dict]:
+    """Drives the weighted scenario mix from concurrent keep-alive clients against gunicorn."""
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "JWT_SECRET_KEY": secret,
+        "SSN_HASH_KEY": SSN_HASH_KEY,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "WEB_THREADS": str(threads),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "wsgi:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    scenarios = Scenarios(hospital, secret)
+    names = [name for name, *_ in SCENARIOS]
+    weights = [weight for *_, weight in SCENARIOS]
+    builders = {name: build for name, build, *_ in SCENARIOS}
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Counter] = {name: Counter() for name in names}
+    lock = threading.Lock()
+
+    def client(seed_value: int, deadline: float) -> None:
+        rng = random.Random(seed_value)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = {name: [] for name in names}
+        local_statuses = {name: Counter() for name in names}
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            call = builders[name](scenarios, rng)
+            headers = {**call.headers, "Content-Type": "application/json"} if call.body is not None else call.headers
+            body = json.dumps(call.body) if call.body is not None else None
+            start = time.perf_counter()
+            try:
+                conn.request(call.method, call.path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                local_statuses[name][0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local[name].append((time.perf_counter() - start) * 1000)
+            local_statuses[name][response.status] += 1
+        conn.close()
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                statuses[name].update(local_statuses[name])
+
+    try:
+        wait_for_server(port)
+        deadline = time.monotonic() + duration
+        pool = [threading.Thread(target=client, args=(i, deadline)) for i in range(clients)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {name: _result(latencies[name], statuses[name], expected, elapsed) for name, _, expected, _ in SCENARIOS}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[dict]:
+    """Compares every driver and scenario present in both runs, flagging p95 or throughput regressions."""
+    rows = []
+    for driver, scenarios in results["results"].items():
+        for name, current in scenarios.items():
+            previous = baseline.get("results", {}).get(driver, {}).get(name)
+            if not previous:
+                continue
+            p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+            rps_change = (current["requests_per_s"] - previous["requests_per_s"]) / previous["requests_per_s"] \
+                if previous["requests_per_s"] else 0.0
+            rows.append({
+                "driver": driver,
+                "scenario": name,
+                "p95_ms": f"{previous['p95_ms']} -> {current['p95_ms']}",
+                "p95_change": f"{p95_change:+.0%}",
+                "requests_per_s": f"{previous['requests_per_s']} -> {current['requests_per_s']}",
+                "rps_change": f"{rps_change:+.0%}",
+                "regressed": p95_change > tolerance or rps_change < -tolerance,
+            })
+    return rows
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--slots-per-doctor", type=int, default=200)
+    parser.add_argument("--queue-depth", type=int, default=20, help="Patients already waiting in each queue")
+    parser.add_argument("--drivers", nargs="+", choices=["client", "http"], default=["client", "http"])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario with the test client")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of HTTP load")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument("--output", help="Write the results as JSON to this file instead of stdout")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="Save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 growth and throughput drop")
+    args = parser.parse_args()
+
+    if not jwt_utils.JWT_SECRET_KEY:
+        jwt_utils.JWT_SECRET_KEY = "bench-secret"
+    secret = jwt_utils.JWT_SECRET_KEY
+    hospital = Hospital(args.doctors, args.patients, args.slots_per_doctor, args.queue_depth)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "hospital": hospital._asdict(),
+            "client": {"requests": args.requests},
+            "http": {"clients": args.clients, "duration": args.duration, "workers": args.workers, "threads": args.threads},
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Each driver gets a freshly seeded database so both start from the same state
+        if "client" in args.drivers:
+            database_path = os.path.join(tmp_dir, "client.db")
+            seed(database_path, hospital)
+            results["results"]["client"] = run_client(database_path, hospital, secret, args.requests)
+        if "http" in args.drivers:
+            database_path = os.path.join(tmp_dir, "http.db")
+            seed(database_path, hospital)
+            results["results"]["http"] = run_http(database_path, hospital, secret, args.clients, args.duration,
+                                                  args.workers, args.threads)
+
+    rows = [{"driver": driver, "scenario": name, **{k: v for k, v in stats.items() if k != "statuses"}}
+            for driver, scenarios in results["results"].items() for name, stats in scenarios.items()]
+    print_table(rows, ["driver", "scenario", "requests", "requests_per_s", "errors", "p50_ms", "p95_ms", "p99_ms"],
+                file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        comparison = compare(results, baseline, args.tolerance)
+        print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):", file=sys.stderr)
+        print_table(comparison, ["driver", "scenario", "p95_ms", "p95_change", "requests_per_s", "rps_change", "regressed"],
+                    file=sys.stderr)
+        if any(row["regressed"] for row in comparison):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
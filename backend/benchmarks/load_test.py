@@ -0,0 +1,165 @@
+"""
+Load test showing how throughput scales with the number of gunicorn workers.
+
+Seeds a throwaway SQLite database, then for each worker count starts
+`gunicorn -c gunicorn.conf.py wsgi:app` against it and drives a mix of kiosk read
+requests from concurrent keep-alive HTTP clients for a fixed duration.
+
+Usage (from the backend directory, gunicorn must be installed):
+    python -m benchmarks.load_test [--workers 1 2 4] [--clients 32] [--duration 10]
+"""
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from app.database import db
+from app.models import User, Doctor, Queue, QueueEntry, Slot
+from app.utils.ssn_utils import hash_ssn
+from benchmarks.common import summarize, print_table
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NUM_DOCTORS = 50
+
+
+def seed(database_path: str, ssn_key: str) -> None:
+    engine = create_engine(f"sqlite:///{database_path}")
+    db.metadata.create_all(engine)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(insert(Doctor), [{
+            "id": i, "ssn": f"D{i}", "name": f"Doctor {i}", "specialties": "General Medicine",
+            "experience": 5, "opd_rate": 100.0, "is_available": True
+        } for i in range(1, NUM_DOCTORS + 1)])
+        conn.execute(insert(User), [{
+            "id": i, "ssn": f"P{i}", "ssn_hash": hash_ssn(f"P{i}", ssn_key), "name": f"Patient {i}", "phone": "5550000000", "checkin_status": False
+        } for i in range(1, 1001)])
+        conn.execute(insert(Queue), [{
+            "id": i, "doctor_id": i, "total_patients": 20, "last_seq": 20
+        } for i in range(1, NUM_DOCTORS + 1)])
+        conn.execute(insert(QueueEntry), [{
+            "queue_id": q, "patient_id": (q * 20 + seq) % 1000 + 1, "seq": seq, "sort_key": seq, "status": "waiting"
+        } for q in range(1, NUM_DOCTORS + 1) for seq in range(1, 21)])
+        conn.execute(insert(Slot), [{
+            "doctor_id": d, "start_time": now + timedelta(hours=1, minutes=15 * i),
+            "end_time": now + timedelta(hours=1, minutes=15 * (i + 1)), "is_available": True, "slot_type": "appointment"
+        } for d in range(1, NUM_DOCTORS + 1) for i in range(100)])
+    engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+def drive(port: int, clients: int, duration: float, token: str) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed_value: int):
+        rng = random.Random(seed_value)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            doctor_id = rng.randint(1, NUM_DOCTORS)
+            path, headers = rng.choice([
+                (f"/api/queue/status/{doctor_id}", {}),
+                ("/api/patients/doctors", {}),
+                (f"/api/slots/available/{doctor_id}", {"Authorization": f"Bearer {token}"}),
+            ])
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {"requests_per_s": round(len(latencies) / elapsed, 1), "errors": errors[0], **summarize(latencies or [0.0])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per worker count")
+    args = parser.parse_args()
+
+    import jwt
+    secret = os.getenv("JWT_SECRET_KEY") or "load-test-secret"
+    ssn_key = os.getenv("SSN_HASH_KEY") or "load-test-ssn-key"
+    token = jwt.encode({"user_id": 1, "ssn": "P1", "exp": datetime.utcnow() + timedelta(hours=1)}, secret, algorithm="HS256")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_path = os.path.join(tmp_dir, "load.db")
+        seed(database_path, ssn_key)
+
+        for workers in args.workers:
+            port = free_port()
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{database_path}",
+                "JWT_SECRET_KEY": secret,
+                "SSN_HASH_KEY": ssn_key,
+                "PORT": str(port),
+                "WEB_CONCURRENCY": str(workers),
+                "WEB_THREADS": str(args.threads),
+            }
+            server = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "wsgi:app"],
+                cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_for_server(port)
+                results.append({"workers": workers, "threads": args.threads,
+                                **drive(port, args.clients, args.duration, token)})
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print_table(results, ["workers", "threads", "requests_per_s", "errors", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,74 @@ import os
 
 load_dotenv()
 
+
+def engine_options(database_uri: str) -> dict:
+    """SQLAlchemy engine options suited to the database backend being used."""
+    if database_uri.startswith('sqlite'):
+        # Connections are shared across worker threads, pragmas are applied per connection in app.database
+        return {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+        # Test connections on checkout and recycle them before the server or a proxy drops idle ones
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
+
 class Config:
     """Base configuration."""
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+    # Key of the HMAC patient SSNs are looked up by, changing it requires rehashing every patient
+    SSN_HASH_KEY = os.getenv('SSN_HASH_KEY')
+    # Relay queue updates through Redis so streams on every worker see them, in-process only when unset
+    PUBSUB_REDIS_URL = os.getenv('PUBSUB_REDIS_URL')
+    QUEUE_STREAM_HEARTBEAT_SECONDS = 15
+    # Share cached queue snapshots between worker processes through a SQLite file at this path, in-process only when unset
+    QUEUE_CACHE_PATH = os.getenv('QUEUE_CACHE_PATH')
+    # Longest a cached queue snapshot is served for, bounding staleness after changes made outside join and next
+    QUEUE_CACHE_MAX_AGE_SECONDS = 5
+    # JSON encoder for responses: "orjson", "json" (stdlib) or "auto" to use orjson when it is installed
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+    # Per-endpoint latency and SQL metrics on /metrics. Latency is recorded for every request,
+    # SQL statements only for the sampled share of requests
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+    METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 1.0))
+    # Statement repeats within one request at which it is flagged as an N+1 query
+    METRICS_N_PLUS_ONE_THRESHOLD = 10
+    # Days of slots and finished queue entries kept in the live tables before they are archived
+    ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', 30))
+    # Run the archive job in-process every this many hours, off at 0 (use `flask archive` from cron instead)
+    ARCHIVE_INTERVAL_HOURS = float(os.getenv('ARCHIVE_INTERVAL_HOURS', 0))
+    # Whether in-process runs also VACUUM, which on SQLite rewrites the whole file under a write lock
+    ARCHIVE_VACUUM = os.getenv('ARCHIVE_VACUUM', '0') == '1'
+    # Pragmas applied to every new SQLite connection, none by default
+    SQLITE_PRAGMAS = {}
 
 class Dev(Config):
     """Development configuration."""
     DEVELOPMENT = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///dev.db'
+    SSN_HASH_KEY = os.getenv('SSN_HASH_KEY', 'dev-ssn-hash-key')
 
 class Test(Config):
     """Test configuration."""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SSN_HASH_KEY = 'test-ssn-hash-key'
+
+class Prod(Config):
+    """Production configuration."""
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///prod.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # WAL lets readers run alongside the single writer, and NORMAL sync is safe in WAL mode
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL',
+        'foreign_keys': 'ON',
+    }
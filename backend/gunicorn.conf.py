@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for serving wsgi:app in production.
+
+Every setting can be overridden from the environment:
+- PORT: Port to listen on, defaults to 8000
+- WEB_CONCURRENCY: Number of worker processes, defaults to 2 x CPUs + 1
+- WEB_THREADS: Threads per worker, defaults to 8
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Threaded workers so long lived queue streams don't each pin a whole process
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 8))
+
+# Streams send a heartbeat every QUEUE_STREAM_HEARTBEAT_SECONDS, well within this
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth, with jitter so they don't all restart together
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,80 @@
+"""initial schema
+
+Revision ID: 3f1c2a9d8b70
+Revises: 
+Create Date: 2025-01-27 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8b70'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ssn', sa.String(length=12), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('phone', sa.String(length=15), nullable=True),
+    sa.Column('checkin_status', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ssn')
+    )
+    op.create_table('doctor',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ssn', sa.String(length=12), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('specialties', sa.String(length=255), nullable=False),
+    sa.Column('experience', sa.Integer(), nullable=False),
+    sa.Column('opd_rate', sa.Float(), nullable=False),
+    sa.Column('is_available', sa.Boolean(), nullable=True),
+    sa.Column('phone', sa.String(length=100), nullable=True),
+    sa.Column('profile_picture', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ssn')
+    )
+    op.create_table('queue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('total_patients', sa.Integer(), nullable=True),
+    sa.Column('estimated_wait_time', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('doctor_id')
+    )
+    op.create_table('slot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('is_available', sa.Boolean(), nullable=True),
+    sa.Column('patient_id', sa.Integer(), nullable=True),
+    sa.Column('slot_type', sa.String(length=20), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('queue_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('queue_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.ForeignKeyConstraint(['patient_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['queue_id'], ['queue.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('queue_entry')
+    op.drop_table('slot')
+    op.drop_table('queue')
+    op.drop_table('doctor')
+    op.drop_table('user')
@@ -0,0 +1,51 @@
+"""queue ticket sequence
+
+Replaces the mutable QueueEntry.position with an immutable ticket number handed out
+from a per-queue counter, and adds the partial unique index that stops a patient
+from waiting twice in the same queue.
+
+Revision ID: 8a4e6b1f2c93
+Revises: 3f1c2a9d8b70
+Create Date: 2025-01-27 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6b1f2c93'
+down_revision = '3f1c2a9d8b70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_seq', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.alter_column('position', new_column_name='seq', existing_type=sa.Integer(), existing_nullable=False)
+
+    # Positions were dense per queue, so they carry over as ticket numbers and the counter starts after the highest one
+    op.execute(
+        "UPDATE queue SET last_seq = COALESCE("
+        "(SELECT MAX(queue_entry.seq) FROM queue_entry WHERE queue_entry.queue_id = queue.id), 0)"
+    )
+
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.create_index(
+            'uq_queue_entry_waiting_patient', ['queue_id', 'patient_id'],
+            unique=True,
+            sqlite_where=sa.text("status = 'waiting'"),
+            postgresql_where=sa.text("status = 'waiting'")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.drop_index('uq_queue_entry_waiting_patient')
+        batch_op.alter_column('seq', new_column_name='position', existing_type=sa.Integer(), existing_nullable=False)
+
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.drop_column('last_seq')
@@ -0,0 +1,61 @@
+"""user ssn hash
+
+Adds User.ssn_hash, the keyed hash patients are looked up by, and fills it in for the
+existing patients a batch at a time before making it required and uniquely indexed.
+Hashes use the app's SSN_HASH_KEY, so it must be configured before upgrading.
+
+Revision ID: a4c8d2e7f913
+Revises: e1b9f3c4a5d6
+Create Date: 2025-01-28 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils.ssn_utils import hash_ssn
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8d2e7f913'
+down_revision = 'e1b9f3c4a5d6'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ssn_hash', sa.String(length=64), nullable=True))
+
+    # Hash the existing SSNs a batch of patients at a time
+    conn = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('ssn', sa.String), sa.column('ssn_hash', sa.String))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(user.c.id, user.c.ssn)
+            .where(user.c.id > last_id)
+            .order_by(user.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        conn.execute(
+            sa.update(user).where(user.c.id == sa.bindparam('user_id')).values(ssn_hash=sa.bindparam('hashed')),
+            [{"user_id": user_id, "hashed": hash_ssn(ssn)} for user_id, ssn in rows]
+        )
+        last_id = rows[-1].id
+
+    # SQLite can only add NOT NULL by recreating the table. Slots and queue entries point to user,
+    # so this relies on env.py turning foreign keys off for the migration. Elsewhere it is a plain ALTER
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('ssn_hash', existing_type=sa.String(length=64), nullable=False)
+    op.create_index(op.f('ix_user_ssn_hash'), 'user', ['ssn_hash'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_ssn_hash'), table_name='user')
+    # Recreates user on SQLite, see upgrade
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('ssn_hash')
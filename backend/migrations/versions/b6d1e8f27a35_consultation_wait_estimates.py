@@ -0,0 +1,46 @@
+"""consultation wait estimates
+
+Replaces the fixed "15 minutes per patient" Queue.estimated_wait_time string with the
+moving consultation length statistics the wait estimator persists, and records when
+each queue entry was served.
+
+Revision ID: b6d1e8f27a35
+Revises: a4c8d2e7f913
+Create Date: 2025-01-28 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d1e8f27a35'
+down_revision = 'a4c8d2e7f913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Dropping a column recreates queue on SQLite, which queue entries point to, so this relies
+    # on env.py turning foreign keys off for the migration. Same for the downgrade
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_served_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('avg_consult_minutes', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('consult_variance', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('consult_samples', sa.Integer(), nullable=True))
+        batch_op.drop_column('estimated_wait_time')
+
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('served_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.drop_column('served_at')
+
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('estimated_wait_time', sa.String(length=50), nullable=True))
+        batch_op.drop_column('consult_samples')
+        batch_op.drop_column('consult_variance')
+        batch_op.drop_column('avg_consult_minutes')
+        batch_op.drop_column('last_served_at')
@@ -0,0 +1,44 @@
+"""queue triage priority
+
+Adds a triage priority to queue entries and the immutable sort key they are seen in,
+and replaces the (queue_id, status, seq) index with one in triage order. Existing entries
+are routine, so their sort key is their ticket number.
+
+Revision ID: c3f7a9b1d248
+Revises: b6d1e8f27a35
+Create Date: 2025-01-29 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a9b1d248'
+down_revision = 'b6d1e8f27a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sort_key', sa.Integer(), nullable=True))
+
+    queue_entry = sa.table('queue_entry', sa.column('seq', sa.Integer), sa.column('priority', sa.Integer),
+                           sa.column('sort_key', sa.Integer))
+    op.execute(queue_entry.update().values(priority=0, sort_key=queue_entry.c.seq))
+
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('sort_key', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_queue_entry_queue_status_seq')
+        batch_op.create_index('ix_queue_entry_queue_status_sort_key', ['queue_id', 'status', 'sort_key', 'seq'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_queue_entry_queue_status_sort_key')
+        batch_op.create_index('ix_queue_entry_queue_status_seq', ['queue_id', 'status', 'seq'], unique=False)
+        batch_op.drop_column('sort_key')
+        batch_op.drop_column('priority')
@@ -0,0 +1,45 @@
+"""hot path indexes
+
+Composite and partial indexes for the queries the kiosk runs on every request:
+queue heads and listings by (queue_id, status, seq), doctor availability by
+(doctor_id, is_available, start_time) and lookups of a patient's slots and queue entries.
+
+Revision ID: c7d2e5a90b14
+Revises: 8a4e6b1f2c93
+Create Date: 2025-01-27 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e5a90b14'
+down_revision = '8a4e6b1f2c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_queue_entry_queue_status_seq', ['queue_id', 'status', 'seq'], unique=False)
+        batch_op.create_index('ix_queue_entry_patient_id', ['patient_id'], unique=False)
+
+    with op.batch_alter_table('slot', schema=None) as batch_op:
+        batch_op.create_index('ix_slot_doctor_available_start', ['doctor_id', 'is_available', 'start_time'], unique=False)
+        batch_op.create_index(
+            'ix_slot_patient_id', ['patient_id'],
+            unique=False,
+            sqlite_where=sa.text("patient_id IS NOT NULL"),
+            postgresql_where=sa.text("patient_id IS NOT NULL")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('slot', schema=None) as batch_op:
+        batch_op.drop_index('ix_slot_patient_id')
+        batch_op.drop_index('ix_slot_doctor_available_start')
+
+    with op.batch_alter_table('queue_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_queue_entry_patient_id')
+        batch_op.drop_index('ix_queue_entry_queue_status_seq')
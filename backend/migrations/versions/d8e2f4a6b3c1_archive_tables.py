@@ -0,0 +1,65 @@
+"""archive tables
+
+Adds slot_archive and queue_entry_archive, where the archive job moves past slots and
+finished queue entries once they are older than the retention window.
+
+Revision ID: d8e2f4a6b3c1
+Revises: c3f7a9b1d248
+Create Date: 2025-02-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e2f4a6b3c1'
+down_revision = 'c3f7a9b1d248'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('slot_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('is_available', sa.Boolean(), nullable=True),
+    sa.Column('patient_id', sa.Integer(), nullable=True),
+    sa.Column('slot_type', sa.String(length=20), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('slot_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_slot_archive_doctor_start', ['doctor_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_slot_archive_patient_id', ['patient_id'], unique=False)
+
+    op.create_table('queue_entry_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('queue_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('sort_key', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('served_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('queue_entry_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_queue_entry_archive_queue_served', ['queue_id', 'served_at'], unique=False)
+        batch_op.create_index('ix_queue_entry_archive_patient_id', ['patient_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('queue_entry_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_queue_entry_archive_patient_id')
+        batch_op.drop_index('ix_queue_entry_archive_queue_served')
+
+    op.drop_table('queue_entry_archive')
+    with op.batch_alter_table('slot_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_slot_archive_patient_id')
+        batch_op.drop_index('ix_slot_archive_doctor_start')
+
+    op.drop_table('slot_archive')
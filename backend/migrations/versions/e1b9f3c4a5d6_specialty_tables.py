@@ -0,0 +1,77 @@
+"""specialty tables
+
+Adds a normalized specialty table and the doctor_specialty association, and splits
+the existing Doctor.specialties CSV strings into them. The CSV column is kept so
+API responses keep returning it.
+
+Revision ID: e1b9f3c4a5d6
+Revises: c7d2e5a90b14
+Create Date: 2025-01-27 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils.specialty_utils import split_specialties
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b9f3c4a5d6'
+down_revision = 'c7d2e5a90b14'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    specialty = op.create_table('specialty',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    doctor_specialty = op.create_table('doctor_specialty',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('specialty_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.ForeignKeyConstraint(['specialty_id'], ['specialty.id'], ),
+    sa.PrimaryKeyConstraint('doctor_id', 'specialty_id')
+    )
+    with op.batch_alter_table('doctor_specialty', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_specialty_specialty_id', ['specialty_id', 'doctor_id'], unique=False)
+
+    # Split the CSV column a batch of doctors at a time
+    conn = op.get_bind()
+    doctor = sa.table('doctor', sa.column('id', sa.Integer), sa.column('specialties', sa.String))
+    specialty_ids = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(doctor.c.id, doctor.c.specialties)
+            .where(doctor.c.id > last_id)
+            .order_by(doctor.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        links = []
+        for doctor_id, specialties in rows:
+            for name, key in split_specialties(specialties):
+                if key not in specialty_ids:
+                    specialty_ids[key] = conn.execute(
+                        sa.insert(specialty).values(name=name, key=key).returning(specialty.c.id)
+                    ).scalar_one()
+                links.append({"doctor_id": doctor_id, "specialty_id": specialty_ids[key]})
+        if links:
+            conn.execute(sa.insert(doctor_specialty), links)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('doctor_specialty', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_specialty_specialty_id')
+
+    op.drop_table('doctor_specialty')
+    op.drop_table('specialty')
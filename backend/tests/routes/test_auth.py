@@ -4,7 +4,9 @@ from app import create_app
 from app.database import db
 from app.models import User, Doctor, Slot
 from http import HTTPStatus
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import jwt
+from app.utils.jwt_utils import token_cache, JWT_SECRET_KEY, JWT_ALGORITHM
 
 @pytest.fixture
 def client():
@@ -152,4 +154,41 @@ def test_protected_queue_joining(client):
         }
     )
     assert response.status_code == HTTPStatus.CREATED
-    assert response.json['status'] == 'success' 
\ No newline at end of file
+    assert response.json['status'] == 'success' 
+
+def test_token_cache_and_revocation(client):
+    response = client.post('/api/dev/add/user', json={
+        "ssn": "564738",
+        "name": "John Doe",
+        "phone": "555-123-4567"
+    })
+    assert response.status_code == HTTPStatus.OK
+
+    auth_response = client.post('/api/patients/auth', json={
+        "ssn": "564738",
+        "phone": "555-123-4567"
+    })
+    token = auth_response.json['response']['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    # Verified tokens are cached and keep working
+    for _ in range(2):
+        response = client.get('/api/slots/available/1', headers=headers)
+        assert response.status_code == HTTPStatus.OK
+    assert token_cache.get(token)['user_id'] == 1
+
+    # Expired tokens are refused with a typed error
+    expired = jwt.encode(
+        {'user_id': 1, 'ssn': '564738', 'exp': datetime.now(timezone.utc) - timedelta(minutes=1)},
+        JWT_SECRET_KEY, algorithm=JWT_ALGORITHM
+    )
+    response = client.get('/api/slots/available/1', headers={'Authorization': f'Bearer {expired}'})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert 'Token has expired' in response.json['message']
+
+    # Logging out revokes the token even though it is still cached as verified
+    response = client.post('/api/patients/logout', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    response = client.get('/api/slots/available/1', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert 'Token has been revoked' in response.json['message']
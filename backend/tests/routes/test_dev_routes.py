@@ -2,8 +2,19 @@ import pytest
 from flask import Flask, json
 from app import create_app
 from app.database import db
-from app.models import User, Doctor
+from app.models import User, Doctor, Slot, Queue, QueueEntry, SlotArchive, QueueEntryArchive
 from http import HTTPStatus
+from datetime import datetime, timedelta
+from app.utils.serialization import ENCODERS, set_encoder
+from app.utils.data_generator import GeneratorSettings, generate, patient_ssn
+from app.utils.availability import utc_now
+from app.utils.utils import parse_phone_number
+from sqlalchemy import create_engine, select
+from flask_migrate import upgrade, downgrade
+from app.database import migrate, configure_engine
+import os
+import sqlite3
+import io
 
 @pytest.fixture
 def client():
@@ -84,4 +95,236 @@ def test_add_doctor(client):
         "opd_rate": 600.0
     })
     assert response.status_code == HTTPStatus.BAD_REQUEST
-    assert "Doctor with this SSN already exists" in response.json['response']
\ No newline at end of file
+    assert "Doctor with this SSN already exists" in response.json['response']
+
+def test_get_users_pages_and_stream(client):
+    db.session.add_all([User(ssn=f'60000{i}', name=f'Patient {i}', phone='5551234567') for i in range(7)])
+    db.session.commit()
+
+    # Walk the pages through the Link header cursor
+    ids, url, pages = [], '/api/dev/get/users?limit=3', 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        ids += [user['id'] for user in response.json['response']]
+        link = response.headers.get('Link')
+        url = link[1:link.index('>')] if link else None
+        pages += 1
+    assert pages == 3
+    assert ids == sorted(ids) and len(ids) == 7
+
+    response = client.get('/api/dev/get/users?limit=0')
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    # Streamed as one JSON object per line, resuming after a cursor
+    response = client.get(f'/api/dev/get/users?format=ndjson&after={ids[1]}')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [user['id'] for user in lines] == ids[2:]
+
+    doctor = Doctor(ssn='823755', name='Dr. Smith', specialties='Cardiology', experience=10, opd_rate=500.0)
+    db.session.add(doctor)
+    db.session.commit()
+    db.session.add(Slot(doctor_id=doctor.id, start_time=datetime(2023, 10, 1, 9), end_time=datetime(2023, 10, 1, 10)))
+    db.session.commit()
+
+    response = client.get('/api/dev/get/slots', headers={'Accept': 'application/x-ndjson'})
+    slots = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert slots[0]['start_time'] == '2023-10-01T09:00:00'
+
+
+def test_slots_encode_the_same_with_every_encoder(client):
+    doctor = Doctor(ssn='823755', name='Dr. Smith', specialties='Cardiology', experience=10, opd_rate=500.0)
+    db.session.add(doctor)
+    db.session.commit()
+    db.session.add_all([Slot(doctor_id=doctor.id, start_time=datetime(2023, 10, 1, 9 + i), end_time=datetime(2023, 10, 1, 10 + i))
+                        for i in range(3)])
+    db.session.commit()
+
+    bodies = {}
+    try:
+        for name in ENCODERS:
+            set_encoder(name)
+            response = client.get('/api/dev/get/slots?limit=2')
+            assert response.status_code == HTTPStatus.OK
+            bodies[name] = response.get_data()
+    finally:
+        set_encoder('auto')
+
+    # Datetimes come out in ISO 8601 and the cursor keeps working through the labelled slot_id column
+    page = json.loads(bodies['json'])['response']
+    assert [slot['start_time'] for slot in page] == ['2023-10-01T09:00:00', '2023-10-01T10:00:00']
+    assert response.headers['Link'].startswith(f'<http://localhost/api/dev/get/slots?after={page[-1]["slot_id"]}&')
+    assert len(set(bodies.values())) == 1
+
+
+def test_import_users(client, tmp_path):
+    db.session.add(User(ssn='100-00-001', name='Existing', phone='5551234567'))
+    db.session.commit()
+
+    csv_file = (
+        "ssn,name,phone\n"
+        "10000001,Existing Again,555-123-4567\n"
+        "100-00-002,Alice,555-123-4567\n"
+        "100-00-003,Bob,12345\n"
+        "100-00-004,,555-123-4567\n"
+        "10000002,Alice Again,555-123-4567\n"
+        "100-00-005,Carol,+91 98765 43210\n"
+    )
+    response = client.post('/api/dev/import/users', data={
+        'file': (io.BytesIO(csv_file.encode()), 'patients.csv')
+    }, content_type='multipart/form-data')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response'] == {
+        "imported": 2,
+        "duplicates": 2,
+        "failed": 2,
+        "errors": [
+            {"row": 4, "error": "Invalid phone number: Phone number cannot be null"},
+            {"row": 5, "error": "Missing required fields"}
+        ]
+    }
+    assert User.query.filter_by(name='Carol').one().phone == '9876543210'
+
+    # NDJSON sent as the raw body
+    ndjson = '{"ssn": "200-00-001", "name": "Dan", "phone": "5551234567"}\nnot json\n'
+    response = client.post('/api/dev/import/users', data=ndjson, content_type='application/x-ndjson')
+    assert response.json['response']['imported'] == 1
+    assert response.json['response']['errors'] == [{"row": 2, "error": "Malformed record"}]
+
+    response = client.post('/api/dev/import/users', data=ndjson, content_type='text/plain')
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    # The same import from the command line, in small chunks
+    path = tmp_path / 'patients.ndjson'
+    path.write_text("".join(
+        json.dumps({"ssn": f"3000000{i:02d}", "name": f"Patient {i}", "phone": "5551234567"}) + "\n" for i in range(25)
+    ))
+    result = client.application.test_cli_runner().invoke(args=['import-patients', str(path), '--chunk-size', '10'])
+    assert result.exit_code == 0
+    assert "Imported 25, skipped 0 duplicates, 0 rows failed" in result.output
+    result = client.application.test_cli_runner().invoke(args=['import-patients', str(path)])
+    assert "Imported 0, skipped 25 duplicates" in result.output
+    assert User.query.count() == 29
+
+
+def test_generate_data(client):
+    result = client.application.test_cli_runner().invoke(args=[
+        'generate-data', '--doctors', '20', '--patients', '500', '--slot-days', '2', '--slots-per-day', '8',
+        '--queue-depth', '5', '--served-per-queue', '3', '--chunk-size', '100'
+    ])
+    assert result.exit_code == 0
+    assert User.query.count() == 500 and Doctor.query.count() == 20 and Slot.query.count() == 20 * 2 * 8
+
+    # Generated phones are in the form registration stores and every doctor's specialties are linked
+    assert all(parse_phone_number(user.phone) == user.phone for user in User.query.limit(100))
+    assert all(doctor.specialty_list for doctor in Doctor.query)
+
+    # A patient waits in one queue at most, and the queue totals match the waiting entries
+    waiting = QueueEntry.query.filter_by(status="waiting").all()
+    assert len({entry.patient_id for entry in waiting}) == len(waiting)
+    assert sum(queue.total_patients for queue in Queue.query) == len(waiting)
+
+    doctor_id = Queue.query.filter(Queue.total_patients > 0).first().doctor_id
+    response = client.get(f'/api/queue/status/{doctor_id}')
+    assert response.status_code == HTTPStatus.OK
+    assert [entry['position'] for entry in response.json['response']['current_queue']] == \
+        list(range(1, response.json['response']['total_patients'] + 1))
+
+    # Generated patients can log in with their generated SSN
+    user = User.query.first()
+    response = client.post('/api/patients/auth', json={"ssn": patient_ssn(user.id), "phone": user.phone})
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_generate_data_is_deterministic(tmp_path):
+    now = datetime(2025, 6, 2, 8)
+    settings = GeneratorSettings(doctors=5, patients=50, slot_days=1, slots_per_day=4, queue_depth=3, served_per_queue=2, seed=7)
+    dumps = []
+    for name in ('a', 'b'):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            generate(conn, settings, ssn_key='key', now=now)
+        with engine.connect() as conn:
+            dumps.append([conn.execute(select(table).order_by(*table.primary_key.columns)).all()
+                          for table in db.metadata.sorted_tables])
+        engine.dispose()
+    assert dumps[0] == dumps[1]
+
+
+def test_archive(client):
+    # A hospital whose calendars and queue history are two months old
+    settings = GeneratorSettings(doctors=10, patients=200, slot_days=2, slots_per_day=8, queue_depth=4, served_per_queue=5)
+    with db.engine.begin() as conn:
+        generate(conn, settings, now=utc_now() - timedelta(days=60))
+    waiting = QueueEntry.query.filter_by(status="waiting").count()
+    served = QueueEntry.query.filter_by(status="served").count()
+    # A slot of this week's calendar
+    db.session.add(Slot(doctor_id=1, start_time=utc_now(), end_time=utc_now() + timedelta(minutes=15), slot_type='walk_in'))
+    db.session.commit()
+
+    result = client.application.test_cli_runner().invoke(args=['archive', '--chunk-size', '7'])
+    assert result.exit_code == 0
+
+    # Past slots and served entries moved with their IDs, current slots and waiting patients stayed
+    assert Slot.query.count() == 1 and SlotArchive.query.count() == 10 * 2 * 8
+    assert QueueEntry.query.filter_by(status="served").count() == 0
+    assert QueueEntryArchive.query.count() == served
+    assert QueueEntry.query.filter_by(status="waiting").count() == waiting
+    assert db.session.get(SlotArchive, 1).archived_at is not None
+
+    doctor_id = Queue.query.filter(Queue.total_patients > 0).first().doctor_id
+    response = client.get(f'/api/queue/status/{doctor_id}')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response']['total_patients'] == len(response.json['response']['current_queue'])
+
+    # Nothing is left to archive on the next run
+    result = client.application.test_cli_runner().invoke(args=['archive', '--no-vacuum'])
+    assert result.exit_code == 0 and 'Archived 0 rows' in result.output
+
+
+def test_migrations_with_foreign_keys(tmp_path):
+    # A production-like app on a SQLite file, enforcing foreign keys on every connection
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'prod.db'}",
+        SQLITE_PRAGMAS={'journal_mode': 'WAL', 'foreign_keys': 'ON'},
+        SSN_HASH_KEY='test-ssn-hash-key'
+    )
+    db.init_app(app)
+    configure_engine(app)
+    migrate.init_app(app, db)
+    directory = os.path.join(os.path.dirname(__file__), '..', '..', 'migrations')
+
+    def counts():
+        with sqlite3.connect(tmp_path / 'prod.db') as conn:
+            assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+            assert conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '_alembic_tmp%'").fetchall() == []
+            return [conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for table in ('user', 'queue_entry', 'slot')]
+
+    with app.app_context():
+        upgrade(directory, revision='3f1c2a9d8b70')
+        with sqlite3.connect(tmp_path / 'prod.db') as conn:
+            conn.executemany("INSERT INTO user (id, ssn, name, phone, checkin_status) VALUES (?, ?, ?, '5550000000', 0)",
+                             [(i, f'10000000{i}', f'Patient {i}') for i in range(1, 4)])
+            conn.execute("INSERT INTO doctor (id, ssn, name, specialties, experience, opd_rate, is_available) "
+                         "VALUES (1, '900000000', 'Dr. Lee', 'Cardiology', 5, 100, 1)")
+            conn.execute("INSERT INTO queue (id, doctor_id, total_patients) VALUES (1, 1, 2)")
+            conn.executemany("INSERT INTO queue_entry (queue_id, patient_id, position, status) VALUES (1, ?, ?, 'waiting')",
+                             [(1, 1), (2, 2)])
+            conn.execute("INSERT INTO slot (doctor_id, start_time, end_time, is_available, patient_id, slot_type) "
+                         "VALUES (1, '2025-01-01 09:00:00', '2025-01-01 09:15:00', 0, 3, 'appointment')")
+
+        # Batch migrations recreate user and queue, which other rows point to
+        upgrade(directory)
+        assert counts() == [3, 2, 1]
+        downgrade(directory, revision='3f1c2a9d8b70')
+        assert counts() == [3, 2, 1]
+        upgrade(directory)
+        assert counts() == [3, 2, 1]
+
+        # The migration connection went back to the pool with foreign keys on again
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+        db.engine.dispose()
@@ -0,0 +1,135 @@
+import pytest
+from flask import Flask, json
+from app import create_app
+from app.database import db
+from app.models import Doctor
+from http import HTTPStatus
+from app.utils import directory_cache
+from sqlalchemy import update
+
+@pytest.fixture
+def client():
+    app = create_app('Test')
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        with app.test_client() as client:
+            yield client
+        db.drop_all()
+
+def test_update_availability(client):
+    # Test updating a doctor that doesn't exist
+    response = client.put('/api/doctors/availability/1', json={"is_available": False})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    doctor = Doctor(ssn='918234', name='Dr. Smith', specialties='Cardiology', experience=10, opd_rate=500.0)
+    db.session.add(doctor)
+    db.session.commit()
+
+    # Test an invalid payload
+    response = client.put(f'/api/doctors/availability/{doctor.id}', json={"is_available": "no"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    response = client.put(f'/api/doctors/availability/{doctor.id}', json={"is_available": False})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response'] == {"doctor_id": doctor.id, "is_available": False}
+
+def test_doctor_directory_etag(client):
+    response = client.post('/api/dev/add/doctor', json={
+        "ssn": "123456",
+        "name": "Dr. Smith",
+        "specialties": "Cardiology",
+        "experience": 10,
+        "opd_rate": 500.0
+    })
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/api/patients/doctors')
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json['response']) == 1
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    # Both directory endpoints share the cached body
+    response = client.get('/api/dev/get/doctors')
+    assert response.headers['ETag'] == etag
+
+    # A client holding the current directory gets a 304 without a body
+    response = client.get('/api/patients/doctors', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.data == b''
+
+    # Adding a doctor invalidates the directory
+    response = client.post('/api/dev/add/doctor', json={
+        "ssn": "654321",
+        "name": "Dr. Jones",
+        "specialties": "Neurology",
+        "experience": 5,
+        "opd_rate": 600.0
+    })
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/api/patients/doctors', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json['response']) == 2
+    etag = response.headers['ETag']
+
+    # So does an availability update
+    client.put('/api/doctors/availability/1', json={"is_available": False})
+    response = client.get('/api/patients/doctors', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response'][0]['is_available'] is False
+def test_doctor_directory_last_modified(client, monkeypatch):
+    client.post('/api/dev/add/doctor', json={
+        "ssn": "123456", "name": "Dr. Smith", "specialties": "Cardiology", "experience": 10, "opd_rate": 500.0
+    })
+    last_modified = client.get('/api/patients/doctors').headers['Last-Modified']
+    response = client.get('/api/patients/doctors', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    # Another worker changes the roster, this one only notices once its directory reaches the max age
+    db.session.execute(update(Doctor).values(is_available=False))
+    db.session.commit()
+    monkeypatch.setattr(directory_cache._stamp, 'max_age', -1)
+
+    # The rebuilt directory is newer than the client's copy, so it isn't answered with a 304
+    response = client.get('/api/patients/doctors', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response'][0]['is_available'] is False
+    assert response.headers['Last-Modified'] != last_modified
+
+    # A rebuild with unchanged content keeps its Last-Modified
+    rebuilt = client.get('/api/patients/doctors')
+    assert rebuilt.headers['Last-Modified'] == response.headers['Last-Modified']
+
+
+def test_get_doctors_by_specialty(client):
+    db.session.add_all([
+        Doctor(ssn='300001', name='Dr. Heart', specialties='Cardiology, General Medicine', experience=10, opd_rate=500.0),
+        Doctor(ssn='300002', name='Dr. Brain', specialties='Neurology', experience=8, opd_rate=700.0),
+        Doctor(ssn='300003', name='Dr. Family', specialties='General', experience=3, opd_rate=200.0),
+    ])
+    db.session.commit()
+
+    # Without a filter every doctor is returned
+    response = client.get('/api/doctors')
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json['response']) == 3
+
+    # Specialties are matched case-insensitively, on whole names and through aliases
+    response = client.get('/api/doctors?specialty=cardiology')
+    assert [doctor['name'] for doctor in response.json['response']] == ['Dr. Heart']
+    assert response.json['response'][0]['specialties'] == 'Cardiology, General Medicine'
+
+    response = client.get('/api/doctors?specialty=General Medicine')
+    assert [doctor['name'] for doctor in response.json['response']] == ['Dr. Heart', 'Dr. Family']
+
+    response = client.get('/api/doctors?specialty=Cardio')
+    assert response.json['response'] == []
+
+    # Changing the CSV column keeps the normalized specialties in step
+    doctor = Doctor.query.filter_by(name='Dr. Brain').first()
+    doctor.specialties = 'Neurology, Cardiology'
+    db.session.commit()
+    response = client.get('/api/doctors?specialty=Cardiology')
+    assert [doctor['name'] for doctor in response.json['response']] == ['Dr. Heart', 'Dr. Brain']
@@ -0,0 +1,72 @@
+import pytest
+from flask import Response
+from sqlalchemy import select
+from app import create_app
+from app.database import db
+from app.models import User
+from app.utils.metrics import _request_stats, metrics
+from http import HTTPStatus
+
+@pytest.fixture
+def client():
+    app = create_app('Test')
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        metrics.reset()
+        with app.test_client() as client:
+            yield client
+        db.drop_all()
+
+def test_metrics_endpoint(client):
+    for _ in range(3):
+        assert client.get('/api/doctors').status_code == HTTPStatus.OK
+    client.get('/api/no/such/route')
+
+    response = client.get('/metrics')
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+
+    assert '# TYPE kiosk_http_request_duration_seconds histogram' in body
+    assert 'kiosk_http_request_duration_seconds_count{blueprint="doctor_api",endpoint="doctor_api.get_doctors"} 3' in body
+    assert 'kiosk_http_request_duration_seconds_bucket{blueprint="doctor_api",endpoint="doctor_api.get_doctors",le="+Inf"} 3' in body
+    assert 'kiosk_http_requests_total{endpoint="doctor_api.get_doctors",status="200"} 3' in body
+    assert 'kiosk_http_requests_total{endpoint="<unmatched>",status="404"} 1' in body
+    # The directory is cached after the first request, so only that one queried the database
+    assert 'kiosk_db_statements_total{endpoint="doctor_api.get_doctors"} 1' in body
+
+def test_n_plus_one_is_flagged(client):
+    db.session.add_all([User(ssn=f'70000{i}', name=f'Patient {i}', phone='5551234567') for i in range(12)])
+    db.session.commit()
+    app = client.application
+
+    # One query per patient, the pattern an N+1 loop over a relationship produces
+    with app.test_request_context('/api/dev/get/users'):
+        app.preprocess_request()
+        for user_id in range(1, 13):
+            db.session.execute(select(User.name).where(User.id == user_id)).scalar()
+        app.process_response(Response())
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'kiosk_n_plus_one_requests_total{endpoint="dev_api.get_users"} 1' in body
+    assert 'kiosk_db_statements_total{endpoint="dev_api.get_users"} 12' in body
+
+    # A request below the threshold isn't flagged
+    client.get('/api/dev/get/users')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'kiosk_n_plus_one_requests_total{endpoint="dev_api.get_users"} 1' in body
+
+def test_failing_request_is_recorded(client):
+    app = client.application
+
+    # A view raising skips the after_request hooks, only teardown runs
+    with app.test_request_context('/api/dev/get/users'):
+        app.preprocess_request()
+        db.session.execute(select(User.name)).all()
+        app.do_teardown_request(RuntimeError("view failed"))
+        assert _request_stats.get() is None
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'kiosk_http_requests_total{endpoint="dev_api.get_users",status="500"} 1' in body
+    assert 'kiosk_db_statements_total{endpoint="dev_api.get_users"} 1' in body
@@ -0,0 +1,133 @@
+import pytest
+from flask import Flask, json
+from app import create_app
+from app.database import db
+from app.models import User, Doctor, Queue
+from http import HTTPStatus
+from app.utils.ssn_utils import hash_ssn
+from app.utils import symptom_matcher
+from sqlalchemy import insert, update
+
+@pytest.fixture
+def client():
+    app = create_app('Test')
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        with app.test_client() as client:
+            yield client
+        db.drop_all()
+
+def test_symptom_match(client):
+    # Test matching when there are no doctors
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "headache"})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    # Test a missing field
+    response = client.post('/api/patients/symptoms/match', json={"feeling": "bad"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    general = Doctor(ssn='100001', name='Dr. General', specialties='General Medicine', experience=10, opd_rate=200.0)
+    cardio_busy = Doctor(ssn='100002', name='Dr. Busy Heart', specialties='Cardiology', experience=15, opd_rate=800.0)
+    cardio_free = Doctor(ssn='100003', name='Dr. Free Heart', specialties='Cardiology, General Medicine', experience=5, opd_rate=600.0)
+    derm = Doctor(ssn='100004', name='Dr. Skin', specialties='Dermatology', experience=7, opd_rate=400.0, is_available=False)
+    db.session.add_all([general, cardio_busy, cardio_free, derm])
+    db.session.commit()
+
+    # Chest pain scores Cardiology and General Medicine, so the doctor practising both wins
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "I have chest pain and feel breathless"})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response']['doctor_id'] == cardio_free.id
+    assert response.json['response']['matched_specialties'] == ['cardiology', 'general medicine']
+
+    # Synonyms map to the same specialties, ties on score are broken by the shorter queue
+    db.session.add_all([
+        Queue(doctor_id=cardio_busy.id, total_patients=0),
+        Queue(doctor_id=cardio_free.id, total_patients=0),
+    ])
+    db.session.commit()
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "heart racing"})
+    assert response.json['response']['doctor_id'] == cardio_busy.id
+
+    Queue.query.filter_by(doctor_id=cardio_busy.id).update({"total_patients": 5})
+    db.session.commit()
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "heart racing"})
+    assert response.json['response']['doctor_id'] == cardio_free.id
+
+    # An unavailable specialist is still matched when nobody else practises the specialty
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "itchy rash"})
+    assert response.json['response']['doctor_id'] == derm.id
+
+    # The index follows roster changes
+    derm_free = Doctor(ssn='100005', name='Dr. Other Skin', specialties='Dermatology', experience=2, opd_rate=300.0)
+    db.session.add(derm_free)
+    db.session.commit()
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "itchy rash"})
+    assert response.json['response']['doctor_id'] == derm_free.id
+
+    # Unrecognised symptoms go to general medicine
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "something feels off"})
+    assert response.json['response']['doctor_id'] == general.id
+
+
+def test_symptom_match_max_age(client, monkeypatch):
+    derm = Doctor(ssn='100006', name='Dr. Skin', specialties='Dermatology', experience=7, opd_rate=400.0)
+    db.session.add(derm)
+    db.session.commit()
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "rash"})
+    assert response.json['response']['doctor_id'] == derm.id
+
+    # Another worker takes the doctor off duty and adds one. This worker's roster version doesn't move
+    db.session.execute(update(Doctor).where(Doctor.id == derm.id).values(is_available=False))
+    db.session.execute(insert(Doctor).values(
+        ssn='100007', name='Dr. Other Skin', specialties='Dermatology', experience=2, opd_rate=300.0, is_available=True
+    ))
+    db.session.commit()
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "rash"})
+    assert response.json['response']['doctor_id'] == derm.id
+
+    # Once the index is older than the max age it is rebuilt anyway
+    monkeypatch.setattr(symptom_matcher.symptom_matcher.stamp, 'max_age', -1)
+    response = client.post('/api/patients/symptoms/match', json={"symptoms": "rash"})
+    assert response.json['response']['doctor_name'] == 'Dr. Other Skin'
+
+
+def test_symptom_match_apostrophes():
+    matcher = symptom_matcher.SymptomMatcher()
+    # "can't sleep" is typed with an apostrophe, straight or curly, and still hits the "cant sleep" synonym
+    assert matcher.specialty_scores("I can't sleep") == matcher.specialty_scores("insomnia")
+    assert matcher.specialty_scores("I can\u2019t sleep at night") == matcher.specialty_scores("insomnia")
+
+
+def test_ssn_hash_lookup(client):
+    response = client.post('/api/dev/add/user', json={
+        "ssn": "123-45-678",
+        "name": "Jane Doe",
+        "phone": "555-123-4567"
+    })
+    assert response.status_code == HTTPStatus.OK
+
+    # SSNs are stored under a keyed hash, not the plaintext value
+    user = User.query.one()
+    assert user.ssn_hash == hash_ssn("12345678")
+    assert "12345678" not in user.ssn_hash
+
+    # The same SSN written without separators is a duplicate
+    response = client.post('/api/dev/add/user', json={
+        "ssn": "12345678",
+        "name": "Jane Doe",
+        "phone": "555-123-4567"
+    })
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    # Authentication and checkin both find the patient through the hash
+    response = client.post('/api/patients/auth', json={"ssn": "12345678", "phone": "555-123-4567"})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response']['user']['id'] == user.id
+
+    response = client.post('/api/patients/checkin', json={"ssn": "123-45-678"})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['message'] == "Authenticated"
+
+    response = client.post('/api/patients/checkin', json={"ssn": "000000"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -5,6 +5,14 @@ from app.database import db
 from app.models import User, Doctor, Slot, Queue, QueueEntry
 from http import HTTPStatus
 from app.utils.jwt_utils import generate_token
+from app.utils.wait_estimator import wait_estimator
+from app.utils.queue_balancer import QueueBalancer
+from app.utils.queue_cache import SQLiteStore, build_views
+from app.utils.queue_utils import get_or_create_queue_id, enqueue_patient, triage_sort_key, PRIORITY_BOOSTS, AlreadyInQueueError
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
 
 @pytest.fixture
 def client():
@@ -71,4 +79,311 @@ def test_view_queue(client):
             "patient_id": user.id
         })
     assert response.status_code == HTTPStatus.CONFLICT
-    assert response.json['response'] == "Patient already in queue"
\ No newline at end of file
+    assert response.json['response'] == "Patient already in queue"
+
+def test_process_next_patient(client):
+    # Create a doctor and three patients
+    doctor = Doctor(ssn='555111', name='Dr. Adams', specialties='General Medicine', experience=8, opd_rate=300.0)
+    db.session.add(doctor)
+    users = [User(ssn=f'70000{i}', name=f'Patient {i}', phone=f'555-000-000{i}') for i in range(3)]
+    db.session.add_all(users)
+    db.session.commit()
+
+    token = generate_token(users[0].id, users[0].ssn)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    for i, user in enumerate(users, start=1):
+        response = client.post('/api/queue/join', headers=headers, json={
+            "doctor_id": doctor.id,
+            "patient_id": user.id
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json['response']['position'] == i
+
+    # Dequeue the head of the queue
+    response = client.get(f'/api/queue/next/{doctor.id}')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response']['patient_id'] == users[0].id
+    assert response.json['response']['remaining_patients'] == 2
+
+    # Positions of the remaining patients are shifted without being rewritten
+    response = client.get(f'/api/queue/status/{doctor.id}')
+    current_queue = response.json['response']['current_queue']
+    assert [entry['patient_id'] for entry in current_queue] == [users[1].id, users[2].id]
+    assert [entry['position'] for entry in current_queue] == [1, 2]
+
+    # Ticket numbers stay immutable
+    entries = QueueEntry.query.order_by(QueueEntry.seq).all()
+    assert [entry.seq for entry in entries] == [1, 2, 3]
+    assert entries[0].status == "served"
+
+    response = client.get(f'/api/dev/next-status/{doctor.id}')
+    assert response.json['response'] == {"next_patient_id": users[1].id, "position": 1}
+
+    response = client.get(f'/api/dev/view/{doctor.id}')
+    assert [entry['position'] for entry in response.json['response']['current_queue']] == [1, 2]
+
+
+def test_queue_status_cache(client):
+    doctor = Doctor(ssn='555222', name='Dr. Baker', specialties='General Medicine', experience=4, opd_rate=200.0)
+    users = [User(ssn=f'71000{i}', name=f'Patient {i}', phone=f'555-100-000{i}') for i in range(3)]
+    db.session.add_all([doctor, *users])
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {generate_token(users[0].id, users[0].ssn)}'}
+
+    client.post('/api/queue/join', headers=headers, json={"doctor_id": doctor.id, "patient_id": users[0].id})
+    first = client.get(f'/api/queue/status/{doctor.id}')
+    assert first.json['response']['total_patients'] == 1
+
+    # A change made behind the routes' back isn't seen until the snapshot is invalidated or expires
+    queue = Queue.query.filter_by(doctor_id=doctor.id).one()
+    db.session.add(QueueEntry(queue_id=queue.id, patient_id=users[1].id, seq=2, sort_key=2, priority=0, status="waiting"))
+    queue.total_patients, queue.last_seq = 2, 2
+    db.session.commit()
+    assert client.get(f'/api/queue/status/{doctor.id}').data == first.data
+
+    # Joining invalidates it
+    client.post('/api/queue/join', headers=headers, json={"doctor_id": doctor.id, "patient_id": users[2].id})
+    response = client.get(f'/api/queue/status/{doctor.id}')
+    assert [entry['patient_id'] for entry in response.json['response']['current_queue']] == [user.id for user in users]
+
+    # And so does calling the next patient, for the dev views reading the same snapshot too
+    client.get(f'/api/queue/next/{doctor.id}')
+    assert client.get(f'/api/dev/next-status/{doctor.id}').json['response']['next_patient_id'] == users[1].id
+    assert client.get(f'/api/dev/view/{doctor.id}').json['response']['total_patients'] == 2
+
+
+def test_shared_queue_cache(tmp_path):
+    # Two workers sharing the cache file
+    first, second = SQLiteStore(str(tmp_path / 'queue_cache.db')), SQLiteStore(str(tmp_path / 'queue_cache.db'))
+    views = build_views({"total_patients": 1, "current_queue": [
+        {"position": 1, "patient_id": 7, "priority": 0, "status": "waiting"}
+    ]})
+
+    first.put(1, 0, views)
+    assert second.get(1).views == views
+    assert json.loads(views.next_status)['response'] == {"next_patient_id": 7, "position": 1}
+
+    # An invalidation by either worker is seen by both
+    second.invalidate(1)
+    assert first.get(1).views is None and first.get(1).generation == 1
+
+    # Views built before the invalidation are discarded, ones built after it are stored
+    first.put(1, 0, views)
+    assert second.get(1).views is None
+    empty = build_views(None)
+    first.put(1, 1, empty)
+    assert second.get(1).views == empty and empty.next_status_code == HTTPStatus.NOT_FOUND
+
+def test_wait_estimate(client, monkeypatch):
+    doctor = Doctor(ssn='555222', name='Dr. Brisk', specialties='General Medicine', experience=8, opd_rate=300.0)
+    db.session.add(doctor)
+    users = [User(ssn=f'71000{i}', name=f'Patient {i}', phone=f'555-000-000{i}') for i in range(3)]
+    db.session.add_all(users)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {generate_token(users[0].id, users[0].ssn)}'}
+
+    for ahead, user in enumerate(users):
+        # A patient joining is quoted the wait /status showed for a newcomer, behind those already waiting
+        newcomer = client.get(f'/api/queue/status/{doctor.id}').json['response']
+        response = client.post('/api/queue/join', headers=headers, json={"doctor_id": doctor.id, "patient_id": user.id})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json['response']['estimated_wait_minutes'] == 15.0 * ahead
+        if newcomer:
+            assert response.json['response']['estimated_wait_minutes'] == newcomer['estimated_wait_minutes']
+
+    # Untimed doctors fall back to the default consultation length, with a band around it
+    response = client.get(f'/api/queue/status/{doctor.id}')
+    assert response.json['response']['estimated_wait_minutes'] == 45.0
+    low, high = response.json['response']['estimated_wait_range']
+    assert low < 45.0 < high
+
+    # Call patients in 10 minutes apart
+    start = datetime(2025, 3, 3, 9)
+    clock = iter([start, start + timedelta(minutes=10), start + timedelta(minutes=20)])
+    monkeypatch.setattr('app.utils.queue_utils.utc_now', lambda: next(clock))
+
+    client.get(f'/api/queue/next/{doctor.id}')
+    client.get(f'/api/queue/next/{doctor.id}')
+    response = client.get(f'/api/queue/status/{doctor.id}')
+    assert response.json['response']['estimated_wait_minutes'] == 14.0
+
+    # The last patient leaves the queue empty, so the gap to whoever comes next is never timed
+    client.get(f'/api/queue/next/{doctor.id}')
+    queue = Queue.query.filter_by(doctor_id=doctor.id).one()
+    assert queue.last_served_at is None
+    assert [entry.served_at for entry in QueueEntry.query.order_by(QueueEntry.seq)][0] == start
+
+    # Estimates are written back to the queue row
+    assert wait_estimator.persist(db.session) == 1
+    db.session.refresh(queue)
+    assert queue.consult_samples == 2
+    assert round(queue.avg_consult_minutes, 2) == 13.2
+
+
+def test_triage_priority(client):
+    doctor = Doctor(ssn='555333', name='Dr. Triage', specialties='General Medicine', experience=8, opd_rate=300.0)
+    db.session.add(doctor)
+    users = [User(ssn=f'73000{i}', name=f'Patient {i}', phone=f'555-000-000{i}') for i in range(8)]
+    db.session.add_all(users)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {generate_token(users[0].id, users[0].ssn)}'}
+
+    def join(user, priority=None):
+        payload = {"doctor_id": doctor.id, "patient_id": user.id}
+        if priority is not None:
+            payload["priority"] = priority
+        return client.post('/api/queue/join', headers=headers, json=payload)
+
+    for user in users[:6]:
+        assert join(user).status_code == HTTPStatus.CREATED
+
+    # An urgent patient goes to the front, an elderly patient only moves a few tickets forward
+    response = join(users[6], "urgent")
+    assert response.json['response']['position'] == 1
+    response = join(users[7], 1)
+    assert response.json['response']['position'] == 5
+
+    response = client.get(f'/api/queue/status/{doctor.id}')
+    current_queue = response.json['response']['current_queue']
+    assert response.json['response']['total_patients'] == 8
+    assert [entry['patient_id'] for entry in current_queue] == \
+        [users[6].id, users[0].id, users[1].id, users[2].id, users[7].id, users[3].id, users[4].id, users[5].id]
+    assert [entry['position'] for entry in current_queue] == list(range(1, 9))
+
+    response = client.get(f'/api/queue/next/{doctor.id}')
+    assert response.json['response']['patient_id'] == users[6].id
+
+    # Boosts are bounded, so a patient can't be overtaken by someone arriving long after them
+    assert triage_sort_key(1, 0) < triage_sort_key(1 + PRIORITY_BOOSTS[3] + 1, 3)
+
+    response = join(users[6], "whenever")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_join_best_queue(client):
+    doctors = [
+        Doctor(ssn='560001', name='Dr. One', specialties='Cardiology', experience=8, opd_rate=300.0),
+        Doctor(ssn='560002', name='Dr. Two', specialties='Cardiology, General Medicine', experience=8, opd_rate=300.0),
+        Doctor(ssn='560003', name='Dr. Away', specialties='Cardiology', experience=8, opd_rate=300.0, is_available=False),
+        Doctor(ssn='560004', name='Dr. Skin', specialties='Dermatology', experience=8, opd_rate=300.0),
+    ]
+    users = [User(ssn=f'72000{i}', name=f'Patient {i}', phone=f'555-000-000{i}') for i in range(6)]
+    db.session.add_all(doctors + users)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {generate_token(users[0].id, users[0].ssn)}'}
+
+    # Walk-ins are spread over the available cardiologists only
+    chosen = []
+    for user in users[:4]:
+        response = client.post('/api/queue/join-best', headers=headers, json={"specialty": "cardiology", "patient_id": user.id})
+        assert response.status_code == HTTPStatus.CREATED
+        chosen.append(response.json['response']['doctor_id'])
+    assert sorted(chosen) == [doctors[0].id, doctors[0].id, doctors[1].id, doctors[1].id]
+
+    # Once a patient is seen, that doctor has the shortest queue
+    client.get(f'/api/queue/next/{doctors[1].id}')
+    response = client.post('/api/queue/join-best', headers=headers, json={"specialty": "Cardiology", "patient_id": users[4].id})
+    assert response.json['response']['doctor_id'] == doctors[1].id
+    assert response.json['response']['position'] == 2
+    # Quoted the wait behind the one patient ahead, not counting themselves
+    assert response.json['response']['estimated_wait_minutes'] == 15.0
+
+    # A patient already waiting is rejected without skewing the balance
+    response = client.post('/api/queue/join-best', headers=headers, json={"specialty": "Cardiology", "patient_id": users[4].id})
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    response = client.post('/api/queue/join-best', headers=headers, json={"specialty": "Neurology", "patient_id": users[5].id})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_queue_balancer_concurrent_picks():
+    balancer = QueueBalancer()
+    balancer.build([(1, "cardiology", 0, 15.0), (2, "cardiology", 0, 15.0), (3, "cardiology", 3, 10.0)])
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        picks = list(executor.map(lambda _: balancer.choose("cardiology"), range(300)))
+
+    # Every pick reserves its place, so the queues end up with equal expected waits
+    counts = {doctor_id: picks.count(doctor_id) for doctor_id in (1, 2, 3)}
+    assert abs(counts[1] - counts[2]) <= 1
+    assert abs((counts[1] + 1) * 15.0 - (counts[3] + 4) * 10.0) <= 15.0
+    assert balancer.choose("neurology") is None
+
+
+def test_concurrent_queue_joins(tmp_path):
+    # Use a file backed database so every worker thread gets its own connection and transaction
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"timeout": 30})
+    db.metadata.create_all(engine)
+
+    num_patients = 300
+    # Patients' SSN hashes are keyed by the app config
+    with create_app('Test').app_context(), Session(engine) as session:
+        doctor = Doctor(ssn='600600', name='Dr. Busy', specialties='General Medicine', experience=12, opd_rate=200.0)
+        session.add(doctor)
+        session.add_all([User(ssn=f'9{i:05d}', name=f'Patient {i}', phone='5551234567') for i in range(num_patients)])
+        session.commit()
+        doctor_id = doctor.id
+        patient_ids = [user_id for (user_id,) in session.query(User.id)]
+
+    def join(patient_id):
+        with Session(engine) as session:
+            queue_id = get_or_create_queue_id(session, doctor_id)
+            try:
+                return enqueue_patient(session, queue_id, patient_id)
+            except AlreadyInQueueError:
+                return None
+
+    # Every patient taps the kiosk twice at the same time
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(join, patient_ids * 2))
+
+    joined = [result for result in results if result is not None]
+    assert len(joined) == num_patients
+
+    # Tickets and positions handed out are dense and unique
+    assert sorted(seq for seq, _ in joined) == list(range(1, num_patients + 1))
+    assert sorted(position for _, position in joined) == list(range(1, num_patients + 1))
+
+    with Session(engine) as session:
+        queue = session.query(Queue).one()
+        assert queue.total_patients == num_patients
+        assert queue.last_seq == num_patients
+        assert session.query(QueueEntry).filter_by(status="waiting").count() == num_patients
+
+    engine.dispose()
+
+
+def test_stream_queue(client):
+    doctor = Doctor(ssn='343434', name='Dr. Stream', specialties='General Medicine', experience=3, opd_rate=150.0)
+    user = User(ssn='121212', name='Jane Doe', phone='555-222-3333')
+    db.session.add_all([doctor, user])
+    db.session.commit()
+
+    token = generate_token(user.id, user.ssn)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get(f'/api/queue/stream/{doctor.id}')
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == 'text/event-stream'
+    events = iter(response.response)
+
+    # The stream opens with a snapshot of the queue
+    event = next(events).decode()
+    assert event.startswith('event: snapshot\n')
+    assert json.loads(event.split('data: ', 1)[1])['current_queue'] == []
+
+    # Joining and dequeuing push diffs to the open stream
+    client.post('/api/queue/join', headers=headers, json={"doctor_id": doctor.id, "patient_id": user.id})
+    event = next(events).decode()
+    assert event.startswith('event: join\n')
+    data = json.loads(event.split('data: ', 1)[1])
+    assert data['patient_id'] == user.id
+    assert data['position'] == 1
+
+    client.get(f'/api/queue/next/{doctor.id}')
+    event = next(events).decode()
+    assert event.startswith('event: next\n')
+    assert json.loads(event.split('data: ', 1)[1])['total_patients'] == 0
+
+    response.close()
@@ -2,9 +2,14 @@ import pytest
 from flask import Flask, json
 from app import create_app
 from app.database import db
-from app.models import Doctor, Slot
+from app.models import Doctor, Slot, User
 from http import HTTPStatus
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.utils.jwt_utils import generate_token
+from app.utils.slot_utils import reserve_slot, SlotUnavailableError
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 
 @pytest.fixture
 def client():
@@ -60,3 +65,183 @@ def test_get_slots(client):
     response = client.get('/api/dev/get/slots')  
     assert response.status_code == 200
     assert len(response.json['response']) == 1
+
+def test_add_slot_schedule(client):
+    doctors = [Doctor(ssn=f'44000{i}', name=f'Dr. {i}', specialties='Cardiology', experience=10, opd_rate=500.0) for i in range(2)]
+    db.session.add_all(doctors)
+    db.session.commit()
+
+    # An existing slot overlapping the template for the first doctor
+    db.session.add(Slot(
+        doctor_id=doctors[0].id,
+        start_time=datetime.fromisoformat("2025-03-03T09:10:00"),
+        end_time=datetime.fromisoformat("2025-03-03T09:40:00")
+    ))
+    db.session.commit()
+
+    schedule = {
+        "doctor_ids": [doctor.id for doctor in doctors],
+        "start_date": "2025-03-03",  # Monday
+        "end_date": "2025-03-09",    # Sunday
+        "slot_minutes": 30,
+        "weekly": [{"weekdays": [0, 2, 4], "start": "09:00", "end": "13:00"}],
+        "breaks": [{"start": "11:00", "end": "11:30"}]
+    }
+    response = client.post('/api/dev/post/slots/schedule', json=schedule)
+    assert response.status_code == HTTPStatus.CREATED
+
+    # 3 days of 8 half hour slots minus the break, for 2 doctors, minus the 2 slots overlapping the existing one
+    result = response.json['response']
+    assert result['doctors'] == 2
+    assert result['slots_created'] == 3 * 7 * 2 - 2
+    assert result['overlaps_skipped'] == 2
+    assert 'elapsed_ms' in result
+    assert Slot.query.count() == 3 * 7 * 2 - 2 + 1
+
+    # Running the same template again creates nothing new
+    response = client.post('/api/dev/post/slots/schedule', json=schedule)
+    assert response.json['response']['slots_created'] == 0
+
+    # Test an unknown doctor and a malformed rule
+    response = client.post('/api/dev/post/slots/schedule', json={**schedule, "doctor_ids": [999]})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    response = client.post('/api/dev/post/slots/schedule', json={
+        **schedule,
+        "weekly": [{"weekdays": [7], "start": "09:00", "end": "13:00"}]
+    })
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    # Test doctor IDs that aren't integers and an unknown slot type
+    for doctor_ids in ([[1]], [{"id": 1}], [1, "2"], [None], [True]):
+        response = client.post('/api/dev/post/slots/schedule', json={**schedule, "doctor_ids": doctor_ids})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    response = client.post('/api/dev/post/slots/schedule', json={**schedule, "slot_type": "emergency"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert Slot.query.count() == 3 * 7 * 2 - 2 + 1
+
+def test_book_slots_batch(client):
+    doctor = Doctor(ssn='818181', name='Dr. Family', specialties='Pediatrics', experience=10, opd_rate=500.0)
+    user = User(ssn='717171', name='Parent', phone='555-123-4567')
+    db.session.add_all([doctor, user])
+    db.session.commit()
+
+    start = datetime.fromisoformat("2025-03-03T09:00:00")
+    slots = [Slot(doctor_id=doctor.id, start_time=start + timedelta(minutes=15 * i),
+                  end_time=start + timedelta(minutes=15 * (i + 1))) for i in range(4)]
+    db.session.add_all(slots)
+    db.session.commit()
+    slot_ids = [slot.id for slot in slots]
+
+    headers = {'Authorization': f'Bearer {generate_token(user.id, user.ssn)}'}
+
+    # Book the first two slots together
+    response = client.post('/api/slots/book/batch', headers=headers, json={
+        "slot_ids": slot_ids[:2],
+        "patient_id": user.id
+    })
+    assert response.status_code == HTTPStatus.OK
+    assert [booking['slot_id'] for booking in response.json['response']] == slot_ids[:2]
+
+    # A batch containing a taken slot books nothing
+    response = client.post('/api/slots/book/batch', headers=headers, json={
+        "slot_ids": slot_ids[1:],
+        "patient_id": user.id
+    })
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json['response']['unavailable_slot_ids'] == [slot_ids[1]]
+    assert Slot.query.filter_by(is_available=True).count() == 2
+
+    # Single bookings report conflicts and missing slots
+    response = client.post('/api/slots/book', headers=headers, json={"slot_id": slot_ids[0], "patient_id": user.id})
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    response = client.post('/api/slots/book', headers=headers, json={"slot_id": 999, "patient_id": user.id})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+def test_concurrent_slot_booking(tmp_path):
+    # Use a file backed database so every worker thread gets its own connection and transaction
+    engine = create_engine(f"sqlite:///{tmp_path / 'slots.db'}", connect_args={"timeout": 30})
+    db.metadata.create_all(engine)
+
+    num_patients = 50
+    # Patients' SSN hashes are keyed by the app config
+    with create_app('Test').app_context(), Session(engine) as session:
+        doctor = Doctor(ssn='626262', name='Dr. Popular', specialties='Dermatology', experience=20, opd_rate=900.0)
+        session.add(doctor)
+        session.add_all([User(ssn=f'8{i:05d}', name=f'Patient {i}', phone='5551234567') for i in range(num_patients)])
+        session.flush()
+        slot = Slot(doctor_id=doctor.id, start_time=datetime(2025, 3, 3, 9), end_time=datetime(2025, 3, 3, 9, 15))
+        session.add(slot)
+        session.commit()
+        slot_id = slot.id
+        patient_ids = [user_id for (user_id,) in session.query(User.id)]
+
+    def book(patient_id):
+        with Session(engine) as session:
+            try:
+                reserve_slot(session, slot_id, patient_id)
+                return patient_id
+            except SlotUnavailableError:
+                return None
+
+    # Every patient tries to grab the same slot at once
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        winners = [patient_id for patient_id in executor.map(book, patient_ids) if patient_id is not None]
+
+    assert len(winners) == 1
+    with Session(engine) as session:
+        slot = session.get(Slot, slot_id)
+        assert slot.patient_id == winners[0]
+        assert slot.is_available is False
+
+    engine.dispose()
+
+def test_available_slots(client):
+    doctors = [
+        Doctor(ssn='515151', name='Dr. Heart', specialties='Cardiology, General Medicine', experience=10, opd_rate=500.0),
+        Doctor(ssn='525252', name='Dr. Pulse', specialties='Cardiology', experience=4, opd_rate=300.0),
+    ]
+    user = User(ssn='535353', name='John Doe', phone='555-123-4567')
+    db.session.add_all([*doctors, user])
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {generate_token(user.id, user.ssn)}'}
+
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    slot_ids = []
+    for doctor, offset in [(doctors[0], 2), (doctors[0], 0), (doctors[1], 1)]:
+        start = tomorrow + timedelta(hours=offset)
+        response = client.post('/api/dev/post/slot', json={
+            "doctor_id": doctor.id,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=30)).isoformat()
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        slot_ids.append(response.json['response']['slot_id'])
+
+    # Free slots come back in start time order
+    response = client.get(f'/api/slots/available/{doctors[0].id}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert [slot['id'] for slot in response.json['response']] == [slot_ids[1], slot_ids[0]]
+
+    # The earliest free cardiology slot across both doctors
+    response = client.get('/api/slots/next?specialty=cardiology', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['response']['id'] == slot_ids[1]
+
+    # Booking and deleting slots removes them from the calendar
+    response = client.post('/api/slots/book', headers=headers, json={"slot_id": slot_ids[1], "patient_id": user.id})
+    assert response.status_code == HTTPStatus.OK
+    response = client.delete(f'/api/slots/delete/slot/{slot_ids[0]}')
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get(f'/api/slots/available/{doctors[0].id}', headers=headers)
+    assert response.json['response'] == []
+
+    response = client.get('/api/slots/next?specialty=Cardiology', headers=headers)
+    assert response.json['response']['id'] == slot_ids[2]
+
+    # Specialties only match whole entries, not substrings
+    response = client.get('/api/slots/next?specialty=Cardio', headers=headers)
+    assert response.status_code == HTTPStatus.NOT_FOUND
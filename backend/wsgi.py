@@ -0,0 +1,12 @@
+"""
+Production WSGI entry point.
+
+Run behind gunicorn with the settings in gunicorn.conf.py:
+    flask --app wsgi db upgrade
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The database comes from DATABASE_URL, defaulting to a local SQLite file with WAL enabled.
+"""
+from app import create_app
+
+app = create_app('Prod')